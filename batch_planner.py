@@ -0,0 +1,218 @@
+"""
+Nightly batch planner for the Heuristic Scheduler
+
+Streams each database's pending tasks (plus the window's recurring
+occurrences) into a TaskTable, optimizes every plan in a worker process
+and replaces the database's planned_blocks with the result, which
+GET /schedule/planned serves.
+
+Plans are calendar-blind: the planner runs offline, without the users'
+Google credentials, so it cannot see their meetings. The only busy time
+is --busy-file, applied to every database alike (e.g. office closures).
+
+Usage:
+    python batch_planner.py                                   # plan $DATABASE_URL
+    python batch_planner.py --database-url postgresql://... --database-url postgresql://...
+    python batch_planner.py --budget-ms 500 --busy-file busy.json
+"""
+import argparse
+import concurrent.futures
+import datetime
+import json
+import sys
+import time
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, insert, select
+
+from heuristic_engine import (
+    WORK_TYPES, HeuristicScheduler, IntervalIndex, RecurrenceRule, RecurringTask, ScheduledTask, TaskTable,
+    WorkType, epoch_minutes, epoch_seconds, expand_recurring, occurrence_of
+)
+from models import (
+    PlannedBlock, RecurringTask as RecurringTaskModel, Task as TaskModel, get_engine, get_session_factory,
+    task_dependencies
+)
+
+# --- CONFIGURATION ---
+# Rows per round trip when streaming pending tasks from the database
+BATCH_FETCH_SIZE = 1000
+# TaskTable work type codes
+WORK_TYPE_CODES: Dict[WorkType, int] = {wt: code for code, wt in enumerate(WORK_TYPES)}
+
+
+def _load_pending_tasks(
+    session, start_window: datetime.datetime, end_window: datetime.datetime, fetch_size: int = BATCH_FETCH_SIZE
+) -> TaskTable:
+    """
+    Pending tasks as a TaskTable, streamed through a server-side cursor
+    `fetch_size` rows at a time straight into columns (no ORM objects),
+    followed by the window's occurrences of the active recurring tasks
+    """
+    query = (
+        select(TaskModel.id, TaskModel.title, TaskModel.estimated_minutes, TaskModel.priority,
+               TaskModel.deadline, TaskModel.work_type)
+        .where(TaskModel.is_completed == False)  # noqa: E712
+        .order_by(TaskModel.id)
+        .execution_options(yield_per=fetch_size)
+    )
+    ids, titles, minutes, priorities, deadlines, work_types = [], [], [], [], [], []
+    for rows in session.execute(query).partitions():
+        for row in rows:
+            ids.append(row.id)
+            titles.append(row.title)
+            minutes.append(row.estimated_minutes)
+            priorities.append(row.priority)
+            deadlines.append(epoch_seconds(row.deadline))
+            work_types.append(WORK_TYPE_CODES[WorkType(row.work_type.value)])
+    
+    # Predecessor ids per pending task; completed predecessors fall outside the table and count as done
+    depends_on = None
+    edges = session.execute(select(task_dependencies.c.task_id, task_dependencies.c.depends_on_id)).all()
+    if edges:
+        preds: Dict[int, List[int]] = {}
+        for task_id, dep_id in edges:
+            preds.setdefault(task_id, []).append(dep_id)
+        depends_on = [tuple(preds.get(task_id, ())) for task_id in ids]
+    
+    templates = [
+        RecurringTask(
+            id=t.id,
+            title=t.title,
+            estimated_minutes=t.estimated_minutes,
+            priority=t.priority,
+            rule=RecurrenceRule.parse(t.rrule),
+            dtstart=t.dtstart,
+            due_minutes=t.due_minutes,
+            work_type=WorkType(t.work_type.value)
+        )
+        for t in session.scalars(select(RecurringTaskModel).where(RecurringTaskModel.is_active == True))  # noqa: E712
+    ]
+    available_from = None
+    for task in expand_recurring(templates, start_window, end_window):
+        if available_from is None:
+            available_from = [0] * len(ids)
+        ids.append(task.id)
+        titles.append(task.title)
+        minutes.append(task.estimated_minutes)
+        priorities.append(task.priority)
+        deadlines.append(epoch_seconds(task.deadline))
+        work_types.append(WORK_TYPE_CODES[task.work_type])
+        available_from.append(epoch_minutes(task.available_from, round_up=True))
+        if depends_on is not None:
+            depends_on.append(())
+    return TaskTable(
+        ids, minutes, priorities, deadlines, work_types, titles=titles,
+        depends_on=depends_on, available_from=available_from
+    )
+
+
+def _create_batch_tables(engine) -> None:
+    """Tables added after the original schema, for databases created before them"""
+    with engine.begin() as conn:
+        task_dependencies.create(conn, checkfirst=True)
+        RecurringTaskModel.__table__.create(conn, checkfirst=True)
+        PlannedBlock.__table__.create(conn, checkfirst=True)
+
+
+def _store_plan(engine, schedule: List[ScheduledTask], planned_at: datetime.datetime) -> None:
+    """Replace the stored plan in one transaction: one DELETE, then batched multi-row INSERTs"""
+    rows = []
+    for s in schedule:
+        occurrence = occurrence_of(s.task.id)
+        rows.append({
+            "task_id": s.task.id if occurrence is None else None,
+            "recurring_task_id": occurrence[0] if occurrence is not None else None,
+            "occurrence_date": occurrence[1] if occurrence is not None else None,
+            "start_time": s.start_time,
+            "end_time": s.end_time,
+            "score": s.score,
+            "planned_at": planned_at,
+        })
+    with engine.begin() as conn:
+        conn.execute(delete(PlannedBlock))
+        if rows:
+            conn.execute(insert(PlannedBlock), rows)
+
+
+def run_batch(
+    database_urls: List[str],
+    start: datetime.datetime,
+    horizon_days: int = 7,
+    busy_blocks: Iterable = (),
+    daily_limits: Optional[Dict[WorkType, int]] = None,
+    budget_ms: Optional[float] = None,
+    workers: Optional[int] = None,
+    fetch_size: int = BATCH_FETCH_SIZE
+) -> Dict[str, dict]:
+    """
+    Plan the pending tasks of every database and store each plan
+    
+    Each database is one plan. Its tasks are streamed in and the run is
+    submitted to a process pool right away, so later databases load
+    while earlier plans optimize on other cores. Plans are written back as
+    they finish. Returns each database's schedule summary.
+    """
+    end = start + datetime.timedelta(days=horizon_days)
+    busy_index = IntervalIndex(HeuristicScheduler._busy_intervals(busy_blocks))
+    planned_at = datetime.datetime.now(datetime.timezone.utc)
+    summaries = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        runs = []
+        for url in database_urls:
+            engine = get_engine(url)
+            _create_batch_tables(engine)
+            with get_session_factory(engine)() as session:
+                table = _load_pending_tasks(session, start, end, fetch_size)
+            scheduler = HeuristicScheduler(busy_index, start, end, daily_limits=daily_limits)
+            runs.append((url, engine, scheduler, table, scheduler._dispatch(executor, table, budget_ms, 0)))
+        
+        for url, engine, scheduler, table, future in runs:
+            schedule = scheduler._collect(table, future.result())
+            _store_plan(engine, schedule, planned_at)
+            engine.dispose()
+            summaries[url] = scheduler.get_schedule_summary()
+    return summaries
+
+
+# --- CLI ---
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Plan pending tasks ahead of time and store the plans")
+    parser.add_argument("--database-url", action="append", dest="database_urls",
+                        help="database to plan (repeat for several; default: $DATABASE_URL)")
+    parser.add_argument("--horizon-days", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, help="local-search budget per plan")
+    parser.add_argument("--max-deep-work-hours", type=float,
+                        help="Deep Work allowed per day (default: no cap)")
+    parser.add_argument("--busy-file", help="JSON list of {start_time, end_time} busy blocks applied to every plan "
+                        "(users' calendars are not read)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--fetch-size", type=int, default=BATCH_FETCH_SIZE)
+    args = parser.parse_args(argv)
+    
+    database_urls = args.database_urls
+    if not database_urls:
+        from database import DATABASE_URL
+        database_urls = [DATABASE_URL]
+    busy_blocks = []
+    if args.busy_file:
+        with open(args.busy_file) as f:
+            busy_blocks = json.load(f)
+    daily_limits = None
+    if args.max_deep_work_hours is not None:
+        daily_limits = {WorkType.DEEP_WORK: int(args.max_deep_work_hours * 60)}
+    
+    started = time.perf_counter()
+    summaries = run_batch(
+        database_urls, datetime.datetime.now(datetime.timezone.utc), args.horizon_days, busy_blocks,
+        daily_limits, args.budget_ms, args.workers, args.fetch_size
+    )
+    for url, summary in summaries.items():
+        print(f"{url.rsplit('@', 1)[-1]}: {summary['total_tasks_scheduled']} tasks, "
+              f"{summary['total_minutes']} min planned")
+    print(f"✅ {len(summaries)} plan(s) stored in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+Benchmark suite for the Heuristic Scheduler
+
+Times each engine phase separately on seeded synthetic workloads
+(10 to 50,000 tasks, 0 to 5,000 busy blocks), writes the results as JSON
+and fails (exit code 1) when a phase regresses against a stored baseline.
+Timings are compared as ratios to a fixed calibration workload timed in
+the same run, so a baseline recorded on one machine holds on another.
+
+Usage:
+    python benchmark_engine.py                         # full grid, compare to benchmark_baseline.json
+    python benchmark_engine.py --quick                 # small grid for a fast check
+    python benchmark_engine.py --output results.json   # also write this run's results
+    python benchmark_engine.py --save-baseline         # record this run as the new baseline
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from heuristic_engine import HeuristicScheduler, Task, WorkType
+
+TASK_COUNTS = (10, 100, 1_000, 10_000, 50_000)
+BUSY_COUNTS = (0, 50, 500, 5_000)
+QUICK_TASK_COUNTS = (10, 1_000)
+QUICK_BUSY_COUNTS = (0, 500)
+
+PHASES = ("parse_busy_blocks", "find_free_gaps", "optimize_schedule", "get_schedule_summary")
+
+WINDOW_START = datetime.datetime(2026, 3, 2, 7, 0, tzinfo=datetime.timezone.utc)
+WINDOW_DAYS = 30
+CALIBRATION_SIZE = 100_000
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+
+# --- WORKLOAD GENERATOR ---
+def generate_tasks(count, seed=0, start=WINDOW_START, days=WINDOW_DAYS):
+    """Tasks with mixed durations, priorities, deadlines and work types"""
+    rnd = random.Random(seed)
+    return [
+        Task(
+            id=i,
+            title=f"Task {i}",
+            estimated_minutes=rnd.choice([15, 30, 45, 60, 90, 120, 180, 240]),
+            priority=rnd.randint(1, 10),
+            deadline=start + datetime.timedelta(minutes=rnd.randint(60, days * 24 * 60)),
+            work_type=rnd.choice(list(WorkType)),
+        )
+        for i in range(count)
+    ]
+
+
+def generate_busy_blocks(count, seed=0, start=WINDOW_START, days=WINDOW_DAYS):
+    """Calendar events as the API receives them (ISO strings), overlaps included"""
+    rnd = random.Random(seed)
+    blocks = []
+    for _ in range(count):
+        block_start = start + datetime.timedelta(minutes=rnd.randrange(0, days * 24 * 60, 5))
+        block_end = block_start + datetime.timedelta(minutes=rnd.choice([15, 30, 45, 60, 90, 120]))
+        blocks.append({"start_time": block_start.isoformat(), "end_time": block_end.isoformat()})
+    return blocks
+
+
+# --- TIMING ---
+def time_call(fn, repeats):
+    """Run fn once untimed (warm-up), then `repeats` times; return (timings in ms, last result)"""
+    result = fn()
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings, result
+
+
+def calibrate(repeats, seed):
+    """Fastest time (ms) of a fixed reference workload: a Python sort plus a numpy cumsum"""
+    rnd = random.Random(seed)
+    values = [rnd.random() for _ in range(CALIBRATION_SIZE)]
+    array = np.array(values)
+    timings, _ = time_call(lambda: (sorted(values), np.cumsum(array)), max(repeats, 5))
+    return min(timings)
+
+
+def repeats_for(task_count, busy_count, requested):
+    # Large cases are slow enough that a few runs give a stable median
+    return max(1, requested // 3) if task_count >= 10_000 or busy_count >= 5_000 else requested
+
+
+def run_case(task_count, busy_count, repeats, seed, calibration_ms):
+    tasks = generate_tasks(task_count, seed)
+    busy_blocks = generate_busy_blocks(busy_count, seed)
+    end_window = WINDOW_START + datetime.timedelta(days=WINDOW_DAYS)
+    scheduler = HeuristicScheduler(busy_blocks, WINDOW_START, end_window)
+    repeats = repeats_for(task_count, busy_count, repeats)
+
+    timings = {}
+    timings["parse_busy_blocks"], _ = time_call(lambda: scheduler._parse_busy_blocks(busy_blocks), repeats)
+    timings["find_free_gaps"], gaps = time_call(scheduler.find_free_gaps, repeats)
+    timings["optimize_schedule"], schedule = time_call(lambda: scheduler.optimize_schedule(tasks), repeats)
+    # The summary of the last optimize_schedule run, maintained during placement
+    timings["get_schedule_summary"], _ = time_call(scheduler.get_schedule_summary, repeats)
+
+    return [
+        {
+            "tasks": task_count,
+            "busy_blocks": busy_count,
+            "phase": phase,
+            "repeats": repeats,
+            "median_ms": statistics.median(timings[phase]),
+            "min_ms": min(timings[phase]),
+            "ratio": min(timings[phase]) / calibration_ms,
+            "free_gaps": len(gaps),
+            "scheduled": len(schedule),
+        }
+        for phase in PHASES
+    ]
+
+
+def run_suite(task_counts, busy_counts, repeats, seed):
+    calibration_ms = calibrate(repeats, seed)
+    print(f"calibration={calibration_ms:.2f}ms")
+    results = []
+    for task_count in task_counts:
+        for busy_count in busy_counts:
+            case = run_case(task_count, busy_count, repeats, seed, calibration_ms)
+            results.extend(case)
+            print(
+                f"tasks={task_count:>6} busy={busy_count:>5}  "
+                + "  ".join(f"{r['phase']}={r['median_ms']:.2f}ms" for r in case)
+            )
+    return {
+        "meta": {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "seed": seed,
+            "window_days": WINDOW_DAYS,
+            "calibration_ms": calibration_ms,
+        },
+        "results": results,
+    }
+
+
+# --- REGRESSION CHECK ---
+def case_key(result):
+    return f"{result['tasks']}/{result['busy_blocks']}/{result['phase']}"
+
+
+def baseline_of(run):
+    """What a regression check needs from a run: each case's ratio to the calibration, to 3 digits"""
+    return {
+        "meta": run["meta"],
+        "ratios": {case_key(r): float(f"{r['ratio']:.3g}") for r in run["results"]},
+    }
+
+
+def find_regressions(run, baseline, threshold, min_delta_ms):
+    """
+    Phases whose fastest run, relative to this run's calibration, got
+    slower than the baseline ratio * (1 + threshold). The minimum is the
+    least noisy statistic on a shared machine, and differences under
+    min_delta_ms (baseline scaled to this machine) are treated as timer
+    noise. Returns (result, baseline scaled to ms) pairs.
+    """
+    calibration_ms = run["meta"]["calibration_ms"]
+    regressions = []
+    for result in run["results"]:
+        before = baseline["ratios"].get(case_key(result))
+        if before is None:
+            continue
+        after = result["ratio"]
+        if after > before * (1 + threshold) and (after - before) * calibration_ms > min_delta_ms:
+            regressions.append((result, before * calibration_ms))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the heuristic scheduling engine")
+    parser.add_argument("--quick", action="store_true", help="run a small grid only")
+    parser.add_argument("--repeats", type=int, default=5, help="timed runs per phase")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write this run's results to a JSON file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="overwrite the baseline with this run")
+    parser.add_argument("--threshold", type=float, default=1.0,
+                        help="allowed slowdown as a fraction of the baseline (1.0 = twice as slow)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="ignore slowdowns smaller than this many milliseconds")
+    args = parser.parse_args(argv)
+
+    print("\n--- Benchmarking Heuristic Engine ---")
+    task_counts = QUICK_TASK_COUNTS if args.quick else TASK_COUNTS
+    busy_counts = QUICK_BUSY_COUNTS if args.quick else BUSY_COUNTS
+    run = run_suite(task_counts, busy_counts, args.repeats, args.seed)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(baseline_of(run), f, indent=2)
+        print(f"✅ Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; skipping regression check")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = find_regressions(run, baseline, args.threshold, args.min_delta_ms)
+    for result, before in regressions:
+        print(
+            f"❌ {result['phase']} tasks={result['tasks']} busy={result['busy_blocks']}: "
+            f"{result['min_ms']:.2f}ms vs baseline {before:.2f}ms (scaled to this machine)"
+        )
+    if regressions:
+        return 1
+    print(f"✅ No phase slower than baseline by more than {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,795 @@
+"""
+Google Calendar client helpers for Aevum Scheduler
+
+- BusyBlockCache: fetched calendar events cached per user, calendar set
+  and window, with a TTL and LRU eviction under a memory budget
+- CalendarSyncStore: local event copies kept current with Google sync
+  tokens, so a refresh downloads only what changed
+- fetch_freebusy: untitled busy intervals for many calendars in one
+  round trip, for callers that only need times
+- fetch_events: every page of the calendars' events, with only the
+  fields the scheduler reads
+- AsyncCalendarClient: the same fetches on asyncio, one request per
+  calendar in flight at once over a shared keep-alive connection pool
+"""
+import os
+import sys
+import asyncio
+import hashlib
+import datetime
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+try:
+    import httpx
+except ImportError:  # Only AsyncCalendarClient's default connection pool needs it
+    httpx = None
+
+
+# --- CONFIGURATION ---
+BUSY_CACHE_TTL_SECONDS = float(os.getenv("BUSY_CACHE_TTL_SECONDS", 300))
+BUSY_CACHE_MAX_BYTES = int(os.getenv("BUSY_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+# Windows are widened to this grid, so calls a few seconds apart share an entry
+BUSY_CACHE_WINDOW_MINUTES = 15
+# Incremental sync (events().list with syncToken) instead of re-listing the window
+CALENDAR_INCREMENTAL_SYNC = os.getenv("CALENDAR_INCREMENTAL_SYNC", "1") == "1"
+# Local calendar copies kept; the least recently synced are dropped first
+CALENDAR_SYNC_MAX_CALENDARS = int(os.getenv("CALENDAR_SYNC_MAX_CALENDARS", 256))
+# How far past its start a local copy reaches; later events (and the open-ended
+# tail of recurring series) are neither downloaded on a full sync nor stored.
+# Must exceed the longest window callers ask for, or every sync is a full one.
+CALENDAR_SYNC_LOOKAHEAD_DAYS = int(os.getenv("CALENDAR_SYNC_LOOKAHEAD_DAYS", 120))
+# Calendars one freebusy().query may ask about (Google's calendarExpansionMax limit)
+FREEBUSY_MAX_CALENDARS = 50
+# Requests one batch HTTP call may carry (Google's Calendar API batch limit)
+BATCH_MAX_REQUESTS = 50
+# Largest page events().list serves
+EVENTS_PAGE_SIZE = 2500
+# Partial responses: only what parse_event and the paging/sync logic read
+EVENT_FIELDS = "id,status,summary,start(dateTime,date),end(dateTime,date)"
+LIST_FIELDS = f"items({EVENT_FIELDS}),nextPageToken"
+SYNC_FIELDS = f"items({EVENT_FIELDS}),nextPageToken,nextSyncToken"
+CALENDAR_LIST_FIELDS = "items(id,summary,primary,backgroundColor),nextPageToken"
+# Async client: Calendar REST endpoint and the shared connection pool
+CALENDAR_API_URL = "https://www.googleapis.com/calendar/v3"
+GOOGLE_MAX_CONNECTIONS = int(os.getenv("GOOGLE_MAX_CONNECTIONS", 32))
+GOOGLE_KEEPALIVE_SECONDS = float(os.getenv("GOOGLE_KEEPALIVE_SECONDS", 60))
+GOOGLE_TIMEOUT_SECONDS = float(os.getenv("GOOGLE_TIMEOUT_SECONDS", 20))
+
+Event = Tuple[datetime.datetime, datetime.datetime, str]
+EventsByCalendar = Dict[str, List[Event]]
+CacheKey = Tuple[str, Tuple[str, ...], datetime.datetime, datetime.datetime, str]
+
+
+# --- EVENTS ---
+def google_time(moment: datetime.datetime) -> str:
+    """RFC 3339 UTC timestamp for timeMin/timeMax"""
+    return moment.astimezone(datetime.timezone.utc).replace(tzinfo=None).isoformat() + 'Z'
+
+
+def parse_event(item: dict) -> Optional[Event]:
+    """(start, end, title) of a Google event resource, None if it has no usable times"""
+    start = item.get('start', {}).get('dateTime')
+    end = item.get('end', {}).get('dateTime')
+    if not start:
+        # All-day event (YYYY-MM-DD strings): block the whole days
+        start_date = item.get('start', {}).get('date')
+        end_date = item.get('end', {}).get('date')
+        if start_date and end_date:
+            start = f"{start_date}T00:00:00Z"
+            end = f"{end_date}T23:59:59Z"
+    if not (start and end):
+        return None
+    try:
+        return (
+            datetime.datetime.fromisoformat(start.replace('Z', '+00:00')),
+            datetime.datetime.fromisoformat(end.replace('Z', '+00:00')),
+            item.get('summary', 'Busy')
+        )
+    except ValueError:
+        return None
+
+
+# --- CACHE KEYS ---
+def user_key(credentials: dict) -> str:
+    """
+    Stable, non-secret identity for a session's Google credentials: a hash
+    of the refresh token (which survives access-token refreshes)
+    """
+    secret = credentials.get("refresh_token") or credentials.get("token") or ""
+    return hashlib.sha256(secret.encode()).hexdigest()[:32]
+
+
+def cache_window(
+    start: datetime.datetime, end: datetime.datetime, grid_minutes: int = BUSY_CACHE_WINDOW_MINUTES
+) -> Tuple[datetime.datetime, datetime.datetime]:
+    """Widen [start, end) outward to the grid (in UTC)"""
+    grid = datetime.timedelta(minutes=grid_minutes)
+    epoch = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+    start = start.astimezone(datetime.timezone.utc) if start.tzinfo else start.replace(tzinfo=datetime.timezone.utc)
+    end = end.astimezone(datetime.timezone.utc) if end.tzinfo else end.replace(tzinfo=datetime.timezone.utc)
+    return epoch + (start - epoch) // grid * grid, epoch + -((epoch - end) // grid) * grid
+
+
+def clip_events(
+    events_by_calendar: EventsByCalendar, start: datetime.datetime, end: datetime.datetime
+) -> EventsByCalendar:
+    """Only the events overlapping [start, end)"""
+    return {
+        cal_id: [ev for ev in events if ev[1] > start and ev[0] < end]
+        for cal_id, events in events_by_calendar.items()
+    }
+
+
+# --- BUSY BLOCK CACHE ---
+# Rough per-object sizes for the memory budget: a 3-tuple plus two aware datetimes
+_EVENT_BYTES = 64 + 2 * 48
+_ENTRY_BYTES = 256
+
+
+def _estimate_bytes(events_by_calendar: EventsByCalendar) -> int:
+    size = _ENTRY_BYTES
+    for cal_id, events in events_by_calendar.items():
+        size += sys.getsizeof(cal_id) + sys.getsizeof(events)
+        size += sum(_EVENT_BYTES + sys.getsizeof(ev[2]) for ev in events)
+    return size
+
+
+class BusyBlockCache:
+    """
+    TTL + LRU cache of fetched calendar events
+
+    Keyed by (user, sorted calendar ids, window start, window end, source),
+    where source tells titled events from freebusy intervals; see key().
+    Entries expire `ttl_seconds` after they are stored and the
+    least recently used ones are evicted once the estimated size of all
+    entries passes `max_bytes`. Thread-safe; sync routes share it from
+    FastAPI's thread pool.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = BUSY_CACHE_TTL_SECONDS,
+        max_bytes: int = BUSY_CACHE_MAX_BYTES,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (expires at, estimated bytes, events); oldest use first
+        self._entries: "OrderedDict[CacheKey, Tuple[float, int, EventsByCalendar]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def key(
+        user: str,
+        calendar_ids: Iterable[str],
+        start: datetime.datetime,
+        end: datetime.datetime,
+        source: str = "events"
+    ) -> CacheKey:
+        return user, tuple(sorted(set(calendar_ids))), start, end, source
+
+    def get(self, key: CacheKey) -> Optional[EventsByCalendar]:
+        """Cached events for `key`, or None (a miss) if absent or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self._clock():
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key: CacheKey, events_by_calendar: EventsByCalendar) -> None:
+        """Store events, evicting least recently used entries to stay within budget"""
+        size = _estimate_bytes(events_by_calendar)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if size > self.max_bytes:
+                return  # Would evict everything else and still not fit
+            self._entries[key] = (self._clock() + self.ttl_seconds, size, events_by_calendar)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, user: Optional[str] = None, calendar_id: Optional[str] = None) -> int:
+        """Drop the entries of `user` and/or including `calendar_id` (all by default); returns how many"""
+        with self._lock:
+            stale = [
+                key for key in self._entries
+                if (user is None or key[0] == user) and (calendar_id is None or calendar_id in key[1])
+            ]
+            for key in stale:
+                self._drop(key)
+            return len(stale)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, key: CacheKey) -> None:
+        self.bytes -= self._entries.pop(key)[1]
+
+
+# --- PAGED EVENT FETCH ---
+def _execute_batched(service, requests: List[Tuple[str, object]], callback: Callable) -> None:
+    """Send (request_id, request) pairs as batch requests of at most BATCH_MAX_REQUESTS each"""
+    for i in range(0, len(requests), BATCH_MAX_REQUESTS):
+        batch = service.new_batch_http_request(callback=callback)
+        for request_id, request in requests[i:i + BATCH_MAX_REQUESTS]:
+            batch.add(request, request_id=request_id)
+        batch.execute()
+
+
+def fetch_events(
+    service, calendar_ids: List[str], start: datetime.datetime, end: datetime.datetime
+) -> Tuple[EventsByCalendar, List[str]]:
+    """
+    Events of the calendars over [start, end) via events().list, every page
+
+    Each round sends the next page of every calendar that has one in
+    batch requests of up to BATCH_MAX_REQUESTS, asking only for the fields parse_event reads
+    (fields=). Pages are parsed into (start, end, title) tuples in the
+    batch callback as they arrive, so no raw items are kept around.
+    Returns (events by calendar in start order, ids of the calendars
+    that failed).
+    """
+    events_by_calendar: EventsByCalendar = {cal_id: [] for cal_id in calendar_ids}
+    page_tokens: Dict[str, Optional[str]] = {cal_id: None for cal_id in calendar_ids}
+    failed: List[str] = []
+
+    def callback(request_id, response, exception):
+        if exception is not None:
+            print(f"Error fetching calendar {request_id}: {exception}")
+            failed.append(request_id)
+            del page_tokens[request_id]
+            return
+        append = events_by_calendar[request_id].append
+        for item in response.get('items', ()):
+            event = parse_event(item)
+            if event is not None:
+                append(event)
+        if response.get('nextPageToken'):
+            page_tokens[request_id] = response['nextPageToken']
+        else:
+            del page_tokens[request_id]
+
+    while page_tokens:
+        requests = []
+        for cal_id, page_token in list(page_tokens.items()):
+            params = {
+                "calendarId": cal_id,
+                "timeMin": google_time(start),
+                "timeMax": google_time(end),
+                "singleEvents": True,
+                "orderBy": "startTime",
+                "maxResults": EVENTS_PAGE_SIZE,
+                "fields": LIST_FIELDS,
+            }
+            if page_token:
+                params["pageToken"] = page_token
+            requests.append((cal_id, service.events().list(**params)))
+        _execute_batched(service, requests, callback)
+    return events_by_calendar, failed
+
+
+# --- INCREMENTAL SYNC ---
+class _SyncedCalendar:
+    """Local copy of one calendar's events ending after `since` and starting before `until`, and its nextSyncToken"""
+    __slots__ = ("since", "until", "sync_token", "events")
+
+    def __init__(
+        self, since: datetime.datetime, until: datetime.datetime, sync_token: str, events: Dict[str, Event]
+    ):
+        self.since = since
+        self.until = until
+        self.sync_token = sync_token
+        self.events = events
+
+    def covers(self, start: datetime.datetime, end: datetime.datetime) -> bool:
+        return self.since <= start and end <= self.until
+
+    def prune(self, start: datetime.datetime) -> None:
+        """Forget events over before `start`; the copy then covers `start` on"""
+        if start > self.since:
+            self.events = {event_id: ev for event_id, ev in self.events.items() if ev[1] > start}
+            self.since = start
+
+
+class _SyncJob:
+    """One calendar's paged events().list run: a full sync or the changes since a token"""
+    __slots__ = (
+        "calendar_id", "since", "until", "sync_token", "page_token", "changes", "next_sync_token", "items", "done"
+    )
+
+    def __init__(
+        self,
+        calendar_id: str,
+        since: datetime.datetime,
+        until: datetime.datetime,
+        sync_token: Optional[str] = None
+    ):
+        self.calendar_id = calendar_id
+        self.since = since
+        self.until = until
+        self.sync_token = sync_token  # None = full sync
+        self.page_token: Optional[str] = None
+        self.changes: Dict[str, Optional[Event]] = {}  # Event id -> event, None = deleted
+        self.next_sync_token: Optional[str] = None
+        self.items = 0
+        self.done = False
+
+    @property
+    def full(self) -> bool:
+        return self.sync_token is None
+
+    def params(self) -> dict:
+        """events().list parameters of the next page (calendarId aside)"""
+        params = {"singleEvents": True, "maxResults": EVENTS_PAGE_SIZE, "fields": SYNC_FIELDS}
+        if self.full:
+            # syncToken forbids timeMin/timeMax and orderBy, so only the full listing is bounded
+            params["timeMin"] = google_time(self.since)
+            params["timeMax"] = google_time(self.until)
+        else:
+            params["syncToken"] = self.sync_token
+        if self.page_token:
+            params["pageToken"] = self.page_token
+        return params
+
+    def request(self, service):
+        return service.events().list(calendarId=self.calendar_id, **self.params())
+
+    def absorb(self, response: dict) -> None:
+        for item in response.get('items', []):
+            self.items += 1
+            event = None if item.get('status') == 'cancelled' else parse_event(item)
+            if event is not None and event[0] >= self.until:
+                event = None  # Changes past the look-ahead are not kept (moved out = deleted)
+            self.changes[item['id']] = event
+        self.page_token = response.get('nextPageToken')
+        if not self.page_token:
+            self.next_sync_token = response.get('nextSyncToken')
+            self.done = True
+
+
+class CalendarSyncStore:
+    """
+    Per-(user, calendar) local event copies kept current with sync tokens
+
+    The first sync of a calendar lists its events from the window start
+    to `lookahead_days` later and keeps the nextSyncToken from the last
+    page. Later syncs send that token and get only the events changed or
+    deleted since; changes past the look-ahead are dropped, so a copy
+    never holds more than that stretch. A window reaching past the copy
+    (or starting before it) needs a new full sync. A 410 GONE (token
+    expired) drops the copy and falls back to a full resync. All
+    calendars' pages go out in one batch request per round.
+    """
+
+    def __init__(
+        self,
+        max_calendars: int = CALENDAR_SYNC_MAX_CALENDARS,
+        lookahead_days: int = CALENDAR_SYNC_LOOKAHEAD_DAYS
+    ):
+        self.max_calendars = max_calendars
+        self.lookahead = datetime.timedelta(days=lookahead_days)
+        self._lock = threading.Lock()
+        self._calendars: "OrderedDict[Tuple[str, str], _SyncedCalendar]" = OrderedDict()
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+        self.expired_tokens = 0
+        self.items_received = 0
+
+    def sync(
+        self,
+        service,
+        user: str,
+        calendar_ids: Iterable[str],
+        start: datetime.datetime,
+        end: Optional[datetime.datetime] = None
+    ) -> Tuple[EventsByCalendar, List[str]]:
+        """
+        Bring the calendars' copies of [start, end) up to date and return
+        their events (sorted; the copy may reach past `end`), plus the ids
+        of calendars that failed
+        """
+        jobs = self._plan(user, calendar_ids, start, end)
+        failed = self._run(service, jobs, start)
+        events_by_calendar, stale = self._commit(user, jobs, failed, start)
+        if stale:
+            jobs = {cal_id: self._full_job(cal_id, start, end) for cal_id in stale}
+            failed += self._run(service, jobs, start)
+            events_by_calendar.update(self._commit(user, jobs, failed, start)[0])
+        return events_by_calendar, failed
+
+    def _run(self, service, jobs: Dict[str, _SyncJob], start: datetime.datetime) -> List[str]:
+        """Page every job to the end, batched requests per round; returns the calendars that failed"""
+        failed: List[str] = []
+        active = list(jobs.values())
+        while active:
+            def callback(request_id, response, exception):
+                job = jobs[request_id]
+                if exception is None:
+                    job.absorb(response)
+                elif not job.full and getattr(getattr(exception, 'resp', None), 'status', None) == 410:
+                    jobs[request_id] = self._restart(job, start)
+                else:
+                    print(f"Error syncing calendar {request_id}: {exception}")
+                    failed.append(request_id)
+
+            _execute_batched(service, [(job.calendar_id, job.request(service)) for job in active], callback)
+            active = [job for cal_id, job in jobs.items() if cal_id not in failed and not job.done]
+        return failed
+
+    def _plan(
+        self, user: str, calendar_ids: Iterable[str], start: datetime.datetime, end: Optional[datetime.datetime]
+    ) -> Dict[str, _SyncJob]:
+        """A sync job per calendar: incremental if its copy covers [start, end), full otherwise"""
+        jobs: Dict[str, _SyncJob] = {}
+        with self._lock:
+            for cal_id in calendar_ids:
+                synced = self._calendars.get((user, cal_id))
+                if synced is None or not synced.covers(start, end or start):
+                    jobs[cal_id] = self._full_job(cal_id, start, end)
+                else:
+                    jobs[cal_id] = _SyncJob(cal_id, synced.since, synced.until, synced.sync_token)
+        return jobs
+
+    def _full_job(self, calendar_id: str, start: datetime.datetime, end: Optional[datetime.datetime]) -> _SyncJob:
+        return _SyncJob(calendar_id, start, max(start + self.lookahead, end or start))
+
+    def _restart(self, job: _SyncJob, start: datetime.datetime) -> _SyncJob:
+        """The full sync replacing `job`, whose sync token expired (410 GONE)"""
+        with self._lock:
+            self.expired_tokens += 1
+        return self._full_job(job.calendar_id, start, job.until)
+
+    def _commit(
+        self, user: str, jobs: Dict[str, _SyncJob], failed: List[str], start: datetime.datetime
+    ) -> Tuple[EventsByCalendar, List[str]]:
+        """
+        Fold finished jobs into the local copies; returns each calendar's
+        events (failed ones empty) and the calendars whose incremental
+        changes were discarded because their copy was dropped (evicted or
+        invalidated) mid-sync. Those need a full sync: a delta is no copy.
+        """
+        events_by_calendar: EventsByCalendar = {}
+        stale: List[str] = []
+        with self._lock:
+            for cal_id, job in jobs.items():
+                if cal_id in failed:
+                    events_by_calendar[cal_id] = []
+                    continue
+                self.items_received += job.items
+                key = (user, cal_id)
+                if job.full:
+                    self.full_syncs += 1
+                    events = {event_id: ev for event_id, ev in job.changes.items() if ev is not None}
+                    synced = _SyncedCalendar(job.since, job.until, job.next_sync_token, events)
+                    self._calendars[key] = synced
+                else:
+                    synced = self._calendars.get(key)
+                    if synced is None:
+                        stale.append(cal_id)
+                        continue
+                    self.incremental_syncs += 1
+                    # A copy another sync already moved past this job's token is newer than the delta
+                    if synced.sync_token == job.sync_token:
+                        for event_id, ev in job.changes.items():
+                            if ev is None:
+                                synced.events.pop(event_id, None)
+                            else:
+                                synced.events[event_id] = ev
+                        synced.sync_token = job.next_sync_token
+                self._calendars.move_to_end(key)
+                synced.prune(start)
+                events_by_calendar[cal_id] = sorted(synced.events.values())
+            while len(self._calendars) > self.max_calendars:
+                self._calendars.popitem(last=False)
+        return events_by_calendar, stale
+
+    def invalidate(self, user: Optional[str] = None, calendar_id: Optional[str] = None) -> int:
+        """Drop local copies (of `user` and/or `calendar_id`); the next sync lists them in full"""
+        with self._lock:
+            stale = [
+                key for key in self._calendars
+                if (user is None or key[0] == user) and (calendar_id is None or key[1] == calendar_id)
+            ]
+            for key in stale:
+                del self._calendars[key]
+            return len(stale)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calendars": len(self._calendars),
+                "events": sum(len(synced.events) for synced in self._calendars.values()),
+                "full_syncs": self.full_syncs,
+                "incremental_syncs": self.incremental_syncs,
+                "expired_tokens": self.expired_tokens,
+                "items_received": self.items_received,
+            }
+
+
+# --- FREEBUSY ---
+def parse_freebusy(response: dict) -> Tuple[EventsByCalendar, List[str]]:
+    """Busy intervals per calendar of a freebusy response (titled "Busy"), and the calendars with errors"""
+    events_by_calendar: EventsByCalendar = {}
+    failed: List[str] = []
+    for cal_id, calendar in response.get('calendars', {}).items():
+        if calendar.get('errors'):
+            print(f"Error fetching free/busy for {cal_id}: {calendar['errors']}")
+            failed.append(cal_id)
+            continue
+        events_by_calendar[cal_id] = [
+            (
+                datetime.datetime.fromisoformat(block['start'].replace('Z', '+00:00')),
+                datetime.datetime.fromisoformat(block['end'].replace('Z', '+00:00')),
+                "Busy"
+            )
+            for block in calendar.get('busy', [])
+        ]
+    return events_by_calendar, failed
+
+
+def fetch_freebusy(
+    service, calendar_ids: List[str], start: datetime.datetime, end: datetime.datetime
+) -> Tuple[EventsByCalendar, List[str]]:
+    """
+    Busy intervals of the calendars over [start, end) via freebusy().query
+
+    Google merges each calendar's events server-side and sends back only
+    start/end pairs, so the response size follows the number of busy
+    stretches, not of events. Up to FREEBUSY_MAX_CALENDARS calendars go in
+    one query; more are split into queries sent as batch requests, so it
+    is a single round trip up to BATCH_MAX_REQUESTS queries. Returns (intervals by calendar,
+    ids of the calendars that failed).
+    """
+    chunks = [calendar_ids[i:i + FREEBUSY_MAX_CALENDARS] for i in range(0, len(calendar_ids), FREEBUSY_MAX_CALENDARS)]
+    queries = [
+        service.freebusy().query(body={
+            "timeMin": google_time(start),
+            "timeMax": google_time(end),
+            "items": [{"id": cal_id} for cal_id in chunk],
+        })
+        for chunk in chunks
+    ]
+    events_by_calendar: EventsByCalendar = {cal_id: [] for cal_id in calendar_ids}
+    failed: List[str] = []
+    if len(queries) == 1:
+        responses = [queries[0].execute()]
+    else:
+        responses = []
+
+        def callback(request_id, response, exception):
+            if exception is not None:
+                print(f"Error fetching free/busy batch {request_id}: {exception}")
+                failed.extend(chunks[int(request_id)])
+            else:
+                responses.append(response)
+
+        _execute_batched(service, [(str(i), query) for i, query in enumerate(queries)], callback)
+
+    for response in responses:
+        events, errors = parse_freebusy(response)
+        events_by_calendar.update(events)
+        failed.extend(errors)
+    return events_by_calendar, failed
+
+
+# --- ASYNC CLIENT ---
+class GoogleAPIError(Exception):
+    """A non-2xx Calendar API response"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{status} {message}")
+        self.status = status
+
+
+class AsyncCalendarClient:
+    """
+    asyncio Google Calendar client over one shared keep-alive connection pool
+
+    Calls the REST API directly instead of googleapiclient, so a fetch
+    awaits Google instead of holding a threadpool worker for the round
+    trip. Every calendar is fetched by its own request (following its
+    pages in turn), all calendars at once; freebusy lists longer than
+    FREEBUSY_MAX_CALENDARS go out as concurrent queries. The slowest
+    calendar, not the sum of them, sets the latency. At most
+    max_connections requests are in flight, so none waits on the pool.
+
+    `http` is anything with httpx.AsyncClient's get/post; by default one
+    is created on first use and kept until aclose().
+    """
+
+    def __init__(self, http=None, max_connections: int = GOOGLE_MAX_CONNECTIONS):
+        self.max_connections = max_connections
+        self._http = http
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def http(self):
+        if self._http is None:
+            if httpx is None:
+                raise RuntimeError("AsyncCalendarClient needs httpx (pip install httpx)")
+            self._http = httpx.AsyncClient(
+                base_url=CALENDAR_API_URL,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=GOOGLE_KEEPALIVE_SECONDS,
+                ),
+                timeout=GOOGLE_TIMEOUT_SECONDS,
+            )
+        return self._http
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def _call(self, creds, method: str, path: str, **kwargs) -> dict:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_connections)
+        if not creds.valid:
+            # google-auth refreshes synchronously; rare enough for a worker thread
+            from google.auth.transport.requests import Request as AuthRequest
+            await asyncio.to_thread(creds.refresh, AuthRequest())
+        headers = {"Authorization": f"Bearer {creds.token}"}
+        async with self._slots:
+            response = await getattr(self.http, method)(path, headers=headers, **kwargs)
+        if response.status_code >= 400:
+            raise GoogleAPIError(response.status_code, response.text[:200])
+        return response.json()
+
+    async def _get(self, creds, path: str, params: dict) -> dict:
+        params = {key: ("true" if value is True else value) for key, value in params.items()}
+        return await self._call(creds, "get", path, params=params)
+
+    async def list_calendars(self, creds) -> List[dict]:
+        """The user's calendarList entries (id, summary, primary, backgroundColor), every page"""
+        calendars: List[dict] = []
+        params = {"fields": CALENDAR_LIST_FIELDS}
+        while True:
+            response = await self._get(creds, "/users/me/calendarList", params)
+            calendars.extend(response.get('items', []))
+            if not response.get('nextPageToken'):
+                return calendars
+            params["pageToken"] = response['nextPageToken']
+
+    async def fetch_events(
+        self, creds, calendar_ids: List[str], start: datetime.datetime, end: datetime.datetime
+    ) -> Tuple[EventsByCalendar, List[str]]:
+        """fetch_events with every calendar's pages fetched concurrently"""
+        events_by_calendar: EventsByCalendar = {cal_id: [] for cal_id in calendar_ids}
+        failed: List[str] = []
+
+        async def fetch_calendar(cal_id: str) -> None:
+            params = {
+                "timeMin": google_time(start),
+                "timeMax": google_time(end),
+                "singleEvents": True,
+                "orderBy": "startTime",
+                "maxResults": EVENTS_PAGE_SIZE,
+                "fields": LIST_FIELDS,
+            }
+            append = events_by_calendar[cal_id].append
+            try:
+                while True:
+                    response = await self._get(creds, f"/calendars/{quote(cal_id, safe='')}/events", params)
+                    for item in response.get('items', ()):
+                        event = parse_event(item)
+                        if event is not None:
+                            append(event)
+                    if not response.get('nextPageToken'):
+                        return
+                    params["pageToken"] = response['nextPageToken']
+            except Exception as e:
+                print(f"Error fetching calendar {cal_id}: {e}")
+                events_by_calendar[cal_id] = []
+                failed.append(cal_id)
+
+        await asyncio.gather(*(fetch_calendar(cal_id) for cal_id in calendar_ids))
+        return events_by_calendar, failed
+
+    async def fetch_freebusy(
+        self, creds, calendar_ids: List[str], start: datetime.datetime, end: datetime.datetime
+    ) -> Tuple[EventsByCalendar, List[str]]:
+        """fetch_freebusy with the FREEBUSY_MAX_CALENDARS-sized queries sent concurrently"""
+        chunks = [
+            calendar_ids[i:i + FREEBUSY_MAX_CALENDARS] for i in range(0, len(calendar_ids), FREEBUSY_MAX_CALENDARS)
+        ]
+        events_by_calendar: EventsByCalendar = {cal_id: [] for cal_id in calendar_ids}
+        failed: List[str] = []
+
+        async def query(chunk: List[str]) -> None:
+            body = {
+                "timeMin": google_time(start),
+                "timeMax": google_time(end),
+                "items": [{"id": cal_id} for cal_id in chunk],
+            }
+            try:
+                response = await self._call(creds, "post", "/freeBusy", json=body)
+            except Exception as e:
+                print(f"Error fetching free/busy for {len(chunk)} calendars: {e}")
+                failed.extend(chunk)
+                return
+            events, errors = parse_freebusy(response)
+            events_by_calendar.update(events)
+            failed.extend(errors)
+
+        await asyncio.gather(*(query(chunk) for chunk in chunks))
+        return events_by_calendar, failed
+
+    async def sync(
+        self,
+        store: CalendarSyncStore,
+        creds,
+        user: str,
+        calendar_ids: Iterable[str],
+        start: datetime.datetime,
+        end: Optional[datetime.datetime] = None
+    ) -> Tuple[EventsByCalendar, List[str]]:
+        """CalendarSyncStore.sync with every calendar's pages fetched concurrently"""
+        jobs = store._plan(user, calendar_ids, start, end)
+        failed = await self._run_sync_jobs(store, creds, jobs, start)
+        events_by_calendar, stale = store._commit(user, jobs, failed, start)
+        if stale:
+            jobs = {cal_id: store._full_job(cal_id, start, end) for cal_id in stale}
+            failed += await self._run_sync_jobs(store, creds, jobs, start)
+            events_by_calendar.update(store._commit(user, jobs, failed, start)[0])
+        return events_by_calendar, failed
+
+    async def _run_sync_jobs(
+        self, store: CalendarSyncStore, creds, jobs: Dict[str, _SyncJob], start: datetime.datetime
+    ) -> List[str]:
+        """Page every job to the end, calendars concurrently; returns the calendars that failed"""
+        failed: List[str] = []
+
+        async def sync_calendar(cal_id: str) -> None:
+            while not jobs[cal_id].done:
+                job = jobs[cal_id]
+                try:
+                    job.absorb(await self._get(creds, f"/calendars/{quote(cal_id, safe='')}/events", job.params()))
+                except GoogleAPIError as e:
+                    if job.full or e.status != 410:
+                        print(f"Error syncing calendar {cal_id}: {e}")
+                        failed.append(cal_id)
+                        return
+                    jobs[cal_id] = store._restart(job, start)
+                except Exception as e:
+                    print(f"Error syncing calendar {cal_id}: {e}")
+                    failed.append(cal_id)
+                    return
+
+        await asyncio.gather(*(sync_calendar(cal_id) for cal_id in list(jobs)))
+        return failed
@@ -4,12 +4,42 @@ Features:
 - Time-of-Day Multipliers (Morning bias for Deep Work, Afternoon for Shallow Work)
 - Priority-based scoring
 - Deadline urgency calculation
+- Duration-indexed candidate selection
+- Columnar TaskTable with vectorized (NumPy) scoring
+- Incremental schedule repair for long-lived callers (IncrementalScheduler; library only)
+- Bisect-searchable busy interval index (IntervalIndex)
+- Minute-resolution availability bitmap (AvailabilityBitmap)
+- Anytime local-search improvement within a latency budget
+- Integer epoch-minute time math with slotted, frozen value types
+- Streaming placements in chronological order (iter_schedule)
+- Per-phase timing/counter hooks (MetricsSink) and a process-wide registry
+- Lazily produced free gaps, so long horizons cost only what gets used
+- Per-day, per-WorkType capacity limits (e.g. 4h of Deep Work a day)
+- Running schedule summary (ScheduleSummary), kept up to date as tasks are placed
+- What-if scenarios over shared, precomputed free gaps (evaluate_scenario(s))
+- Dependency-aware scheduling (Task.depends_on) with a topological ready queue
+- O(n log n) deadline feasibility pre-check (check_deadlines)
+- Runs offloaded to a process pool with compact inputs (optimize_in_pool)
+- Recurring task templates (RRULE subset), expanded lazily within the window
 """
+import bisect
+import concurrent.futures
+import contextlib
+import dataclasses
 import datetime
+import functools
+import heapq
+import itertools
+import math
+import random
+import threading
+import time
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
 from enum import Enum
 
+import numpy as np
+
 
 # --- WORK TYPE ENUM ---
 class WorkType(Enum):
@@ -17,8 +47,72 @@ class WorkType(Enum):
     SHALLOW_WORK = "Shallow Work"
 
 
+# --- SCORING ---
+# Time-of-Day Multipliers, indexed by the block's starting hour:
+# - Before 12:00 PM: Deep Work gets 1.5x boost
+# - After 4:00 PM: Shallow Work gets 1.5x boost
+TIME_OF_DAY_MULTIPLIERS: Dict[WorkType, Tuple[float, ...]] = {
+    WorkType.DEEP_WORK: tuple(1.5 if hour < 12 else 1.0 for hour in range(24)),
+    WorkType.SHALLOW_WORK: tuple(1.5 if hour >= 16 else 1.0 for hour in range(24)),
+}
+
+
+# Row i holds the multipliers for WORK_TYPES[i] (the TaskTable int8 code)
+WORK_TYPES: Tuple[WorkType, ...] = tuple(WorkType)
+_WORK_TYPE_CODES: Dict[WorkType, int] = {wt: code for code, wt in enumerate(WORK_TYPES)}
+_MULTIPLIER_ROWS = tuple(TIME_OF_DAY_MULTIPLIERS[wt] for wt in WORK_TYPES)
+_MULTIPLIER_MATRIX = np.array(_MULTIPLIER_ROWS, dtype=np.float64)
+
+
+def time_of_day_multiplier(work_type: WorkType, time_block_hour: Optional[int]) -> float:
+    """Look up the Time-of-Day Multiplier (1.0 when no hour is given)"""
+    if time_block_hour is None:
+        return 1.0
+    return TIME_OF_DAY_MULTIPLIERS[work_type][time_block_hour]
+
+
+def epoch_seconds(moment: datetime.datetime) -> float:
+    """POSIX timestamp of a datetime; naive values are assumed to be UTC"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return moment.timestamp()
+
+
+# --- EPOCH MINUTES ---
+# The engine works in whole minutes since the epoch (plain ints). Datetimes
+# are converted on the way in and out only, with busy time rounded outward
+# and scheduling windows rounded inward.
+def epoch_minutes(moment: datetime.datetime, round_up: bool = False) -> int:
+    """Whole minutes since the epoch, rounded down (or up)"""
+    minutes = epoch_seconds(moment) / 60
+    return math.ceil(minutes) if round_up else math.floor(minutes)
+
+
+def utc_offset_minutes(tz: Optional[datetime.tzinfo], minute: int) -> int:
+    """UTC offset of a zone at an epoch minute (naive/None means UTC)"""
+    if tz is None:
+        return 0
+    if isinstance(tz, datetime.timezone):
+        offset = tz.utcoffset(None)
+    else:
+        offset = datetime.datetime.fromtimestamp(minute * 60, tz).utcoffset()
+    return int(offset.total_seconds() // 60)
+
+
+@functools.lru_cache(maxsize=None)
+def _fixed_zone(utc_offset: int) -> datetime.timezone:
+    if utc_offset == 0:
+        return datetime.timezone.utc
+    return datetime.timezone(datetime.timedelta(minutes=utc_offset))
+
+
+def from_epoch_minutes(minute: int, utc_offset: int = 0) -> datetime.datetime:
+    """Aware datetime for an epoch minute, shown at a fixed UTC offset"""
+    return datetime.datetime.fromtimestamp(minute * 60, _fixed_zone(utc_offset))
+
+
 # --- DATA STRUCTURES ---
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Task:
     id: int
     title: str
@@ -26,68 +120,1552 @@ class Task:
     priority: int  # 1 (Low) to 10 (Critical)
     deadline: datetime.datetime
     work_type: WorkType = WorkType.DEEP_WORK
+    depends_on: Tuple[int, ...] = ()  # Ids of tasks that must finish first
+    available_from: Optional[datetime.datetime] = None  # Must not start earlier (recurring occurrences)
     
-    def heuristic_score(self, time_block_hour: Optional[int] = None) -> float:
+    def base_urgency(self, now: datetime.datetime) -> float:
         """
-        Calculate heuristic score with Time-of-Day Multiplier
+        Priority / Time_Remaining_in_Hours, measured from a fixed `now`
         
-        Score = (Priority / Time_Remaining_in_Hours) * Time_of_Day_Multiplier
-        
-        Time-of-Day Multipliers:
-        - Before 12:00 PM: Deep Work gets 1.5x boost
-        - After 4:00 PM: Shallow Work gets 1.5x boost
+        This is the time-independent part of heuristic_score; the scheduler
+        computes it once per task per run.
         """
-        # Ensure we compare timezone-aware datetimes
-        now = datetime.datetime.now(datetime.timezone.utc)
-        
-        # If deadline is naive, assume UTC
-        deadline = self.deadline
-        if deadline.tzinfo is None:
-            deadline = deadline.replace(tzinfo=datetime.timezone.utc)
-            
-        time_remaining = deadline - now
-        hours_remaining = time_remaining.total_seconds() / 3600
+        hours_remaining = (epoch_seconds(self.deadline) - epoch_seconds(now)) / 3600
         
         # Clamp denominator to avoid division by zero
         safe_hours = max(0.1, hours_remaining)
-        base_score = self.priority / safe_hours
+        return self.priority / safe_hours
+    
+    def heuristic_score(
+        self, 
+        time_block_hour: Optional[int] = None, 
+        now: Optional[datetime.datetime] = None
+    ) -> float:
+        """
+        Calculate heuristic score with Time-of-Day Multiplier
         
-        # Apply Time-of-Day Multiplier
-        multiplier = 1.0
-        if time_block_hour is not None:
-            if time_block_hour < 12:
-                # Morning: Boost Deep Work
-                if self.work_type == WorkType.DEEP_WORK:
-                    multiplier = 1.5
-            elif time_block_hour >= 16:
-                # After 4 PM: Boost Shallow Work
-                if self.work_type == WorkType.SHALLOW_WORK:
-                    multiplier = 1.5
+        Score = (Priority / Time_Remaining_in_Hours) * Time_of_Day_Multiplier
         
-        return base_score * multiplier
+        `now` defaults to the current UTC time; pass the run's snapshot to
+        get reproducible scores. See TIME_OF_DAY_MULTIPLIERS for the boosts.
+        """
+        if now is None:
+            now = datetime.datetime.now(datetime.timezone.utc)
+        
+        return self.base_urgency(now) * time_of_day_multiplier(self.work_type, time_block_hour)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class TimeSlot:
-    start: datetime.datetime
-    end: datetime.datetime
+    """
+    Half-open span [start_minute, end_minute) of epoch minutes
+    
+    utc_offset (minutes) is the zone the slot is shown in: it sets the
+    local hour for time-of-day multipliers and the start/end datetimes.
+    """
+    start_minute: int
+    end_minute: int
+    utc_offset: int = 0
+    
+    @classmethod
+    def from_datetimes(cls, start: datetime.datetime, end: datetime.datetime) -> "TimeSlot":
+        """Slot covering start..end, rounded outward to whole minutes"""
+        start_minute = epoch_minutes(start)
+        return cls(
+            start_minute,
+            epoch_minutes(end, round_up=True),
+            utc_offset_minutes(start.tzinfo, start_minute)
+        )
     
     @property
-    def duration_minutes(self) -> float:
-        return (self.end - self.start).total_seconds() / 60
+    def start(self) -> datetime.datetime:
+        return from_epoch_minutes(self.start_minute, self.utc_offset)
+    
+    @property
+    def end(self) -> datetime.datetime:
+        return from_epoch_minutes(self.end_minute, self.utc_offset)
+    
+    @property
+    def duration_minutes(self) -> int:
+        return self.end_minute - self.start_minute
     
     @property
     def hour(self) -> int:
         """Get the starting hour of this time slot"""
-        return self.start.hour
+        return (self.start_minute + self.utc_offset) // 60 % 24
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ScheduledTask:
     task: Task
-    start_time: datetime.datetime
-    end_time: datetime.datetime
+    start_minute: int
+    end_minute: int
+    score: float = 0.0
+    utc_offset: int = 0
+    
+    @property
+    def start_time(self) -> datetime.datetime:
+        return from_epoch_minutes(self.start_minute, self.utc_offset)
+    
+    @property
+    def end_time(self) -> datetime.datetime:
+        return from_epoch_minutes(self.end_minute, self.utc_offset)
+
+
+@dataclass(frozen=True, slots=True)
+class FeasibilityReport:
+    feasible: bool
+    infeasible_tasks: Tuple[Task, ...]  # Fewest tasks whose removal lets the rest meet their deadlines
+    demand_minutes: int  # Minutes of work checked (deadlines inside the window)
+    capacity_minutes: int  # Free minutes before the latest checked deadline
+    beyond_horizon: Tuple[Task, ...] = ()  # Deadline after end_window: not checked
+
+
+# --- BUSY INTERVALS ---
+class IntervalIndex:
+    """
+    Sorted index of busy intervals with bisect-based queries
+    
+    Keeps the raw intervals (sorted by start) and their merged, disjoint
+    blocks as parallel start/end lists of epoch minutes, with each interval
+    rounded outward to whole minutes. Intervals merge only when they
+    overlap (touching ones stay separate), and
+    each merged block carries the data of its earliest raw interval.
+    Range queries, point-in-busy tests and insertions cost O(log n) plus
+    the blocks they touch.
+    
+    Blocks and gaps are shown in `tz` when given, else in the zone of the
+    window passed to free_gaps (UTC for iteration).
+    """
+    
+    def __init__(
+        self,
+        intervals: Iterable[Tuple[datetime.datetime, datetime.datetime, Any]] = (),
+        tz: Optional[datetime.tzinfo] = None
+    ):
+        self.tz = tz
+        # (start minute, end minute, data, start, end), sorted by start minute
+        self._raw: List[Tuple[int, int, Any, datetime.datetime, datetime.datetime]] = sorted(
+            (self._entry(start, end, data) for start, end, data in intervals),
+            key=lambda x: x[0]
+        )
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.data: List[Any] = []
+        for start, end, data in self._merge(self._raw):
+            self.starts.append(start)
+            self.ends.append(end)
+            self.data.append(data)
+
+    @staticmethod
+    def _entry(start: datetime.datetime, end: datetime.datetime, data: Any) -> tuple:
+        return (epoch_minutes(start), epoch_minutes(end, round_up=True), data, start, end)
+
+    @staticmethod
+    def _merge(entries):
+        """Sweep start-sorted entries into merged (start, end, data) blocks"""
+        merged = []
+        for start, end, data, *_ in entries:
+            if merged and start < merged[-1][1]:
+                if end > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], end, merged[-1][2])
+            else:
+                merged.append((start, end, data))
+        return merged
+
+    def _datetime(self, minute: int) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(minute * 60, self.tz or datetime.timezone.utc)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __iter__(self) -> Iterator[Tuple[datetime.datetime, datetime.datetime, Any]]:
+        """Merged blocks as (start, end, data) datetimes"""
+        for start, end, data in zip(self.starts, self.ends, self.data):
+            yield self._datetime(start), self._datetime(end), data
+
+    @property
+    def raw(self) -> List[Tuple[datetime.datetime, datetime.datetime, Any]]:
+        """The intervals as added, sorted by start"""
+        return [(start, end, data) for _, _, data, start, end in self._raw]
+
+    def add(self, start: datetime.datetime, end: datetime.datetime, data: Any = None) -> None:
+        """Insert a busy interval, merging it with the blocks it overlaps"""
+        entry = self._entry(start, end, data)
+        bisect.insort(self._raw, entry, key=lambda x: x[0])
+        start, end = entry[0], entry[1]
+        lo = bisect.bisect_right(self.ends, start)   # First block ending after start
+        hi = bisect.bisect_left(self.starts, end)    # Blocks starting before end
+        if lo < hi:
+            if self.starts[lo] <= start:
+                start, data = self.starts[lo], self.data[lo]
+            end = max(end, self.ends[hi - 1])
+        self.starts[lo:hi] = [start]
+        self.ends[lo:hi] = [end]
+        self.data[lo:hi] = [data]
+
+    def remove(self, start: datetime.datetime, end: datetime.datetime) -> None:
+        """Remove one raw interval and re-merge the block it belonged to"""
+        start_minute, end_minute = epoch_minutes(start), epoch_minutes(end, round_up=True)
+        lo = bisect.bisect_left(self._raw, start_minute, key=lambda x: x[0])
+        hi = bisect.bisect_right(self._raw, start_minute, key=lambda x: x[0])
+        for position in range(lo, hi):
+            if self._raw[position][1] == end_minute:
+                del self._raw[position]
+                break
+        else:
+            raise KeyError(f"Busy interval {start} - {end} is not indexed")
+
+        block = bisect.bisect_right(self.starts, start_minute) - 1
+        block_start, block_end = self.starts[block], self.ends[block]
+        members = self._raw[
+            bisect.bisect_left(self._raw, block_start, key=lambda x: x[0]):
+            bisect.bisect_left(self._raw, block_end, key=lambda x: x[0])
+        ]
+        remerged = self._merge(members)
+        self.starts[block:block + 1] = [b[0] for b in remerged]
+        self.ends[block:block + 1] = [b[1] for b in remerged]
+        self.data[block:block + 1] = [b[2] for b in remerged]
+
+    def is_busy(self, moment: datetime.datetime) -> bool:
+        """True if moment falls inside a busy block (blocks are half-open)"""
+        minute = epoch_minutes(moment)
+        block = bisect.bisect_right(self.starts, minute) - 1
+        return block >= 0 and minute < self.ends[block]
+
+    def fits(self, start: datetime.datetime, minutes: float) -> bool:
+        """True if [start, start + minutes) touches no busy block"""
+        seconds = epoch_seconds(start)
+        lo, hi = math.floor(seconds / 60), math.ceil(seconds / 60 + minutes)
+        return bisect.bisect_right(self.ends, lo) >= bisect.bisect_left(self.starts, hi)
+
+    def overlapping(
+        self, start: datetime.datetime, end: datetime.datetime
+    ) -> List[Tuple[datetime.datetime, datetime.datetime, Any]]:
+        """Merged busy blocks that intersect [start, end)"""
+        lo = bisect.bisect_right(self.ends, epoch_minutes(start))
+        hi = bisect.bisect_left(self.starts, epoch_minutes(end, round_up=True))
+        return [
+            (self._datetime(s), self._datetime(e), data)
+            for s, e, data in zip(self.starts[lo:hi], self.ends[lo:hi], self.data[lo:hi])
+        ]
+
+    def free_gaps(
+        self, start: datetime.datetime, end: datetime.datetime, min_minutes: float = 15
+    ) -> List[TimeSlot]:
+        """
+        Free time between start and end (rounded inward to whole minutes)
+        
+        Gaps between busy blocks shorter than min_minutes are dropped; the
+        trailing gap up to `end` is always kept.
+        """
+        return self.free_slots(
+            epoch_minutes(start, round_up=True), epoch_minutes(end),
+            min_minutes, self.tz or start.tzinfo
+        )
+
+    def free_slots(
+        self, lo: int, hi: int, min_minutes: float = 15, tz: Optional[datetime.tzinfo] = None
+    ) -> List[TimeSlot]:
+        """free_gaps over epoch minutes [lo, hi), with gaps shown in `tz`"""
+        return list(self.iter_free_slots(lo, hi, min_minutes, tz))
+
+    def iter_free_gaps(
+        self, start: datetime.datetime, end: datetime.datetime, min_minutes: float = 15
+    ) -> Iterator[TimeSlot]:
+        """free_gaps as a generator: each gap is found only when pulled"""
+        return self.iter_free_slots(
+            epoch_minutes(start, round_up=True), epoch_minutes(end),
+            min_minutes, self.tz or start.tzinfo
+        )
+
+    def iter_free_slots(
+        self, lo: int, hi: int, min_minutes: float = 15, tz: Optional[datetime.tzinfo] = None
+    ) -> Iterator[TimeSlot]:
+        current_pointer = lo
+        block = bisect.bisect_right(self.ends, lo)
+        while block < len(self.starts) and self.starts[block] < hi:
+            block_start, block_end = self.starts[block], self.ends[block]
+            if block_start > current_pointer:
+                if block_start - current_pointer >= min_minutes:  # Filter out tiny gaps
+                    yield TimeSlot(current_pointer, block_start, utc_offset_minutes(tz, current_pointer))
+            current_pointer = max(current_pointer, block_end)
+            block += 1
+
+        # Add remaining time after last busy block
+        if hi > current_pointer:
+            yield TimeSlot(current_pointer, hi, utc_offset_minutes(tz, current_pointer))
+
+
+# --- AVAILABILITY BITMAP ---
+class AvailabilityBitmap:
+    """
+    Busy/free raster of a time window at a fixed resolution
+    
+    Slot i covers epoch minutes [origin + i * resolution, origin + (i + 1) *
+    resolution), with origin aligned down to a resolution boundary. A busy
+    interval marks every slot it touches, so busy time is rounded outward.
+    Calendars are rasterized separately and merged with a vectorized sum
+    into per-slot coverage counts (a slot is busy while any interval covers
+    it, so a removed block frees only the time nothing else holds), and a
+    prefix sum over busy slots makes "does N minutes fit starting here" O(1).
+    
+    Exposes the same queries as IntervalIndex (free_gaps, is_busy, fits)
+    so HeuristicScheduler can use either. Gap times are reported in `tz`,
+    which drives the time-of-day multipliers (defaults to start's zone).
+    """
+    
+    def __init__(
+        self,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        resolution_minutes: int = 5,
+        tz: Optional[datetime.tzinfo] = None
+    ):
+        self.start, self.end = start, end
+        self.resolution_minutes = resolution_minutes
+        self.tz = tz or start.tzinfo or datetime.timezone.utc
+        self.origin = epoch_minutes(start) // resolution_minutes * resolution_minutes
+        self.size = max(0, -(-(epoch_minutes(end, round_up=True) - self.origin) // resolution_minutes))
+        # Busy intervals covering each slot; busy = coverage > 0
+        self.coverage = np.zeros(self.size, dtype=np.int32)
+        self.busy = np.zeros(self.size, dtype=bool)
+        self._prefix: Optional[np.ndarray] = None
+
+    def __reduce__(self):
+        # Pickled as runs of equal coverage (first slot, count), not per-slot arrays
+        firsts = np.flatnonzero(np.diff(self.coverage, prepend=np.int32(-1)))
+        return _unpack_bitmap, (
+            self.start, self.end, self.resolution_minutes, self.tz, firsts, self.coverage[firsts]
+        )
+
+    @classmethod
+    def from_calendars(
+        cls,
+        calendars: Iterable[Iterable[tuple]],
+        start: datetime.datetime,
+        end: datetime.datetime,
+        resolution_minutes: int = 5,
+        tz: Optional[datetime.tzinfo] = None
+    ) -> "AvailabilityBitmap":
+        """Rasterize each calendar's (start, end, ...) intervals and merge them"""
+        bitmap = cls(start, end, resolution_minutes, tz)
+        rasters = [bitmap._rasterize(intervals) for intervals in calendars]
+        if rasters:
+            bitmap.coverage = np.add.reduce(rasters, dtype=np.int32)
+            bitmap.busy = bitmap.coverage > 0
+        return bitmap
+
+    def _slot_range(self, intervals: Iterable[tuple]) -> Tuple[np.ndarray, np.ndarray]:
+        """First and one-past-last slot touched by each interval, clipped to the window"""
+        bounds = np.array(
+            [(epoch_minutes(item[0]), epoch_minutes(item[1], round_up=True)) for item in intervals],
+            dtype=np.int64
+        ).reshape(-1, 2) - self.origin
+        first = bounds[:, 0] // self.resolution_minutes
+        last = -(-bounds[:, 1] // self.resolution_minutes)
+        return np.clip(first, 0, self.size), np.clip(last, 0, self.size)
+
+    def _rasterize(self, intervals: Iterable[tuple]) -> np.ndarray:
+        """Number of the intervals covering each slot"""
+        first, last = self._slot_range(intervals)
+        keep = first < last
+        # Difference array: +1 where a busy interval opens, -1 where it closes
+        edges = np.zeros(self.size + 1, dtype=np.int32)
+        np.add.at(edges, first[keep], 1)
+        np.add.at(edges, last[keep], -1)
+        return np.cumsum(edges[:-1], dtype=np.int32)
+
+    def add(self, start: datetime.datetime, end: datetime.datetime, data: Any = None) -> None:
+        """Mark an extra busy interval"""
+        self.coverage += self._rasterize([(start, end)])
+        self.busy = self.coverage > 0
+        self._prefix = None
+
+    def remove(self, start: datetime.datetime, end: datetime.datetime) -> None:
+        """Unmark one busy interval; slots other intervals still cover stay busy"""
+        raster = self._rasterize([(start, end)])
+        if np.any(self.coverage < raster):
+            raise KeyError(f"Busy interval {start} - {end} is not in the bitmap")
+        self.coverage -= raster
+        self.busy = self.coverage > 0
+        self._prefix = None
+
+    @property
+    def prefix(self) -> np.ndarray:
+        """prefix[i] = number of busy slots before slot i"""
+        if self._prefix is None:
+            self._prefix = np.concatenate(([0], np.cumsum(self.busy, dtype=np.int64)))
+        return self._prefix
+
+    def _slot(self, minute: int) -> int:
+        return (minute - self.origin) // self.resolution_minutes
+
+    def _at(self, minute: int) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(minute * 60, tz=self.tz)
+
+    def is_busy(self, moment: datetime.datetime) -> bool:
+        slot = self._slot(epoch_minutes(moment))
+        return 0 <= slot < self.size and bool(self.busy[slot])
+
+    def fits(self, start: datetime.datetime, minutes: float) -> bool:
+        """True if [start, start + minutes) is free and inside the window"""
+        seconds = epoch_seconds(start)
+        first = self._slot(math.floor(seconds / 60))
+        last = -(-(math.ceil(seconds / 60 + minutes) - self.origin) // self.resolution_minutes)
+        if first < 0 or last > self.size:
+            return False
+        return self.prefix[last] == self.prefix[first]
+
+    def fit_starts(self, minutes: float) -> np.ndarray:
+        """Slot indices where a task of `minutes` can start (sliding-window check)"""
+        width = math.ceil(minutes / self.resolution_minutes)
+        if width > self.size:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(self.prefix[width:] == self.prefix[:self.size - width + 1])
+
+    def __iter__(self) -> Iterator[Tuple[datetime.datetime, datetime.datetime, Any]]:
+        """Busy runs as (start, end, None)"""
+        padded = np.concatenate(([False], self.busy, [False])).view(np.int8)
+        edges = np.flatnonzero(np.diff(padded)) * self.resolution_minutes + self.origin
+        for start, end in zip(edges[::2].tolist(), edges[1::2].tolist()):
+            yield self._at(start), self._at(end), None
+
+    @property
+    def raw(self) -> List[Tuple[datetime.datetime, datetime.datetime, Any]]:
+        return list(self)
+
+    def free_gaps(
+        self, start: datetime.datetime, end: datetime.datetime, min_minutes: float = 15
+    ) -> List[TimeSlot]:
+        """
+        Free runs between start and end, rounded inward to whole minutes
+        
+        Runs shorter than min_minutes are dropped, except the trailing one
+        that reaches `end` (same rule as IntervalIndex.free_gaps).
+        """
+        return self.free_slots(epoch_minutes(start, round_up=True), epoch_minutes(end), min_minutes)
+
+    def free_slots(self, lo_minute: int, hi_minute: int, min_minutes: float = 15) -> List[TimeSlot]:
+        """free_gaps over epoch minutes [lo_minute, hi_minute)"""
+        return list(self.iter_free_slots(lo_minute, hi_minute, min_minutes))
+
+    def iter_free_gaps(
+        self, start: datetime.datetime, end: datetime.datetime, min_minutes: float = 15
+    ) -> Iterator[TimeSlot]:
+        """free_gaps as a generator: the raster is scanned a day at a time, as gaps are pulled"""
+        return self.iter_free_slots(epoch_minutes(start, round_up=True), epoch_minutes(end), min_minutes)
+
+    def iter_free_slots(
+        self, lo_minute: int, hi_minute: int, min_minutes: float = 15
+    ) -> Iterator[TimeSlot]:
+        res = self.resolution_minutes
+        lo = min(max(self._slot(lo_minute), 0), self.size)
+        hi = min(max(-(-(hi_minute - self.origin) // res), lo), self.size)
+        chunk = max(1, 1440 // res)
+        
+        def gap(first: int, last: int) -> Optional[TimeSlot]:
+            gap_start = max(self.origin + first * res, lo_minute)
+            gap_end = min(self.origin + last * res, hi_minute)
+            if gap_end <= gap_start:
+                return None
+            if gap_end < hi_minute and gap_end - gap_start < min_minutes:
+                return None  # Filter out tiny gaps
+            return TimeSlot(gap_start, gap_end, utc_offset_minutes(self.tz, gap_start))
+        
+        run_start, was_free = None, False
+        for chunk_lo in range(lo, hi, chunk):
+            free = ~self.busy[chunk_lo:min(chunk_lo + chunk, hi)]
+            # Slots where free/busy flips relative to the slot before
+            flips = np.flatnonzero(np.diff(np.concatenate(([was_free], free)).view(np.int8)))
+            for i in flips.tolist():
+                if free[i]:
+                    run_start = chunk_lo + i
+                else:
+                    found = gap(run_start, chunk_lo + i)
+                    if found is not None:
+                        yield found
+            was_free = bool(free[-1])
+        if was_free:
+            found = gap(run_start, hi)
+            if found is not None:
+                yield found
+
+
+def _unpack_bitmap(start, end, resolution_minutes, tz, firsts: np.ndarray, counts: np.ndarray) -> AvailabilityBitmap:
+    bitmap = AvailabilityBitmap(start, end, resolution_minutes, tz)
+    bitmap.coverage = np.repeat(counts, np.diff(np.append(firsts, bitmap.size))).astype(np.int32)
+    bitmap.busy = bitmap.coverage > 0
+    return bitmap
+
+
+# --- PRECOMPUTED GAPS ---
+class FreeGapList:
+    """
+    Free gaps computed once and reused as a scheduler's busy index
+    
+    Lets many runs over the same calendars (e.g. what-if scenarios in a
+    process pool) share one gap computation: only free_gaps and
+    iter_free_gaps are supported, clipping the stored gaps to the window.
+    Pieces shortened by the clip are dropped below min_minutes.
+    """
+    __slots__ = ("gaps", "starts")
+    
+    def __init__(self, gaps: Iterable[TimeSlot]):
+        self.gaps = sorted(gaps, key=lambda gap: gap.start_minute)
+        self.starts = [gap.start_minute for gap in self.gaps]
+    
+    def __reduce__(self):
+        # Pickled as one (start, end, utc_offset) int64 array, not TimeSlot objects
+        packed = np.array(
+            [(gap.start_minute, gap.end_minute, gap.utc_offset) for gap in self.gaps], dtype=np.int64
+        ).reshape(-1, 3)
+        return _unpack_gaps, (packed,)
+    
+    def __len__(self) -> int:
+        return len(self.gaps)
+    
+    def free_gaps(
+        self, start: datetime.datetime, end: datetime.datetime, min_minutes: float = 15
+    ) -> List[TimeSlot]:
+        return list(self.iter_free_gaps(start, end, min_minutes))
+    
+    def iter_free_gaps(
+        self, start: datetime.datetime, end: datetime.datetime, min_minutes: float = 15
+    ) -> Iterator[TimeSlot]:
+        lo, hi = epoch_minutes(start, round_up=True), epoch_minutes(end)
+        # The gap before the first one starting after lo may still reach past it
+        for i in range(max(bisect.bisect_right(self.starts, lo) - 1, 0), len(self.gaps)):
+            gap = self.gaps[i]
+            if gap.start_minute >= hi:
+                return
+            clipped_start, clipped_end = max(gap.start_minute, lo), min(gap.end_minute, hi)
+            if clipped_end <= clipped_start:
+                continue
+            if (clipped_start, clipped_end) == (gap.start_minute, gap.end_minute):
+                yield gap
+            elif clipped_end - clipped_start >= min_minutes:
+                yield TimeSlot(clipped_start, clipped_end, gap.utc_offset)
+
+
+def _unpack_gaps(packed: np.ndarray) -> FreeGapList:
+    return FreeGapList(TimeSlot(start, end, offset) for start, end, offset in packed.tolist())
+
+
+# --- COLUMNAR TASKS ---
+class TaskTable:
+    """
+    Struct-of-arrays view of a task list for vectorized scoring
+    
+    Row i holds one task: ids, estimated_minutes, priorities, deadlines
+    (epoch seconds) and work_types (int8 codes into WORK_TYPES). Titles stay
+    a plain list since they are only needed when a placement is emitted;
+    depends_on (predecessor ids per row) is None when no task has any, and
+    so is available_from (epoch minutes, 0 = any time).
+    """
+    
+    def __init__(
+        self,
+        ids,
+        estimated_minutes,
+        priorities,
+        deadlines,
+        work_types,
+        titles: Optional[List[str]] = None,
+        tasks: Optional[List[Task]] = None,
+        depends_on: Optional[List[Tuple[int, ...]]] = None,
+        available_from=None
+    ):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.estimated_minutes = np.asarray(estimated_minutes, dtype=np.int32)
+        self.priorities = np.asarray(priorities, dtype=np.int32)
+        self.deadlines = np.asarray(deadlines, dtype=np.float64)
+        self.work_types = np.asarray(work_types, dtype=np.int8)
+        self.titles = titles if titles is not None else [""] * len(self.ids)
+        self.depends_on = depends_on
+        self.available_from = None if available_from is None else np.asarray(available_from, dtype=np.int64)
+        # Original Task objects, when built from them, so placements keep identity
+        self._tasks = tasks
+
+    @classmethod
+    def from_tasks(cls, tasks: List[Task]) -> "TaskTable":
+        return cls(
+            ids=[t.id for t in tasks],
+            estimated_minutes=[t.estimated_minutes for t in tasks],
+            priorities=[t.priority for t in tasks],
+            deadlines=[epoch_seconds(t.deadline) for t in tasks],
+            work_types=[WORK_TYPES.index(t.work_type) for t in tasks],
+            titles=[t.title for t in tasks],
+            tasks=list(tasks),
+            depends_on=[t.depends_on for t in tasks] if any(t.depends_on for t in tasks) else None,
+            available_from=[
+                epoch_minutes(t.available_from, round_up=True) if t.available_from is not None else 0
+                for t in tasks
+            ] if any(t.available_from is not None for t in tasks) else None
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def packed(self) -> "TaskTable":
+        """
+        Copy for sending to another process: the arrays only (no Task
+        objects or titles), with row numbers as ids, so placements made
+        from it map back to rows of this table
+        """
+        depends_on = None
+        if self.depends_on is not None:
+            row_of = {task_id: row for row, task_id in enumerate(self.ids.tolist())}
+            depends_on = [tuple(row_of[dep] for dep in deps if dep in row_of) for deps in self.depends_on]
+        return TaskTable(
+            np.arange(len(self)), self.estimated_minutes, self.priorities, self.deadlines,
+            self.work_types, depends_on=depends_on, available_from=self.available_from
+        )
+
+    def task(self, row: int) -> Task:
+        """Task for a row (the original object if the table was built from Tasks)"""
+        if self._tasks is not None:
+            return self._tasks[row]
+        return Task(
+            id=int(self.ids[row]),
+            title=self.titles[row],
+            estimated_minutes=int(self.estimated_minutes[row]),
+            priority=int(self.priorities[row]),
+            deadline=datetime.datetime.fromtimestamp(
+                float(self.deadlines[row]), tz=datetime.timezone.utc
+            ),
+            work_type=WORK_TYPES[self.work_types[row]],
+            depends_on=tuple(self.depends_on[row]) if self.depends_on is not None else (),
+            available_from=(
+                datetime.datetime.fromtimestamp(int(self.available_from[row]) * 60, tz=datetime.timezone.utc)
+                if self.available_from is not None and self.available_from[row] else None
+            )
+        )
+
+    def base_urgency(self, now: datetime.datetime) -> np.ndarray:
+        """Vectorized Task.base_urgency for every row"""
+        hours_remaining = (self.deadlines - epoch_seconds(now)) / 3600
+        return self.priorities / np.maximum(0.1, hours_remaining)
+
+    def heuristic_scores(self, time_block_hours, now: datetime.datetime) -> np.ndarray:
+        """
+        Vectorized Task.heuristic_score
+        
+        A single hour gives one score per task, shape (n,); a sequence of
+        hours gives shape (len(hours), n) with one row per gap hour.
+        """
+        hours = np.asarray(time_block_hours, dtype=np.intp)
+        base = self.base_urgency(now)
+        if hours.ndim == 0:
+            return base * _MULTIPLIER_MATRIX[self.work_types, hours]
+        return base * _MULTIPLIER_MATRIX[self.work_types[np.newaxis, :], hours[:, np.newaxis]]
+
+
+# --- CANDIDATE INDEX ---
+_EMPTY = (float("inf"), float("inf"))
+
+
+class _CandidateIndex:
+    """
+    Pending tasks bucketed by (work type, estimated_minutes)
+    
+    Each bucket is a max-heap on base score (stored negated), and a segment
+    tree per work type keeps the best bucket head over the sorted durations.
+    "Best task that fits in R minutes" is then a prefix query per work type,
+    with the time-of-day multiplier applied to the two winners only.
+    Tasks are identified by row order, which also breaks score ties.
+    Removal just forgets the row; stale heap heads are dropped lazily.
+    """
+    
+    def __init__(self, durations: Iterable[int]):
+        self.durations = sorted(set(durations))
+        self._size = max(1, len(self.durations))
+        self._heaps: List[List[list]] = [
+            [[] for _ in range(self._size)] for _ in WORK_TYPES
+        ]
+        self._trees: List[list] = [[_EMPTY] * (2 * self._size) for _ in WORK_TYPES]
+        # order -> (negated base score, work type code, slot); absent once removed.
+        # A heap entry is live only while it still matches this record.
+        self._live: Dict[int, Tuple[float, int, int]] = {}
+        self._entries = 0
+        self.evaluated = 0  # Bucket heads scored by best_fit, for metrics
+
+    @classmethod
+    def from_table(
+        cls, table: TaskTable, base_scores: np.ndarray, rows: Optional[List[int]] = None
+    ) -> "_CandidateIndex":
+        """
+        Bulk-load the given rows of a table, every row by default (order =
+        row number). Buckets cover every row's duration, so the rest can be
+        pushed later without a rebuild.
+        """
+        index = cls(np.unique(table.estimated_minutes).tolist())
+        orders = np.arange(len(table)) if rows is None else np.asarray(rows, dtype=np.intp)
+        if not len(orders):
+            return index
+        
+        slots = np.searchsorted(np.asarray(index.durations), table.estimated_minutes)
+        neg_base = -np.asarray(base_scores, dtype=np.float64)
+        # Sort rows by bucket, then best-first; a sorted list is a valid heap
+        rows = orders[np.lexsort((orders, neg_base[orders], slots[orders], table.work_types[orders]))]
+        bucket_keys = table.work_types[rows].astype(np.int64) * index._size + slots[rows]
+        bounds = np.flatnonzero(np.diff(bucket_keys)) + 1
+        
+        neg_list, order_list, slot_list = neg_base[rows].tolist(), rows.tolist(), slots[rows].tolist()
+        for lo, hi in zip([0, *bounds.tolist()], [*bounds.tolist(), len(rows)]):
+            code, slot = int(table.work_types[rows[lo]]), slot_list[lo]
+            index._heaps[code][slot] = list(zip(neg_list[lo:hi], order_list[lo:hi], slot_list[lo:hi]))
+            index._refresh(code, slot)
+        index._live = dict(zip(
+            orders.tolist(),
+            zip(neg_base[orders].tolist(), table.work_types[orders].tolist(), slots[orders].tolist())
+        ))
+        index._entries = len(orders)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def __contains__(self, order: int) -> bool:
+        return order in self._live
+
+    def push(self, order: int, work_type: WorkType, estimated_minutes: int, base_score: float) -> None:
+        """
+        Add a task, or replace the entry already held under `order`
+        
+        `order` breaks score ties (lower wins). A duration not seen before
+        rebuilds the buckets, which only happens when tasks are added later.
+        """
+        slot = bisect.bisect_left(self.durations, estimated_minutes)
+        if slot == len(self.durations) or self.durations[slot] != estimated_minutes:
+            self._rebuild(self.durations + [estimated_minutes])
+            slot = bisect.bisect_left(self.durations, estimated_minutes)
+        elif self._entries > 2 * len(self._live) + 1024:
+            self._rebuild(self.durations)  # Too many stale entries
+
+        code = WORK_TYPES.index(work_type)
+        heap = self._heaps[code][slot]
+        heapq.heappush(heap, (-base_score, order, slot))
+        self._entries += 1
+        self._live[order] = (-base_score, code, slot)
+        if heap[0][1] == order:
+            self._refresh(code, slot)
+
+    def remove(self, order: int) -> None:
+        """O(1) removal; the heap entry is discarded when it surfaces"""
+        self._live.pop(order, None)
+
+    def best_fit(
+        self,
+        remaining_minutes: float,
+        time_block_hour: int,
+        caps: Optional[Tuple[float, ...]] = None
+    ) -> Optional[Tuple[int, float]]:
+        """
+        Return (order, score) of the best task no longer than remaining_minutes
+        (and, per work type code, no longer than caps[code] when given)
+        """
+        hi = bisect.bisect_right(self.durations, remaining_minutes)
+        if hi == 0:
+            return None
+
+        best = None
+        for code, multipliers in enumerate(_MULTIPLIER_ROWS):
+            code_hi = hi
+            if caps is not None and caps[code] < remaining_minutes:
+                code_hi = bisect.bisect_right(self.durations, caps[code])
+            if code_hi == 0:
+                continue
+            head = self._best_head(code, code_hi)
+            if head is None:
+                continue
+            neg_base, order, _ = head
+            score = -neg_base * multipliers[time_block_hour]
+            self.evaluated += 1
+            if best is None or score > best[1] or (score == best[1] and order < best[0]):
+                best = (order, score)
+        return best
+
+    def _best_head(self, code: int, hi: int) -> Optional[Tuple[float, int, int]]:
+        """Best live bucket head (neg_base, order, slot) among durations[:hi]"""
+        while True:
+            head = self._query(self._trees[code], hi)
+            if head == _EMPTY:
+                return None
+            if self._live.get(head[1]) == (head[0], code, head[2]):
+                return head
+            # Stale head: drop removed entries from its bucket and retry
+            slot = head[2]
+            heap = self._heaps[code][slot]
+            while heap and self._live.get(heap[0][1]) != (heap[0][0], code, slot):
+                heapq.heappop(heap)
+                self._entries -= 1
+            self._refresh(code, slot)
+
+    def _rebuild(self, durations: List[int]) -> None:
+        """Re-bucket the live entries over a new duration list"""
+        old_durations = self.durations
+        live = self._live
+        self.__init__(durations)
+        for order, (neg_base, code, slot) in live.items():
+            new_slot = bisect.bisect_left(self.durations, old_durations[slot])
+            self._heaps[code][new_slot].append((neg_base, order, new_slot))
+            self._live[order] = (neg_base, code, new_slot)
+        for code, heaps in enumerate(self._heaps):
+            for slot, heap in enumerate(heaps):
+                if heap:
+                    heapq.heapify(heap)
+                    self._refresh(code, slot)
+        self._entries = len(self._live)
+
+    def _refresh(self, code: int, slot: int) -> None:
+        heap = self._heaps[code][slot]
+        tree = self._trees[code]
+        node = slot + self._size
+        tree[node] = heap[0] if heap else _EMPTY
+        node //= 2
+        while node:
+            tree[node] = min(tree[2 * node], tree[2 * node + 1])
+            node //= 2
+
+    def _query(self, tree: list, hi: int) -> tuple:
+        """Minimum over leaves [0, hi)"""
+        best = _EMPTY
+        lo, hi = self._size, hi + self._size
+        while lo < hi:
+            if lo & 1:
+                best = min(best, tree[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                best = min(best, tree[hi])
+            lo //= 2
+            hi //= 2
+        return best
+
+
+# --- DEPENDENCIES ---
+class _DependencyGraph:
+    """
+    Precedence constraints between table rows, from TaskTable.depends_on
+    
+    Successor lists and a count of unplaced predecessors per row make up
+    the ready queue: a row becomes a candidate once its count drops to 0.
+    Built and checked for cycles with Kahn's algorithm in O(V + E).
+    Dependencies on ids outside the table (e.g. completed tasks) count as
+    already done.
+    """
+    __slots__ = ("predecessors", "successors", "waiting", "base")
+    
+    def __init__(self, table: TaskTable, base_scores: np.ndarray):
+        row_of = {task_id: row for row, task_id in enumerate(table.ids.tolist())}
+        self.predecessors: List[List[int]] = [
+            sorted({row_of[dep] for dep in deps if dep in row_of}) for deps in table.depends_on
+        ]
+        self.successors: List[List[int]] = [[] for _ in range(len(table))]
+        for row, preds in enumerate(self.predecessors):
+            for pred in preds:
+                self.successors[pred].append(row)
+        self.waiting = [len(preds) for preds in self.predecessors]
+        self.base = np.asarray(base_scores, dtype=np.float64).tolist()
+        
+        # Kahn's algorithm on a copy of the counts: rows never reached lie on or behind a cycle
+        waiting, queue, reached = list(self.waiting), self.ready(), 0
+        while queue:
+            row = queue.pop()
+            reached += 1
+            for succ in self.successors[row]:
+                waiting[succ] -= 1
+                if not waiting[succ]:
+                    queue.append(succ)
+        if reached < len(table):
+            stuck = sorted(int(table.ids[row]) for row, count in enumerate(waiting) if count)
+            raise ValueError(f"Task dependencies form a cycle; tasks {stuck} can never become ready")
+    
+    def ready(self) -> List[int]:
+        """Rows with no unplaced predecessors"""
+        return [row for row, count in enumerate(self.waiting) if not count]
+    
+    def release(self, row: int) -> Iterator[int]:
+        """Mark `row` placed and yield the successors that just became ready"""
+        for succ in self.successors[row]:
+            self.waiting[succ] -= 1
+            if not self.waiting[succ]:
+                yield succ
+
+
+def check_dependencies(tasks: List[Task]) -> None:
+    """Raise ValueError if the tasks' depends_on links form a cycle"""
+    table = TaskTable.from_tasks(tasks)
+    if table.depends_on is not None:
+        _DependencyGraph(table, np.zeros(len(table)))
+
+
+# --- RELEASE TIMES ---
+class _ReleaseQueue:
+    """
+    Rows held back until their available_from minute, from TaskTable
+    
+    A min-heap on release minute: the greedy fill admits held rows as its
+    pointer passes their release, and when nothing released fits it jumps
+    the pointer to the next release (see next_release) instead of giving
+    up on the rest of the gap.
+    """
+    __slots__ = ("minutes", "base", "held")
+    
+    def __init__(self, table: TaskTable, base_scores: np.ndarray):
+        self.minutes = table.available_from.tolist()
+        self.base = np.asarray(base_scores, dtype=np.float64).tolist()
+        self.held: List[Tuple[int, int]] = []
+    
+    def admit(self, rows: Iterable[int], minute: int) -> List[int]:
+        """Rows already released at `minute`; the rest are held"""
+        released = []
+        for row in rows:
+            if self.minutes[row] <= minute:
+                released.append(row)
+            else:
+                heapq.heappush(self.held, (self.minutes[row], row))
+        return released
+    
+    def due(self, minute: int) -> Iterator[int]:
+        """Pop the held rows released by `minute`"""
+        while self.held and self.held[0][0] <= minute:
+            yield heapq.heappop(self.held)[1]
+    
+    def next_release(self) -> Optional[int]:
+        """Earliest release minute still held, if any"""
+        return self.held[0][0] if self.held else None
+
+
+class _DecisionPoint(NamedTuple):
+    """One step of the greedy fill: where it stood and what it placed (if anything)"""
+    gap_index: int
+    pointer: int  # Epoch minute
+    remaining_minutes: int
+    hour: int
+    order: Optional[int] = None
     score: float = 0.0
+    placement: Optional[ScheduledTask] = None
+
+
+# --- RECURRING TASKS ---
+_RRULE_WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+# Occurrence ids are -(template id * OCCURRENCE_ID_DAYS + local day number), one occurrence per day
+OCCURRENCE_ID_DAYS = 100_000
+
+
+def _as_aware(moment: datetime.datetime) -> datetime.datetime:
+    """Naive datetimes are UTC, as in epoch_seconds"""
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=datetime.timezone.utc)
+
+
+@dataclass(frozen=True, slots=True)
+class RecurrenceRule:
+    """
+    The RFC 5545 RRULE subset the scheduler expands
+    
+    FREQ=DAILY|WEEKLY|MONTHLY with INTERVAL, BYDAY (daily and weekly),
+    BYMONTHDAY (monthly, negative counts from the month end), COUNT and
+    UNTIL. Occurrences keep DTSTART's time of day and UTC offset.
+    """
+    freq: str
+    interval: int = 1
+    by_day: Tuple[int, ...] = ()  # Weekdays, 0 = Monday
+    by_month_day: Tuple[int, ...] = ()
+    count: Optional[int] = None
+    until: Optional[datetime.datetime] = None
+    
+    @classmethod
+    def parse(cls, rule: str) -> "RecurrenceRule":
+        """Parse e.g. "FREQ=WEEKLY;BYDAY=MO,WE,FR" (an "RRULE:" prefix is allowed)"""
+        if rule.upper().startswith("RRULE:"):
+            rule = rule[6:]
+        parts = {}
+        for part in filter(None, rule.strip().upper().split(";")):
+            name, sep, value = part.partition("=")
+            if not sep or not value:
+                raise ValueError(f"Malformed RRULE part {part!r}")
+            parts[name] = value
+        
+        freq = parts.pop("FREQ", None)
+        if freq not in ("DAILY", "WEEKLY", "MONTHLY"):
+            raise ValueError(f"Unsupported RRULE FREQ {freq!r}; expected DAILY, WEEKLY or MONTHLY")
+        fields: Dict[str, Any] = {"freq": freq}
+        if "INTERVAL" in parts:
+            fields["interval"] = cls._integer("INTERVAL", parts.pop("INTERVAL"))
+            if fields["interval"] < 1:
+                raise ValueError("RRULE INTERVAL must be at least 1")
+        if "BYDAY" in parts:
+            days = parts.pop("BYDAY").split(",")
+            unknown = [day for day in days if day not in _RRULE_WEEKDAYS]
+            if unknown or freq == "MONTHLY":
+                raise ValueError(f"Unsupported RRULE BYDAY {','.join(days)} for FREQ={freq}")
+            fields["by_day"] = tuple(sorted({_RRULE_WEEKDAYS.index(day) for day in days}))
+        if "BYMONTHDAY" in parts:
+            month_days = tuple(sorted({cls._integer("BYMONTHDAY", day) for day in parts.pop("BYMONTHDAY").split(",")}))
+            if freq != "MONTHLY" or any(not 1 <= abs(day) <= 31 for day in month_days):
+                raise ValueError(f"Unsupported RRULE BYMONTHDAY {month_days} for FREQ={freq}")
+            fields["by_month_day"] = month_days
+        if "COUNT" in parts and "UNTIL" in parts:
+            raise ValueError("RRULE may not have both COUNT and UNTIL")
+        if "COUNT" in parts:
+            fields["count"] = cls._integer("COUNT", parts.pop("COUNT"))
+            if fields["count"] < 1:
+                raise ValueError("RRULE COUNT must be at least 1")
+        if "UNTIL" in parts:
+            value = parts.pop("UNTIL")
+            try:
+                if "T" in value:
+                    until = datetime.datetime.strptime(value.rstrip("Z"), "%Y%m%dT%H%M%S")
+                else:  # A date includes the whole day
+                    until = datetime.datetime.strptime(value, "%Y%m%d") + datetime.timedelta(days=1, seconds=-1)
+            except ValueError:
+                raise ValueError(f"RRULE UNTIL must be YYYYMMDD or YYYYMMDDTHHMMSSZ, got {value!r}") from None
+            fields["until"] = until.replace(tzinfo=datetime.timezone.utc)
+        if parts:
+            raise ValueError(f"Unsupported RRULE parts: {', '.join(sorted(parts))}")
+        return cls(**fields)
+    
+    @staticmethod
+    def _integer(name: str, value: str) -> int:
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError(f"RRULE {name} must be an integer, got {value!r}") from None
+    
+    def _period(self, first: datetime.date, k: int) -> Tuple[datetime.date, List[datetime.date]]:
+        """Start date and candidate dates of the k-th period after DTSTART's"""
+        if self.freq == "DAILY":
+            day = first + datetime.timedelta(days=k * self.interval)
+            return day, [day] if not self.by_day or day.weekday() in self.by_day else []
+        if self.freq == "WEEKLY":
+            monday = first - datetime.timedelta(days=first.weekday()) + datetime.timedelta(weeks=k * self.interval)
+            return monday, [monday + datetime.timedelta(days=d) for d in self.by_day or (first.weekday(),)]
+        year, month = divmod(first.month - 1 + k * self.interval, 12)
+        month_start = datetime.date(first.year + year, month + 1, 1)
+        length = ((month_start + datetime.timedelta(days=32)).replace(day=1) - month_start).days
+        days = sorted({day if day > 0 else length + 1 + day for day in self.by_month_day or (first.day,)})
+        return month_start, [month_start.replace(day=day) for day in days if 1 <= day <= length]
+    
+    def _periods_before(self, first: datetime.date, day: datetime.date) -> int:
+        """Whole periods between DTSTART's and the one containing `day`"""
+        if self.freq == "DAILY":
+            return (day - first).days // self.interval
+        if self.freq == "WEEKLY":
+            return ((day - first).days + first.weekday() - day.weekday()) // 7 // self.interval
+        return ((day.year - first.year) * 12 + day.month - first.month) // self.interval
+    
+    def occurrences(
+        self,
+        dtstart: datetime.datetime,
+        after: Optional[datetime.datetime] = None,
+        before: Optional[datetime.datetime] = None
+    ) -> Iterator[datetime.datetime]:
+        """
+        Occurrence times in order, lazily, from `after` (inclusive) to
+        `before` (exclusive). Without COUNT the expansion jumps straight to
+        the period holding `after`, so a long-running series costs only
+        the occurrences asked for.
+        """
+        dtstart = _as_aware(dtstart)
+        first = dtstart.date()
+        after = _as_aware(after).astimezone(dtstart.tzinfo) if after is not None else None
+        before = _as_aware(before).astimezone(dtstart.tzinfo) if before is not None else None
+        k = 0
+        if after is not None and self.count is None and after.date() > first:
+            k = self._periods_before(first, after.date())
+        emitted = 0
+        while True:
+            period_start, days = self._period(first, k)
+            if before is not None and period_start > before.date():
+                return
+            if self.until is not None and period_start > self.until.date():
+                return
+            for day in days:
+                moment = datetime.datetime.combine(day, dtstart.timetz())
+                if moment < dtstart:
+                    continue
+                if self.until is not None and moment > self.until:
+                    return
+                if self.count is not None:
+                    if emitted == self.count:
+                        return
+                    emitted += 1
+                if before is not None and moment >= before:
+                    return
+                if after is None or moment >= after:
+                    yield moment
+            k += 1
+
+
+@dataclass(frozen=True, slots=True)
+class RecurringTask:
+    """
+    A task template that repeats by `rule`, e.g. "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR"
+    
+    Each occurrence becomes a Task available from the occurrence time (DTSTART's
+    time of day) and due `due_minutes` later.
+    """
+    id: int
+    title: str
+    estimated_minutes: int
+    priority: int
+    rule: RecurrenceRule
+    dtstart: datetime.datetime
+    due_minutes: int = 1440
+    work_type: WorkType = WorkType.DEEP_WORK
+    
+    def occurrences(self, start_window: datetime.datetime, end_window: datetime.datetime) -> Iterator[Task]:
+        """Occurrences open at some point in the window, as Tasks, lazily"""
+        due = datetime.timedelta(minutes=self.due_minutes)
+        for moment in self.rule.occurrences(self.dtstart, after=start_window - due, before=end_window):
+            if moment + due <= start_window:
+                continue
+            local_day = (moment.replace(tzinfo=None) - datetime.datetime(1970, 1, 1)).days
+            yield Task(
+                id=-(self.id * OCCURRENCE_ID_DAYS + local_day),
+                title=self.title,
+                estimated_minutes=self.estimated_minutes,
+                priority=self.priority,
+                deadline=moment + due,
+                work_type=self.work_type,
+                available_from=moment
+            )
+
+
+def expand_recurring(
+    templates: Iterable[RecurringTask], start_window: datetime.datetime, end_window: datetime.datetime
+) -> Iterator[Task]:
+    """Every template's occurrences in the window, lazily"""
+    for template in templates:
+        yield from template.occurrences(start_window, end_window)
+
+
+def occurrence_of(task_id: int) -> Optional[Tuple[int, datetime.date]]:
+    """(template id, local date) of an occurrence id, None for a stored task's id"""
+    if task_id >= 0:
+        return None
+    template_id, local_day = divmod(-task_id, OCCURRENCE_ID_DAYS)
+    return template_id, datetime.date(1970, 1, 1) + datetime.timedelta(days=local_day)
+
+
+# --- LOCAL SEARCH ---
+class _LocalSearch:
+    """
+    Anytime hill climbing over the greedy plan
+    
+    The plan is one task sequence per free gap, packed from the gap start,
+    plus the pool of unscheduled rows. Moves are relocations (including
+    pulling in an unscheduled task), swaps (including trading a placement
+    for an unscheduled task), 2-opt segment reversals within a gap, and
+    ejections (an unscheduled task displaces a run of placements). A move
+    is kept only if it raises the total score, stays within the daily
+    caps (gaps are then split at local midnight) and keeps every placed
+    task after its placed predecessors and its release, so the current plan is always the
+    best feasible one found so far.
+    """
+    
+    def __init__(
+        self,
+        free_gaps: List[TimeSlot],
+        table: TaskTable,
+        base_scores: np.ndarray,
+        sequences: List[List[int]],
+        seed: int = 0,
+        daily_caps: Optional[Tuple[float, ...]] = None,
+        dependencies: Optional[_DependencyGraph] = None,
+        releases: Optional[_ReleaseQueue] = None
+    ):
+        self.free_gaps = free_gaps
+        self.capacity = [gap.duration_minutes for gap in free_gaps]
+        # Local minute of day at each gap start; hour = (offset + elapsed) // 60
+        self.offsets = [(gap.start_minute + gap.utc_offset) % 1440 for gap in free_gaps]
+        self.durations = table.estimated_minutes.tolist()
+        self.base = np.asarray(base_scores, dtype=np.float64).tolist()
+        self.codes = table.work_types.tolist()
+        self.multipliers = [_MULTIPLIER_ROWS[code] for code in self.codes]
+        self.sequences = sequences
+        self.used = [sum(self.durations[row] for row in seq) for seq in sequences]
+        self.daily_caps = daily_caps
+        self.days = [(gap.start_minute + gap.utc_offset) // 1440 for gap in free_gaps]
+        # (day, work type code) -> minutes placed, when daily caps apply
+        self.day_used: Dict[Tuple[int, int], int] = {}
+        if daily_caps is not None:
+            for g, seq in enumerate(sequences):
+                for key, minutes in self._day_usage(g, seq).items():
+                    self.day_used[key] = self.day_used.get(key, 0) + minutes
+        self.scores = [self._score(g, seq) for g, seq in enumerate(sequences)]
+        self.dependencies = dependencies
+        self.releases = releases.minutes if releases is not None else None
+        # Row -> start minute of each placement, when precedence is checked
+        self.start_of: Dict[int, int] = {}
+        if dependencies is not None:
+            for g, seq in enumerate(sequences):
+                self.start_of.update(self._starts(g, seq))
+        self.gap_of = [-1] * len(table)
+        for g, seq in enumerate(sequences):
+            for row in seq:
+                self.gap_of[row] = g
+        self.scheduled = [row for seq in sequences for row in seq]
+        self.unscheduled = [row for row in range(len(table)) if self.gap_of[row] < 0]
+        self._positions = {row: i for i, row in enumerate(self.scheduled)}
+        self._positions.update((row, i) for i, row in enumerate(self.unscheduled))
+        self.rnd = random.Random(seed)
+        self.moves = (self._relocate, self._swap, self._two_opt, self._eject)
+        self.moves_tried = 0
+        self.improvements = 0
+
+    @property
+    def total_score(self) -> float:
+        return sum(self.scores)
+
+    def _score(self, g: int, seq: List[int]) -> float:
+        minute, total = self.offsets[g], 0.0
+        for row in seq:
+            total += self.base[row] * self.multipliers[row][minute // 60 % 24]
+            minute += self.durations[row]
+        return total
+
+    def _starts(self, g: int, seq: List[int]) -> Dict[int, int]:
+        starts, minute = {}, self.free_gaps[g].start_minute
+        for row in seq:
+            starts[row] = minute
+            minute += self.durations[row]
+        return starts
+
+    def _precedence_ok(self, changes: Dict[int, List[int]], starts: Dict[int, int]) -> bool:
+        """Does every placed task still start after its predecessors end?"""
+        removed = {row for g in changes for row in self.sequences[g]} - starts.keys()
+
+        def start(row: int) -> Optional[int]:
+            if row in starts:
+                return starts[row]
+            return None if row in removed else self.start_of.get(row)
+
+        for row, begin in starts.items():
+            for pred in self.dependencies.predecessors[row]:
+                pred_start = start(pred)
+                if pred_start is None or pred_start + self.durations[pred] > begin:
+                    return False
+            for succ in self.dependencies.successors[row]:
+                succ_start = start(succ)
+                if succ_start is not None and succ_start < begin + self.durations[row]:
+                    return False
+        return not any(
+            start(succ) is not None for row in removed for succ in self.dependencies.successors[row]
+        )
+
+    def _day_usage(self, g: int, seq: List[int]) -> Dict[Tuple[int, int], int]:
+        usage: Dict[Tuple[int, int], int] = {}
+        for row in seq:
+            key = (self.days[g], self.codes[row])
+            usage[key] = usage.get(key, 0) + self.durations[row]
+        return usage
+
+    def _day_delta(self, changes: Dict[int, List[int]]) -> Optional[Dict[Tuple[int, int], int]]:
+        """Per-(day, code) minute changes of a move, or None if it breaks a daily cap"""
+        delta: Dict[Tuple[int, int], int] = {}
+        for g, seq in changes.items():
+            for key, minutes in self._day_usage(g, self.sequences[g]).items():
+                delta[key] = delta.get(key, 0) - minutes
+            for key, minutes in self._day_usage(g, seq).items():
+                delta[key] = delta.get(key, 0) + minutes
+        for (day, code), minutes in delta.items():
+            if minutes > 0 and self.day_used.get((day, code), 0) + minutes > self.daily_caps[code]:
+                return None
+        return delta
+
+    def run(self, deadline: float) -> None:
+        """Apply random improving moves until time.perf_counter() passes `deadline`"""
+        # Nothing to move, or one task already in the only gap (packed from its start)
+        if not self.free_gaps or not self.gap_of or (len(self.free_gaps) == 1 and len(self.scheduled) == len(self.gap_of) == 1):
+            return
+        while time.perf_counter() < deadline:
+            self.moves_tried += 1
+            if self.rnd.choice(self.moves)():
+                self.improvements += 1
+
+    def _apply(self, changes: Dict[int, List[int]]) -> bool:
+        """Replace the given gaps' sequences if they fit and the total score rises"""
+        used = {g: sum(self.durations[row] for row in seq) for g, seq in changes.items()}
+        if any(used[g] > self.capacity[g] for g in changes):
+            return False
+        scores = {g: self._score(g, seq) for g, seq in changes.items()}
+        if sum(scores.values()) <= sum(self.scores[g] for g in changes):
+            return False
+        if self.dependencies is not None or self.releases is not None:
+            starts = {}
+            for g, seq in changes.items():
+                starts.update(self._starts(g, seq))
+            if self.releases is not None and any(begin < self.releases[row] for row, begin in starts.items()):
+                return False
+            if self.dependencies is not None and not self._precedence_ok(changes, starts):
+                return False
+        if self.daily_caps is not None:
+            delta = self._day_delta(changes)
+            if delta is None:
+                return False
+            for key, minutes in delta.items():
+                self.day_used[key] = self.day_used.get(key, 0) + minutes
+        
+        before = {row for g in changes for row in self.sequences[g]}
+        after = {row for seq in changes.values() for row in seq}
+        for row in before - after:
+            self._move_between(row, self.scheduled, self.unscheduled)
+            self.gap_of[row] = -1
+            self.start_of.pop(row, None)
+        for row in after - before:
+            self._move_between(row, self.unscheduled, self.scheduled)
+        for g, seq in changes.items():
+            self.sequences[g] = seq
+            self.used[g] = used[g]
+            self.scores[g] = scores[g]
+            for row in seq:
+                self.gap_of[row] = g
+        if self.dependencies is not None:
+            self.start_of.update(starts)
+        return True
+
+    def _move_between(self, row: int, source: List[int], target: List[int]) -> None:
+        """O(1) swap-remove of `row` from one pool and append to the other"""
+        i = self._positions[row]
+        last = source.pop()
+        if last != row:
+            source[i] = last
+            self._positions[last] = i
+        self._positions[row] = len(target)
+        target.append(row)
+
+    def _relocate(self) -> bool:
+        row = self.rnd.randrange(len(self.gap_of))
+        source, target = self.gap_of[row], self.rnd.randrange(len(self.free_gaps))
+        changes = {}
+        if source >= 0:
+            changes[source] = [r for r in self.sequences[source] if r != row]
+        seq = list(changes.get(target, self.sequences[target]))
+        seq.insert(self.rnd.randint(0, len(seq)), row)
+        changes[target] = seq
+        return self._apply(changes)
+
+    def _swap(self) -> bool:
+        if not self.scheduled:
+            return False
+        a = self.rnd.choice(self.scheduled)
+        b = self.rnd.randrange(len(self.gap_of))
+        ga, gb = self.gap_of[a], self.gap_of[b]
+        if a == b:
+            return False
+        swapped = {a: b, b: a}
+        changes = {ga: [swapped.get(r, r) for r in self.sequences[ga]]}
+        if gb >= 0 and gb != ga:
+            changes[gb] = [swapped.get(r, r) for r in self.sequences[gb]]
+        return self._apply(changes)
+
+    def _two_opt(self) -> bool:
+        if not self.scheduled:
+            return False
+        g = self.gap_of[self.rnd.choice(self.scheduled)]
+        seq = self.sequences[g]
+        if len(seq) < 2:
+            return False
+        i, j = sorted(self.rnd.sample(range(len(seq)), 2))
+        return self._apply({g: seq[:i] + seq[i:j + 1][::-1] + seq[j + 1:]})
+
+    def _eject(self) -> bool:
+        if not self.unscheduled:
+            return False
+        row = self.rnd.choice(self.unscheduled)
+        g = self.rnd.randrange(len(self.free_gaps))
+        seq = self.sequences[g]
+        at = self.rnd.randint(0, len(seq))
+        # Drop the fewest placements after `at` that make room for `row`
+        room = self.capacity[g] - self.used[g] - self.durations[row]
+        end = at
+        while room < 0 and end < len(seq):
+            room += self.durations[seq[end]]
+            end += 1
+        return self._apply({g: seq[:at] + [row] + seq[end:]})
+
+
+# --- SCHEDULE SUMMARY ---
+_EPOCH_DATE = datetime.date(1970, 1, 1)
+
+
+class ScheduleSummary:
+    """
+    Running aggregate of a schedule, updated as placements come and go
+    
+    Keeps the task count, minutes and score sum, per-WorkType counts and
+    minutes, and scheduled minutes per local day, so reading the summary
+    does not depend on the schedule's length.
+    """
+    __slots__ = ("tasks", "minutes", "score", "type_tasks", "type_minutes", "day_minutes")
+    
+    def __init__(self, schedule: Iterable[ScheduledTask] = ()):
+        self.tasks = 0
+        self.minutes = 0
+        self.score = 0.0
+        self.type_tasks = [0] * len(WORK_TYPES)
+        self.type_minutes = [0] * len(WORK_TYPES)
+        # Local day number (days since the epoch) -> scheduled minutes
+        self.day_minutes: Dict[int, int] = {}
+        for placement in schedule:
+            self.add(placement)
+    
+    def add(self, placement: ScheduledTask, sign: int = 1) -> None:
+        minutes = placement.end_minute - placement.start_minute
+        code = _WORK_TYPE_CODES[placement.task.work_type]
+        self.tasks += sign
+        self.minutes += sign * minutes
+        self.score += sign * placement.score
+        self.type_tasks[code] += sign
+        self.type_minutes[code] += sign * minutes
+        # Split placements that run past local midnight between their days
+        start = placement.start_minute + placement.utc_offset
+        end = placement.end_minute + placement.utc_offset
+        while start < end:
+            day = start // 1440
+            part = min(end, (day + 1) * 1440) - start
+            used = self.day_minutes.get(day, 0) + sign * part
+            if used:
+                self.day_minutes[day] = used
+            else:
+                del self.day_minutes[day]
+            start += part
+    
+    def remove(self, placement: ScheduledTask) -> None:
+        self.add(placement, sign=-1)
+    
+    def as_dict(self) -> dict:
+        deep = _WORK_TYPE_CODES[WorkType.DEEP_WORK]
+        return {
+            "total_tasks_scheduled": self.tasks,
+            "total_minutes": self.minutes,
+            "deep_work_tasks": self.type_tasks[deep],
+            "shallow_work_tasks": self.tasks - self.type_tasks[deep],
+            "total_score": self.score,
+            "average_score": self.score / self.tasks if self.tasks else 0,
+            "work_types": {
+                wt.value: {"tasks": self.type_tasks[code], "minutes": self.type_minutes[code]}
+                for code, wt in enumerate(WORK_TYPES)
+            },
+            "daily_minutes": {
+                (_EPOCH_DATE + datetime.timedelta(days=day)).isoformat(): minutes
+                for day, minutes in sorted(self.day_minutes.items())
+            },
+        }
+
+
+# --- INSTRUMENTATION ---
+class MetricsSink:
+    """
+    Receives phase timings and counters from a scheduler run
+    
+    The base class discards everything; subclass it to forward the numbers
+    elsewhere (logs, StatsD, ...). Phases: parse, gaps (when every gap is
+    materialized up front), scoring, selecting (including lazily produced
+    gaps), local_search, feasibility, dispatch (packing a run for a worker
+    process; the worker's phases are reported as usual). Counters: tasks, gaps (produced), candidates_evaluated,
+    scheduled, unscheduled, local_search_moves, local_search_improvements,
+    pool_fallbacks (runs done inline because the worker pool was broken).
+    """
+    
+    def timing(self, phase: str, seconds: float) -> None:
+        pass
+    
+    def count(self, name: str, value: int = 1) -> None:
+        pass
+
+
+class RunMetrics(MetricsSink):
+    """Collects one run's phase timings (ms) and counters"""
+    
+    def __init__(self):
+        self.timings_ms: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+    
+    def timing(self, phase: str, seconds: float) -> None:
+        self.timings_ms[phase] = self.timings_ms.get(phase, 0.0) + seconds * 1000
+    
+    def count(self, name: str, value: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+    
+    def as_dict(self) -> dict:
+        return {"timings_ms": dict(self.timings_ms), "counters": dict(self.counters)}
+
+
+class MetricsRegistry:
+    """
+    Process-wide aggregate of recorded runs (thread-safe)
+    
+    Keeps per-phase call count, total and max milliseconds, and counter
+    totals, so slow plans can be diagnosed without attaching a profiler.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self) -> None:
+        with self._lock:
+            self.runs = 0
+            self.phases: Dict[str, Dict[str, float]] = {}
+            self.counters: Dict[str, int] = {}
+    
+    def record(self, run: RunMetrics) -> None:
+        with self._lock:
+            self.runs += 1
+            for phase, ms in run.timings_ms.items():
+                stats = self.phases.setdefault(phase, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+                stats["count"] += 1
+                stats["total_ms"] += ms
+                stats["max_ms"] = max(stats["max_ms"], ms)
+            for name, value in run.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+    
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "phases": {phase: dict(stats) for phase, stats in self.phases.items()},
+                "counters": dict(self.counters),
+            }
+
+
+# Shared by every scheduler in the process; the API records runs here
+METRICS = MetricsRegistry()
+_NO_METRICS = MetricsSink()
+
+
+def _split_at_midnight(gaps: Iterable[TimeSlot]) -> Iterator[TimeSlot]:
+    """Cut gaps at local midnight so each piece lies within one day"""
+    for gap in gaps:
+        start = gap.start_minute
+        while True:
+            midnight = ((start + gap.utc_offset) // 1440 + 1) * 1440 - gap.utc_offset
+            if midnight >= gap.end_minute:
+                yield TimeSlot(start, gap.end_minute, gap.utc_offset)
+                break
+            yield TimeSlot(start, midnight, gap.utc_offset)
+            start = midnight
+
+
+def _split_at_minutes(gaps: Iterable[TimeSlot], cuts: List[int]) -> Iterator[TimeSlot]:
+    """Cut gaps at the given sorted epoch minutes (where a fill sat idle)"""
+    i = 0
+    for gap in gaps:
+        start = gap.start_minute
+        i = bisect.bisect_right(cuts, start, i)
+        while i < len(cuts) and cuts[i] < gap.end_minute:
+            yield TimeSlot(start, cuts[i], gap.utc_offset)
+            start = cuts[i]
+            i += 1
+        yield TimeSlot(start, gap.end_minute, gap.utc_offset)
+
+
+# Below this many tasks optimize_in_pool runs inline: shipping inputs to a worker costs more
+INLINE_TASK_LIMIT = 500
 
 
 # --- THE ENGINE ---
@@ -98,128 +1676,879 @@ class HeuristicScheduler:
     - Parses busy blocks from Google Calendar
     - Finds free gaps in the schedule
     - Optimizes task placement using priority, deadline urgency, and work type
+    
+    Pass a MetricsSink (e.g. RunMetrics) as `metrics` to record per-phase
+    timings and counters.
+    
+    daily_limits caps the minutes of each WorkType placed per local day,
+    e.g. {WorkType.DEEP_WORK: 240}. With limits, gaps are split at local
+    midnight (no task spans two days) and per-day usage is kept in O(1)
+    counters as tasks are placed.
     """
     
     def __init__(
         self, 
-        busy_blocks: List[dict], 
+        busy_blocks: Union[List[dict], IntervalIndex, AvailabilityBitmap, FreeGapList], 
         start_window: datetime.datetime, 
-        end_window: datetime.datetime
+        end_window: datetime.datetime,
+        now: Optional[datetime.datetime] = None,
+        metrics: Optional[MetricsSink] = None,
+        daily_limits: Optional[Dict[WorkType, int]] = None
     ):
-        self.busy_blocks = self._parse_busy_blocks(busy_blocks)
+        self.metrics = metrics or _NO_METRICS
+        # Summary of the latest run, maintained as placements are made
+        self.summary = ScheduleSummary()
+        self.daily_limits = dict(daily_limits or {})
+        # Per work type code; None when nothing is capped
+        self._daily_caps: Optional[Tuple[float, ...]] = None
+        if self.daily_limits:
+            self._daily_caps = tuple(self.daily_limits.get(wt, math.inf) for wt in WORK_TYPES)
+        # A prebuilt IntervalIndex, AvailabilityBitmap or FreeGapList is used as-is
+        if isinstance(busy_blocks, (IntervalIndex, AvailabilityBitmap, FreeGapList)):
+            self.busy_index = busy_blocks
+        else:
+            with self._phase("parse"):
+                self.busy_index = IntervalIndex(self._busy_intervals(busy_blocks))
         self.start_window = start_window
         self.end_window = end_window
+        # Frozen "now" for deadline urgency, so a run scores consistently
+        self.now = now if now is not None else start_window
 
-    def _parse_busy_blocks(self, raw_blocks: List[dict]) -> List[TimeSlot]:
-        """Parse busy blocks from various formats (dict or Pydantic model)"""
-        parsed = []
+    @staticmethod
+    def _busy_intervals(raw_blocks: List[dict]) -> Iterator[Tuple[datetime.datetime, datetime.datetime, None]]:
+        """Busy blocks from various formats (dict or Pydantic model) as datetimes"""
         for b in raw_blocks:
             # Handle Pydantic models or Dicts
             start_str = b.start_time if hasattr(b, 'start_time') else b['start_time']
             end_str = b.end_time if hasattr(b, 'end_time') else b['end_time']
             
-            parsed.append(TimeSlot(
-                start=datetime.datetime.fromisoformat(start_str),
-                end=datetime.datetime.fromisoformat(end_str)
-            ))
-        return sorted(parsed, key=lambda x: x.start)
+            yield (
+                datetime.datetime.fromisoformat(start_str),
+                datetime.datetime.fromisoformat(end_str),
+                None
+            )
+
+    def _parse_busy_blocks(self, raw_blocks: List[dict]) -> List[TimeSlot]:
+        """Parse busy blocks from various formats (dict or Pydantic model)"""
+        parsed = [
+            TimeSlot.from_datetimes(start, end) for start, end, _ in self._busy_intervals(raw_blocks)
+        ]
+        return sorted(parsed, key=lambda x: x.start_minute)
+
+    @property
+    def busy_blocks(self) -> List[TimeSlot]:
+        """Busy blocks as parsed, sorted by start"""
+        return [TimeSlot.from_datetimes(start, end) for start, end, _ in self.busy_index.raw]
 
     def find_free_gaps(self) -> List[TimeSlot]:
         """
-        Find all free time gaps between busy blocks
+        Find all free time gaps between busy blocks within the window
         Filters out gaps smaller than 15 minutes
         """
-        free_gaps = []
-        current_pointer = self.start_window
+        with self._phase("gaps"):
+            free_gaps = self.busy_index.free_gaps(self.start_window, self.end_window)
+        self.metrics.count("gaps", len(free_gaps))
+        return free_gaps
 
-        for block in self.busy_blocks:
-            if block.start > current_pointer:
-                gap_duration = (block.start - current_pointer).total_seconds() / 60
-                if gap_duration >= 15:  # Filter out tiny gaps
-                    free_gaps.append(TimeSlot(start=current_pointer, end=block.start))
-            current_pointer = max(current_pointer, block.end)
+    def iter_free_gaps(self) -> Iterator[TimeSlot]:
+        """find_free_gaps as a generator: each gap is produced only when pulled"""
+        pulled = 0
+        try:
+            for gap in self.busy_index.iter_free_gaps(self.start_window, self.end_window):
+                pulled += 1
+                yield gap
+        finally:
+            self.metrics.count("gaps", pulled)
 
-        # Add remaining time after last busy block
-        if self.end_window > current_pointer:
-            free_gaps.append(TimeSlot(start=current_pointer, end=self.end_window))
+    def free_gaps_between(self, start: datetime.datetime, end: datetime.datetime) -> List[TimeSlot]:
+        """Free gaps in an arbitrary range, e.g. Thursday 14:00-18:00"""
+        return self.busy_index.free_gaps(start, end)
+
+    def is_busy(self, moment: datetime.datetime) -> bool:
+        return self.busy_index.is_busy(moment)
+
+    def can_fit(self, start: datetime.datetime, minutes: float) -> bool:
+        """Would a task of `minutes` fit starting at `start`?"""
+        return self.busy_index.fits(start, minutes)
+
+    def check_deadlines(self, tasks: Union[List[Task], TaskTable]) -> FeasibilityReport:
+        """
+        Earliest-deadline-first admission check, in O(n log n)
+        
+        Measures time in free minutes (gaps are pulled only up to the latest
+        deadline) and runs Moore-Hodgson over it: tasks are admitted in
+        deadline order, and whenever the admitted work exceeds the free time
+        before the current deadline the longest admitted task (the lowest
+        priority among equally long ones) is dropped. A task longer than
+        every gap before its deadline is dropped outright. The dropped tasks
+        are the fewest that must go for the rest to fit.
+        
+        The check treats work as splittable across gaps and ignores daily
+        limits, dependencies and release times, so it never flags a feasible task set; a
+        "feasible" answer is necessary, not sufficient, for the plan to
+        place every task on time. Tasks due after end_window may use free
+        time this scheduler cannot see, so they are left out of the check
+        and listed as beyond_horizon instead.
+        """
+        with self._phase("feasibility"):
+            table = tasks if isinstance(tasks, TaskTable) else TaskTable.from_tasks(tasks)
+            minutes = table.estimated_minutes.tolist()
+            priorities = table.priorities.tolist()
+            deadline_minutes = np.floor(table.deadlines / 60).astype(np.int64)
+            deadlines = deadline_minutes.tolist()
+            horizon = epoch_minutes(self.end_window)
+            rows = [row for row in np.argsort(deadline_minutes, kind="stable").tolist()
+                    if deadlines[row] <= horizon]
+            beyond = sorted(set(range(len(table))).difference(rows), key=lambda row: (deadlines[row], row))
+            latest = deadlines[rows[-1]] if rows else 0
             
-        return free_gaps
+            # Gap timeline: starts, free minutes before each gap, longest gap before each gap
+            starts, ends, before, longest_before = [], [], [0], [0]
+            for gap in self.iter_free_gaps():
+                if gap.start_minute >= latest:
+                    break
+                starts.append(gap.start_minute)
+                ends.append(gap.end_minute)
+                before.append(before[-1] + gap.duration_minutes)
+                longest_before.append(max(longest_before[-1], gap.duration_minutes))
+            
+            def capacity_at(deadline: int) -> Tuple[int, int]:
+                """(free minutes, longest free stretch) before `deadline`"""
+                i = bisect.bisect_right(starts, deadline) - 1
+                if i < 0:
+                    return 0, 0
+                partial = min(deadline, ends[i]) - starts[i]
+                return before[i] + partial, max(longest_before[i], partial)
+            
+            admitted: List[Tuple[int, int, int]] = []  # Max-heap on (minutes, -priority)
+            demand, dropped = 0, []
+            for row in rows:
+                capacity, longest_gap = capacity_at(deadlines[row])
+                if minutes[row] > longest_gap:
+                    dropped.append(row)
+                    continue
+                heapq.heappush(admitted, (-minutes[row], priorities[row], row))
+                demand += minutes[row]
+                if demand > capacity:
+                    longest, _, victim = heapq.heappop(admitted)
+                    demand += longest
+                    dropped.append(victim)
+        
+        dropped.sort(key=lambda row: (deadlines[row], row))
+        return FeasibilityReport(
+            feasible=not dropped,
+            infeasible_tasks=tuple(table.task(row) for row in dropped),
+            demand_minutes=int(sum(minutes[row] for row in rows)),
+            capacity_minutes=capacity_at(latest)[0],
+            beyond_horizon=tuple(table.task(row) for row in beyond)
+        )
 
-    def optimize_schedule(self, tasks: List[Task]) -> List[ScheduledTask]:
+    def optimize_schedule(
+        self,
+        tasks: Union[List[Task], TaskTable],
+        budget_ms: Optional[float] = None,
+        seed: int = 0
+    ) -> List[ScheduledTask]:
         """
         Main optimization algorithm
         
-        1. Find all free gaps
-        2. For each gap, calculate scores for all pending tasks
-        3. Assign highest-scoring task that fits
+        1. Produce free gaps lazily, in order
+        2. Score every task once (vectorized) and index by duration
+        3. For each gap, assign the highest-scoring task that fits,
+           stopping as soon as every task is placed
         4. Time-of-Day multipliers are applied based on gap's start hour
+        5. With a budget_ms, improve the plan by local search until the
+           budget runs out (total score never drops below the greedy one);
+           this needs every gap in the window up front
+        
+        Accepts a list of Tasks or a TaskTable; row order breaks score ties.
         """
-        schedule = []
-        free_gaps = self.find_free_gaps()
+        started = time.perf_counter()
+        self.summary = ScheduleSummary()
+        free_gaps, table, base_scores, pending, dependencies, releases = self._prepare(tasks, lazy=not budget_ms)
+        
+        points = [
+            point for point in self._timed_fill(free_gaps, table, pending, dependencies, releases)
+            if point.placement is not None
+        ]
+        if not budget_ms:
+            schedule = [point.placement for point in points]
+        else:
+            if releases is not None:
+                free_gaps, points = self._cut_idle(free_gaps, points)
+            sequences: List[List[int]] = [[] for _ in free_gaps]
+            for point in points:
+                sequences[point.gap_index].append(point.order)
+            with self._phase("local_search"):
+                search = _LocalSearch(
+                    free_gaps, table, base_scores, sequences, seed, self._daily_caps, dependencies, releases
+                )
+                search.run(started + budget_ms / 1000)
+                schedule = self._pack(free_gaps, table, search)
+            self.summary = ScheduleSummary(schedule)
+            self.metrics.count("local_search_moves", search.moves_tried)
+            self.metrics.count("local_search_improvements", search.improvements)
+        
+        self.metrics.count("scheduled", len(schedule))
+        self.metrics.count("unscheduled", len(table) - len(schedule))
+        return schedule
+
+    def iter_schedule(self, tasks: Union[List[Task], TaskTable]) -> Iterator[ScheduledTask]:
+        """
+        Greedy placements one at a time, in chronological order
         
-        # Make a copy to track unscheduled tasks
-        pending_tasks = list(tasks)
+        Yields the same placements as optimize_schedule() without a budget,
+        each as soon as it is decided, so callers can stream the plan.
+        """
+        self.summary = ScheduleSummary()
+        free_gaps, table, _, pending, dependencies, releases = self._prepare(tasks, lazy=True)
+        scheduled = 0
+        try:
+            for point in self._timed_fill(free_gaps, table, pending, dependencies, releases):
+                if point.placement is not None:
+                    scheduled += 1
+                    yield point.placement
+        finally:
+            self.metrics.count("scheduled", scheduled)
+            self.metrics.count("unscheduled", len(table) - scheduled)
+
+    def optimize_in_pool(
+        self,
+        executor: Optional[concurrent.futures.Executor],
+        tasks: Union[List[Task], TaskTable],
+        budget_ms: Optional[float] = None,
+        seed: int = 0,
+        inline_below: int = INLINE_TASK_LIMIT
+    ) -> List[ScheduledTask]:
+        """
+        optimize_schedule() run in a worker process, so a large plan does
+        not hold this process's GIL
+        
+        The worker gets the busy index (a bitmap travels as runs of equal
+        coverage) and produces the gaps lazily as usual, and the tasks as a
+        packed TaskTable, and returns placements as arrays of row numbers
+        and minutes; they are rebuilt here around the original Task objects.
+        Runs with fewer than `inline_below` tasks (or no executor) stay
+        inline, where shipping the inputs would cost more than the run.
+        The worker's phase timings and counters, and the schedule summary,
+        are copied back into this scheduler. If the pool is broken (a worker
+        died, e.g. OOM-killed) the run falls back to inline.
+        """
+        if executor is None or len(tasks) < inline_below:
+            return self.optimize_schedule(tasks, budget_ms=budget_ms, seed=seed)
+        table = tasks if isinstance(tasks, TaskTable) else TaskTable.from_tasks(tasks)
+        try:
+            result = self._dispatch(executor, table, budget_ms, seed).result()
+        except concurrent.futures.BrokenExecutor:
+            self.metrics.count("pool_fallbacks")
+            return self.optimize_schedule(tasks, budget_ms=budget_ms, seed=seed)
+        return self._collect(table, result)
+
+    def _dispatch(
+        self, executor: concurrent.futures.Executor, table: TaskTable, budget_ms: Optional[float], seed: int
+    ) -> concurrent.futures.Future:
+        """Submit a packed run to `executor`; pass its result to _collect"""
+        with self._phase("dispatch"):
+            return executor.submit(
+                _optimize_packed, self.busy_index, table.packed(), self.start_window, self.end_window,
+                self.now, self.daily_limits, budget_ms, seed
+            )
+
+    def _collect(self, table: TaskTable, result: tuple) -> List[ScheduledTask]:
+        """Placements of a packed run's result, with its metrics and summary adopted"""
+        minutes, scores, summary, metrics = result
+        for phase, ms in metrics.timings_ms.items():
+            self.metrics.timing(phase, ms / 1000)
+        for name, value in metrics.counters.items():
+            self.metrics.count(name, value)
+        self.summary = summary
+        return [
+            ScheduledTask(table.task(row), start, end, score, utc_offset)
+            for (row, start, end, utc_offset), score in zip(minutes.tolist(), scores.tolist())
+        ]
+
+    def _prepare(self, tasks: Union[List[Task], TaskTable], lazy: bool = False) -> Tuple[
+        Iterable[TimeSlot], TaskTable, np.ndarray, "_CandidateIndex",
+        Optional["_DependencyGraph"], Optional["_ReleaseQueue"]
+    ]:
+        """
+        Free gaps (a generator if lazy), task table, base scores, candidate
+        index, dependency graph and release queue (each None when no task
+        needs one) for a run. Only ready, released rows start out as
+        candidates; held rows join as the fill reaches their release.
+        """
+        free_gaps = self.iter_free_gaps() if lazy else self.find_free_gaps()
+        with self._phase("scoring"):
+            table = tasks if isinstance(tasks, TaskTable) else TaskTable.from_tasks(tasks)
+            base_scores = table.base_urgency(self.now)
+            dependencies = None
+            if table.depends_on is not None:
+                dependencies = _DependencyGraph(table, base_scores)
+            ready = dependencies.ready() if dependencies is not None else None
+            releases = None
+            if table.available_from is not None:
+                releases = _ReleaseQueue(table, base_scores)
+                start_minute = epoch_minutes(self.start_window)
+                ready = releases.admit(range(len(table)) if ready is None else ready, start_minute)
+            pending = _CandidateIndex.from_table(table, base_scores, ready)
+        if self._daily_caps is not None:
+            free_gaps = _split_at_midnight(free_gaps)
+        if not lazy and not isinstance(free_gaps, list):
+            free_gaps = list(free_gaps)
+        self.metrics.count("tasks", len(table))
+        return free_gaps, table, base_scores, pending, dependencies, releases
+
+    @contextlib.contextmanager
+    def _phase(self, name: str) -> Iterator[None]:
+        """Book the wall time of the block to phase `name`"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.metrics.timing(name, time.perf_counter() - started)
 
-        for gap in free_gaps:
-            gap_pointer = gap.start
-            gap_hour = gap.hour  # Use for time-of-day multiplier
+    def _timed_fill(
+        self,
+        free_gaps: Iterable[TimeSlot],
+        table: TaskTable,
+        pending: "_CandidateIndex",
+        dependencies: Optional["_DependencyGraph"] = None,
+        releases: Optional["_ReleaseQueue"] = None
+    ) -> Iterator["_DecisionPoint"]:
+        """
+        _greedy_fill that stops once every task is placed, with only the
+        engine's own time (not the consumer's) booked to selecting.
+        Lazily produced gaps are pulled inside the fill, so their cost
+        counts as selecting too. Placements are added to self.summary.
+        """
+        fill = self._greedy_fill(
+            free_gaps, table.task, pending, stop_when_done=True, dependencies=dependencies, releases=releases
+        )
+        evaluated, elapsed = pending.evaluated, 0.0
+        try:
+            while True:
+                started = time.perf_counter()
+                point = next(fill, None)
+                elapsed += time.perf_counter() - started
+                if point is None:
+                    return
+                if point.placement is not None:
+                    self.summary.add(point.placement)
+                yield point
+        finally:
+            fill.close()
+            self.metrics.timing("selecting", elapsed)
+            self.metrics.count("candidates_evaluated", pending.evaluated - evaluated)
+
+    @staticmethod
+    def _cut_idle(
+        free_gaps: List[TimeSlot], points: List["_DecisionPoint"]
+    ) -> Tuple[List[TimeSlot], List["_DecisionPoint"]]:
+        """
+        Cut gaps where the fill sat idle waiting for a release, so local
+        search (which packs each gap from its start) keeps those starts
+        """
+        cuts, ends = [], {}
+        for point in points:
+            if point.pointer != ends.get(point.gap_index, free_gaps[point.gap_index].start_minute):
+                cuts.append(point.pointer)
+            ends[point.gap_index] = point.placement.end_minute
+        if not cuts:
+            return free_gaps, points
+        pieces = list(_split_at_minutes(free_gaps, cuts))
+        starts = [piece.start_minute for piece in pieces]
+        return pieces, [
+            point._replace(gap_index=bisect.bisect_right(starts, point.pointer) - 1) for point in points
+        ]
+
+    def _pack(self, free_gaps: List[TimeSlot], table: TaskTable, search: "_LocalSearch") -> List[ScheduledTask]:
+        """Lay each gap's task sequence out back to back from the gap start"""
+        schedule = []
+        for g, seq in enumerate(search.sequences):
+            gap = free_gaps[g]
+            pointer = gap.start_minute
+            for row in seq:
+                hour = (pointer + gap.utc_offset) // 60 % 24
+                schedule.append(ScheduledTask(
+                    task=table.task(row),
+                    start_minute=pointer,
+                    end_minute=pointer + search.durations[row],
+                    score=search.base[row] * search.multipliers[row][hour],
+                    utc_offset=gap.utc_offset
+                ))
+                pointer += search.durations[row]
+        return schedule
+    
+    def _greedy_fill(
+        self,
+        free_gaps: Iterable[TimeSlot],
+        task_at: Callable[[int], Task],
+        pending: "_CandidateIndex",
+        start_gap: int = 0,
+        start_pointer: Optional[int] = None,
+        stop_when_done: bool = False,
+        dependencies: Optional["_DependencyGraph"] = None,
+        releases: Optional["_ReleaseQueue"] = None
+    ) -> Iterator["_DecisionPoint"]:
+        """
+        Greedy gap filling as a stream of decision points
+        
+        Yields each placement before it is committed (the chosen task leaves
+        `pending` when the generator resumes), plus an empty point wherever a
+        gap is left with 15+ minutes that no pending task fits. Gaps may be
+        a list or a generator; with stop_when_done no further gap is pulled
+        once `pending` is empty. With `dependencies`, placing a task pushes
+        the successors it readies into `pending`; since the pointer only
+        moves forward, they always start after it ends. With `releases`,
+        held rows join `pending` once the pointer reaches their release; if
+        nothing fits before then, the pointer jumps to the next release
+        still inside the gap (after an empty point for the idle stretch).
+        """
+        if isinstance(free_gaps, list):
+            gaps = free_gaps[start_gap:]
+        else:
+            gaps = itertools.islice(free_gaps, start_gap, None)
+        # (local day, work type code) -> minutes placed, for daily_limits
+        day_used: Dict[Tuple[int, int], int] = {}
+        caps = None
+        for gap_index, gap in enumerate(gaps, start_gap):
+            if stop_when_done and not pending and not (releases is not None and releases.held):
+                return
+            gap_pointer = gap.start_minute
+            if gap_index == start_gap and start_pointer is not None:
+                gap_pointer = start_pointer
             
             # Keep filling this gap while we have tasks
-            while pending_tasks:
-                remaining_gap_minutes = (gap.end - gap_pointer).total_seconds() / 60
+            while True:
+                remaining_gap_minutes = gap.end_minute - gap_pointer
                 
                 if remaining_gap_minutes < 15:
                     break  # Gap too small for any meaningful work
                 
-                # Calculate scores for all tasks that fit
-                candidates = []
-                for task in pending_tasks:
-                    if task.estimated_minutes <= remaining_gap_minutes:
-                        # Calculate score with time-of-day multiplier
-                        score = task.heuristic_score(time_block_hour=gap_hour)
-                        candidates.append((task, score))
+                if releases is not None:
+                    for row in releases.due(gap_pointer):
+                        task = task_at(row)
+                        pending.push(row, task.work_type, task.estimated_minutes, releases.base[row])
                 
-                if not candidates:
+                # Highest-scoring task that fits, with the pointer's time-of-day multiplier
+                gap_hour = (gap_pointer + gap.utc_offset) // 60 % 24
+                if self._daily_caps is not None:
+                    day = (gap_pointer + gap.utc_offset) // 1440
+                    caps = tuple(
+                        cap - day_used.get((day, code), 0) for code, cap in enumerate(self._daily_caps)
+                    )
+                best = pending.best_fit(remaining_gap_minutes, gap_hour, caps) if pending else None
+                if best is None:
+                    yield _DecisionPoint(gap_index, gap_pointer, remaining_gap_minutes, gap_hour)
+                    release = releases.next_release() if releases is not None else None
+                    if release is not None and gap.end_minute - release >= 15:
+                        gap_pointer = release  # Sit idle until the next task is released
+                        continue
                     break  # No tasks fit in remaining gap
                 
-                # Select the highest-scoring task
-                candidates.sort(key=lambda x: x[1], reverse=True)
-                best_task, best_score = candidates[0]
+                order, best_score = best
+                best_task = task_at(order)
+                end_minute = gap_pointer + best_task.estimated_minutes
                 
-                # Schedule it
-                start_time = gap_pointer
-                end_time = start_time + datetime.timedelta(minutes=best_task.estimated_minutes)
-                
-                schedule.append(ScheduledTask(
-                    task=best_task,
-                    start_time=start_time,
-                    end_time=end_time,
-                    score=best_score
-                ))
+                yield _DecisionPoint(
+                    gap_index, gap_pointer, remaining_gap_minutes, gap_hour, order, best_score,
+                    ScheduledTask(
+                        task=best_task,
+                        start_minute=gap_pointer,
+                        end_minute=end_minute,
+                        score=best_score,
+                        utc_offset=gap.utc_offset
+                    )
+                )
                 
                 # Update state
-                gap_pointer = end_time
-                gap_hour = gap_pointer.hour  # Update hour for next iteration
-                pending_tasks.remove(best_task)
-                
-        return schedule
+                pending.remove(order)
+                gap_pointer = end_minute
+                if dependencies is not None:
+                    ready = dependencies.release(order)
+                    if releases is not None:
+                        ready = releases.admit(ready, gap_pointer)
+                    for row in ready:
+                        task = task_at(row)
+                        pending.push(row, task.work_type, task.estimated_minutes, dependencies.base[row])
+                if caps is not None:
+                    key = (day, _WORK_TYPE_CODES[best_task.work_type])
+                    day_used[key] = day_used.get(key, 0) + best_task.estimated_minutes
+    
+    def get_schedule_summary(self, schedule: Optional[List[ScheduledTask]] = None) -> dict:
+        """
+        Summary of the latest run (kept as it was placed, so no pass over
+        the schedule), or of `schedule` if one is given
+        """
+        summary = self.summary if schedule is None else ScheduleSummary(schedule)
+        return summary.as_dict()
+
+# --- INCREMENTAL REPAIR ---
+class IncrementalScheduler(HeuristicScheduler):
+    """
+    HeuristicScheduler that keeps its last plan and repairs it on change
+    
+    optimize_schedule() records every greedy decision point along with the
+    free gaps and the pool of unplaced tasks. Each delta (task added, removed
+    or updated; busy block added or removed) finds the first decision it can
+    change, restores the pending pool to that point, and re-runs the greedy
+    fill from there. As soon as the replay stands where the old run stood
+    with the same pending tasks, the old tail is spliced back unchanged.
     
-    def get_schedule_summary(self, schedule: List[ScheduledTask]) -> dict:
-        """Generate a summary of the optimized schedule"""
-        total_minutes = sum(
-            (s.end_time - s.start_time).total_seconds() / 60 
-            for s in schedule
+    The repaired schedule is identical to a fresh optimize_schedule() over
+    the current tasks (in their original order, new ones appended) and
+    busy blocks. Tasks are identified by Task.id and treated as immutable:
+    pass a new Task object to update_task rather than mutating the old one.
+    
+    Decision-point repair covers the plain greedy fill. With daily_limits,
+    a local-search budget, or tasks that have dependencies or release
+    times, every delta re-runs the full HeuristicScheduler instead; the
+    schedule is the same either way, only the repair is slower.
+    
+    Library API only: it pays off for a caller that keeps one instance
+    alive across edits (e.g. a desktop client or a per-user worker). The
+    HTTP routes are stateless and re-plan with /optimize/from-db, whose
+    plans usually carry dependencies and recurring-task release times.
+    """
+    
+    def optimize_schedule(
+        self, tasks: List[Task], budget_ms: Optional[float] = None, seed: int = 0
+    ) -> List[ScheduledTask]:
+        """Full run that also records the state needed for later repairs"""
+        self._tasks: List[Optional[Task]] = list(tasks)
+        self._order_by_id = {task.id: order for order, task in enumerate(self._tasks)}
+        self._run_options = (budget_ms, seed)
+        self._full_runs = bool(budget_ms) or self._daily_caps is not None or \
+            any(self._needs_full_run(task) for task in tasks)
+        if self._full_runs:
+            return self._rerun()
+
+        table = TaskTable.from_tasks(self._tasks)
+        base_scores = table.base_urgency(self.now)
+        self._base = base_scores.tolist()
+        self._pending = _CandidateIndex.from_table(table, base_scores)
+        
+        self.free_gaps = self.find_free_gaps()
+        self.summary = ScheduleSummary()
+        self._points: List[_DecisionPoint] = []
+        self._replay(0, 0, None, set())
+        return self.schedule
+    
+    def optimize_in_pool(
+        self,
+        executor: Optional[concurrent.futures.Executor],
+        tasks: Union[List[Task], TaskTable],
+        budget_ms: Optional[float] = None,
+        seed: int = 0,
+        inline_below: int = INLINE_TASK_LIMIT
+    ) -> List[ScheduledTask]:
+        """Always inline: later repairs need the run's state in this process"""
+        if isinstance(tasks, TaskTable):
+            tasks = [tasks.task(row) for row in range(len(tasks))]
+        return self.optimize_schedule(tasks, budget_ms=budget_ms, seed=seed)
+    
+    # --- Deltas ---
+    def add_task(self, task: Task) -> List[ScheduledTask]:
+        """Add a new task and repair the schedule"""
+        if task.id in self._order_by_id:
+            raise ValueError(f"Task {task.id} is already scheduled; use update_task")
+        if self._full_runs or self._needs_full_run(task):
+            self._order_by_id[task.id] = len(self._tasks)
+            self._tasks.append(task)
+            return self._rerun()
+        
+        order = len(self._tasks)
+        base_score = task.base_urgency(self.now)
+        first = self._first_win(order, task, base_score)
+        if first is not None:
+            self._restore(first)
+        
+        self._tasks.append(task)
+        self._order_by_id[task.id] = order
+        self._base.append(base_score)
+        self._pending.push(order, task.work_type, task.estimated_minutes, base_score)
+        
+        if first is not None:
+            self._replay_from_point(first, {id(task)})
+        return self.schedule
+    
+    def remove_task(self, task_id: int) -> List[ScheduledTask]:
+        """Remove a task (deleted or completed) and repair the schedule"""
+        order = self._order_by_id.pop(task_id, None)
+        if order is None:
+            raise KeyError(f"Task {task_id} is not part of this schedule")
+        if self._full_runs:
+            self._tasks[order] = None
+            return self._rerun()
+        
+        placed_at = self._placement_point(order)
+        if placed_at is not None:
+            self._restore(placed_at)
+        self._pending.remove(order)
+        old, self._tasks[order] = self._tasks[order], None
+        
+        if placed_at is not None:
+            self._replay_from_point(placed_at, {id(old)})
+        return self.schedule
+    
+    def update_task(self, task: Task) -> List[ScheduledTask]:
+        """Replace the task with the same id and repair the schedule"""
+        order = self._order_by_id.get(task.id)
+        if order is None:
+            raise KeyError(f"Task {task.id} is not part of this schedule")
+        if self._full_runs or self._needs_full_run(task):
+            self._tasks[order] = task
+            return self._rerun()
+        
+        old = self._tasks[order]
+        if (old.estimated_minutes, old.priority, old.deadline, old.work_type) == \
+                (task.estimated_minutes, task.priority, task.deadline, task.work_type):
+            # Nothing that affects scoring changed; just swap the object in
+            self._tasks[order] = task
+            self._points = [
+                point._replace(placement=dataclasses.replace(point.placement, task=task))
+                if point.order == order else point
+                for point in self._points
+            ]
+            return self.schedule
+        
+        base_score = task.base_urgency(self.now)
+        placed_at = self._placement_point(order)
+        wins_at = self._first_win(order, task, base_score)
+        first = min((p for p in (placed_at, wins_at) if p is not None), default=None)
+        if first is not None:
+            self._restore(first)
+        
+        self._tasks[order] = task
+        self._base[order] = base_score
+        self._pending.push(order, task.work_type, task.estimated_minutes, base_score)
+        
+        if first is not None:
+            diff = {id(old), id(task)} if placed_at is not None else {id(task)}
+            self._replay_from_point(first, diff)
+        return self.schedule
+    
+    def add_busy_block(self, block) -> List[ScheduledTask]:
+        """Add a busy block (dict or BusyBlock) and repair the schedule"""
+        for start, end, _ in self._busy_intervals([block]):
+            self.busy_index.add(start, end)
+        return self._rerun() if self._full_runs else self._regap()
+    
+    def remove_busy_block(self, block) -> List[ScheduledTask]:
+        """Remove a previously added busy block and repair the schedule"""
+        for start, end, _ in self._busy_intervals([block]):
+            self.busy_index.remove(start, end)
+        return self._rerun() if self._full_runs else self._regap()
+    
+    @property
+    def schedule(self) -> List[ScheduledTask]:
+        if self._full_runs:
+            return list(self._schedule)
+        return [point.placement for point in self._points if point.placement is not None]
+    
+    # --- Repair machinery ---
+    @staticmethod
+    def _needs_full_run(task: Task) -> bool:
+        """Decision-point repair does not model precedence or release times"""
+        return bool(task.depends_on) or task.available_from is not None
+    
+    def _rerun(self) -> List[ScheduledTask]:
+        """Full HeuristicScheduler run over the current tasks; from here on every delta does one"""
+        self._full_runs = True
+        budget_ms, seed = self._run_options
+        self._schedule = super().optimize_schedule(
+            [task for task in self._tasks if task is not None], budget_ms=budget_ms, seed=seed
+        )
+        return self.schedule
+    
+    def _placement_point(self, order: int) -> Optional[int]:
+        for index, point in enumerate(self._points):
+            if point.order == order:
+                return index
+        return None
+    
+    def _first_win(self, order: int, task: Task, base_score: float) -> Optional[int]:
+        """First recorded decision the task would have won had it been pending"""
+        multipliers = TIME_OF_DAY_MULTIPLIERS[task.work_type]
+        for index, point in enumerate(self._points):
+            if task.estimated_minutes > point.remaining_minutes:
+                continue
+            score = base_score * multipliers[point.hour]
+            if point.order is None or score > point.score or \
+                    (score == point.score and order < point.order):
+                return index
+        return None
+    
+    def _restore(self, first: int) -> None:
+        """Put tasks placed at or after decision `first` back into the pending pool"""
+        for point in self._points[first:]:
+            if point.order is not None:
+                task = self._tasks[point.order]
+                self._pending.push(
+                    point.order, task.work_type, task.estimated_minutes, self._base[point.order]
+                )
+    
+    def _replay_from_point(self, first: int, diff: set) -> None:
+        point = self._points[first]
+        self._replay(first, point.gap_index, point.pointer, diff)
+    
+    def _regap(self) -> List[ScheduledTask]:
+        """Recompute free gaps and replay from the first one that changed"""
+        old_gaps, new_gaps = self.free_gaps, self.find_free_gaps()
+        
+        prefix = 0
+        while prefix < min(len(old_gaps), len(new_gaps)) and old_gaps[prefix] == new_gaps[prefix]:
+            prefix += 1
+        if prefix == len(old_gaps) == len(new_gaps):
+            return self.schedule
+        suffix = 0
+        while suffix < min(len(old_gaps), len(new_gaps)) - prefix and \
+                old_gaps[-1 - suffix] == new_gaps[-1 - suffix]:
+            suffix += 1
+        
+        first = next(
+            (i for i, point in enumerate(self._points) if point.gap_index >= prefix),
+            len(self._points)
         )
-        deep_work_count = sum(
-            1 for s in schedule 
-            if s.task.work_type == WorkType.DEEP_WORK
+        self._restore(first)
+        self.free_gaps = new_gaps
+        self._replay(
+            first, prefix, None, set(),
+            old_suffix=len(old_gaps) - suffix, shift=len(new_gaps) - len(old_gaps)
         )
-        shallow_work_count = len(schedule) - deep_work_count
+        return self.schedule
+    
+    def _replay(
+        self,
+        first: int,
+        start_gap: int,
+        start_pointer: Optional[int],
+        diff: set,
+        old_suffix: int = 0,
+        shift: int = 0
+    ) -> None:
+        """
+        Re-run the greedy fill from decision `first` and splice the old tail
         
-        return {
-            "total_tasks_scheduled": len(schedule),
-            "total_minutes": total_minutes,
-            "deep_work_tasks": deep_work_count,
-            "shallow_work_tasks": shallow_work_count,
-            "average_score": sum(s.score for s in schedule) / len(schedule) if schedule else 0
-        }
\ No newline at end of file
+        `diff` holds id()s of the Task objects (versions) whose pending status
+        differs between the old run and the replay; old decision points from
+        gap `old_suffix` on are unaffected by gap changes and now sit `shift`
+        gaps later. self.summary drops the discarded placements and gains the
+        replayed ones; the spliced tail is already counted.
+        """
+        old_points = self._points
+        replayed: List[_DecisionPoint] = []
+        cursor = first
+        fill = self._greedy_fill(self.free_gaps, self._tasks.__getitem__, self._pending, start_gap, start_pointer)
+        for point in fill:
+            # Old decisions strictly before this position leave the old pending pool
+            while cursor < len(old_points) and old_points[cursor].pointer < point.pointer:
+                if old_points[cursor].placement is not None:
+                    diff ^= {id(old_points[cursor].placement.task)}
+                cursor += 1
+            
+            if not diff and cursor < len(old_points):
+                old = old_points[cursor]
+                if old.gap_index >= old_suffix and old.gap_index + shift == point.gap_index \
+                        and old.pointer == point.pointer:
+                    # Same position, same pending tasks: the old tail still holds
+                    fill.close()
+                    tail = old_points[cursor:]
+                    if shift:
+                        tail = [p._replace(gap_index=p.gap_index + shift) for p in tail]
+                    for p in tail:
+                        if p.order is not None:
+                            self._pending.remove(p.order)
+                    self._update_summary(old_points[first:cursor], replayed)
+                    self._points = old_points[:first] + replayed + tail
+                    return
+            
+            replayed.append(point)
+            if point.placement is not None:
+                diff ^= {id(point.placement.task)}
+        
+        self._update_summary(old_points[first:], replayed)
+        self._points = old_points[:first] + replayed
+    
+    def _update_summary(self, dropped: List[_DecisionPoint], added: List[_DecisionPoint]) -> None:
+        for point in dropped:
+            if point.placement is not None:
+                self.summary.remove(point.placement)
+        for point in added:
+            if point.placement is not None:
+                self.summary.add(point.placement)
+
+
+# --- SCENARIOS ---
+def evaluate_scenario(
+    busy_index: Union[IntervalIndex, AvailabilityBitmap, FreeGapList],
+    tasks: List[Task],
+    start_window: datetime.datetime,
+    end_window: datetime.datetime,
+    now: datetime.datetime,
+    daily_limits: Optional[Dict[WorkType, int]] = None,
+    budget_ms: Optional[float] = None
+) -> Tuple[dict, RunMetrics]:
+    """
+    Optimize one what-if variant and return its summary and run metrics
+    
+    Module-level (picklable) so variants can run in a process pool, each
+    worker reusing the busy index built once by the caller and pulling
+    gaps from it lazily.
+    """
+    metrics = RunMetrics()
+    scheduler = HeuristicScheduler(
+        busy_index, start_window, end_window, now=now, metrics=metrics, daily_limits=daily_limits
+    )
+    scheduler.optimize_schedule(tasks, budget_ms=budget_ms)
+    summary = scheduler.get_schedule_summary()
+    summary["unscheduled_tasks"] = len(tasks) - summary["total_tasks_scheduled"]
+    return summary, metrics
+
+
+def evaluate_scenarios(
+    busy_index: Union[IntervalIndex, AvailabilityBitmap, FreeGapList],
+    task_lists: List[List[Task]],
+    start_window: datetime.datetime,
+    end_window: datetime.datetime,
+    now: datetime.datetime,
+    daily_limits: Optional[Dict[WorkType, int]] = None,
+    budget_ms: Optional[float] = None
+) -> List[Tuple[dict, RunMetrics]]:
+    """evaluate_scenario for several variants over one busy index, so a pool job ships it once"""
+    return [
+        evaluate_scenario(busy_index, tasks, start_window, end_window, now, daily_limits, budget_ms)
+        for tasks in task_lists
+    ]
+
+
+# --- PROCESS POOL ---
+def _optimize_packed(
+    busy_index: Union[IntervalIndex, AvailabilityBitmap, FreeGapList],
+    table: TaskTable,
+    start_window: datetime.datetime,
+    end_window: datetime.datetime,
+    now: datetime.datetime,
+    daily_limits: Optional[Dict[WorkType, int]],
+    budget_ms: Optional[float],
+    seed: int
+) -> Tuple[np.ndarray, np.ndarray, ScheduleSummary, RunMetrics]:
+    """Worker side of optimize_in_pool: placements as (row, start, end, utc_offset) and score arrays"""
+    metrics = RunMetrics()
+    scheduler = HeuristicScheduler(
+        busy_index, start_window, end_window, now=now, metrics=metrics, daily_limits=daily_limits
+    )
+    schedule = scheduler.optimize_schedule(table, budget_ms=budget_ms, seed=seed)
+    minutes = np.array(
+        [(s.task.id, s.start_minute, s.end_minute, s.utc_offset) for s in schedule], dtype=np.int64
+    ).reshape(-1, 4)
+    scores = np.array([s.score for s in schedule], dtype=np.float64)
+    return minutes, scores, scheduler.summary, metrics
+
+
+def warm_up_worker() -> None:
+    """Run a tiny plan so a fresh worker process has the engine imported and its caches filled"""
+    start = datetime.datetime(2026, 1, 5, 9, 0, tzinfo=datetime.timezone.utc)
+    task = Task(id=0, title="warm-up", estimated_minutes=30, priority=1,
+                deadline=start + datetime.timedelta(days=1))
+    HeuristicScheduler([], start, start + datetime.timedelta(hours=2)).optimize_schedule([task])
@@ -10,7 +10,7 @@ Model Strategy:
 import os
 import json
 from typing import List, Optional, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from enum import Enum
 from openai import OpenAI
 
@@ -109,6 +109,13 @@ class TaskSuggestion(BaseModel):
     deadline: Optional[str] = Field(None, description="ISO datetime string")
     work_type: Optional[str] = Field(None, description="Deep Work or Shallow Work")
     reason: Optional[str] = Field(default="AI recommendation", description="Why this action is suggested")
+    depends_on: Optional[List[str]] = Field(None, description="Titles of tasks that must be finished first")
+
+    @field_validator("depends_on", mode="before")
+    @classmethod
+    def _one_title(cls, value: Any) -> Any:
+        """Models often send a single title instead of a list"""
+        return [value] if isinstance(value, str) else value
 
 
 class ScheduleInsight(BaseModel):
@@ -151,7 +158,7 @@ JSON SCHEMA:
 {
   "summary": "Brief analysis",
   "task_suggestions": [
-    {"action": "create|update|delete|reschedule|prioritize|complete", "task_id": null, "title": "...", "estimated_minutes": 60, "priority": 5, "deadline": "ISO-datetime", "work_type": "Deep Work|Shallow Work", "reason": "..."}
+    {"action": "create|update|delete|reschedule|prioritize|complete", "task_id": null, "title": "...", "estimated_minutes": 60, "priority": 5, "deadline": "ISO-datetime", "work_type": "Deep Work|Shallow Work", "depends_on": ["Title of a task that must finish first"], "reason": "..."}
   ],
   "insights": [
     {"category": "optimization|warning|wellness|efficiency", "title": "...", "description": "..."}
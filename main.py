@@ -5,16 +5,24 @@ Features:
 - Multi-Calendar Filtering
 - PostgreSQL database with SQLAlchemy
 - CRUD operations for tasks
-- Heuristic scheduling engine
+- Heuristic scheduling engine (with streaming NDJSON/SSE output)
+- Per-user calendar event cache (TTL + LRU, see calendar_client.py)
+- Async Google client for /busy and /calendars (concurrent per-calendar fetches over a shared connection pool)
 """
 import os
+import json
+import time
 import datetime
+import dataclasses
 import secrets
 import hmac
 import hashlib
-from typing import List, Optional
+import threading
+import zoneinfo
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from fastapi import FastAPI, Request, HTTPException, Depends, Query
-from fastapi.responses import RedirectResponse, HTMLResponse
+from fastapi.responses import RedirectResponse, HTMLResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from google_auth_oauthlib.flow import Flow
@@ -27,8 +35,32 @@ from enum import Enum
 
 # Local imports
 from database import get_db, create_tables, engine
-from models import Task as TaskModel, WorkType as ModelWorkType, Base
-from heuristic_engine import HeuristicScheduler, Task as EngineTask, WorkType as EngineWorkType
+from models import (
+    Task as TaskModel, RecurringTask as RecurringTaskModel, WorkType as ModelWorkType, PlannedBlock, Base
+)
+from heuristic_engine import (
+    INLINE_TASK_LIMIT,
+    METRICS as ENGINE_METRICS,
+    AvailabilityBitmap,
+    FreeGapList,
+    HeuristicScheduler,
+    IntervalIndex,
+    RecurrenceRule,
+    RecurringTask as EngineRecurringTask,
+    RunMetrics,
+    Task as EngineTask,
+    WorkType as EngineWorkType,
+    check_dependencies,
+    evaluate_scenarios,
+    expand_recurring,
+    occurrence_of,
+    warm_up_worker
+)
+
+from calendar_client import (
+    BUSY_CACHE_MAX_BYTES, BUSY_CACHE_TTL_SECONDS, CALENDAR_INCREMENTAL_SYNC, AsyncCalendarClient, BusyBlockCache,
+    CalendarSyncStore, CacheKey, cache_window, clip_events, fetch_freebusy, user_key
+)
 
 # LLM Integration (Z.ai via OpenAI-compatible SDK)
 from llm_client import get_zai_client, get_ollama_client, AIAssistantRequest, LLMScheduleResponse, TaskSuggestion, TaskAction
@@ -115,6 +147,18 @@ def debug_session(request: Request):
         "cookie_settings": "SameSite=None; Secure"
     }
 
+
+@app.get("/debug/engine-metrics")
+def engine_metrics():
+    """Aggregated scheduler phase timings and counters since process start"""
+    return ENGINE_METRICS.snapshot()
+
+
+@app.get("/debug/busy-cache")
+def busy_cache_stats():
+    """Busy-block cache size and hit/miss counters, and calendar sync totals, since process start"""
+    return {**BUSY_CACHE.stats(), "sync": CALENDAR_SYNC.stats()}
+
 # --- PYDANTIC SCHEMAS ---
 class WorkTypeEnum(str, Enum):
     DEEP_WORK = "Deep Work"
@@ -142,6 +186,7 @@ class TaskCreate(BaseModel):
     priority: int = Field(default=5, ge=1, le=10)
     deadline: datetime.datetime
     work_type: WorkTypeEnum = WorkTypeEnum.DEEP_WORK
+    depends_on: List[int] = Field(default_factory=list)  # Ids of tasks that must be finished first
 
 
 class TaskUpdate(BaseModel):
@@ -152,6 +197,18 @@ class TaskUpdate(BaseModel):
     deadline: Optional[datetime.datetime] = None
     work_type: Optional[WorkTypeEnum] = None
     is_completed: Optional[bool] = None
+    depends_on: Optional[List[int]] = None  # Replaces the task's dependencies when given
+
+
+class RecurringTaskCreate(BaseModel):
+    """Schema for creating a recurring task template"""
+    title: str = Field(..., min_length=1, max_length=255)
+    estimated_minutes: int = Field(default=30, ge=15, le=480)
+    priority: int = Field(default=5, ge=1, le=10)
+    work_type: WorkTypeEnum = WorkTypeEnum.SHALLOW_WORK
+    rrule: str = Field(..., max_length=255, description="e.g. FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR")
+    dtstart: datetime.datetime  # First occurrence; every occurrence keeps its time of day
+    due_minutes: int = Field(default=1440, ge=15, le=7 * 1440)
 
 
 class TaskResponse(BaseModel):
@@ -163,6 +220,7 @@ class TaskResponse(BaseModel):
     deadline: datetime.datetime
     work_type: str
     is_completed: bool
+    depends_on: List[int] = Field(default_factory=list)
     created_at: Optional[datetime.datetime] = None
     updated_at: Optional[datetime.datetime] = None
 
@@ -178,6 +236,22 @@ class OptimizeRequest(BaseModel):
     priority: int
     deadline: datetime.datetime
     work_type: Optional[WorkTypeEnum] = WorkTypeEnum.DEEP_WORK
+    depends_on: List[int] = Field(default_factory=list)  # Indices of tasks that must finish first
+
+
+class ScenarioVariant(BaseModel):
+    """A what-if delta against the base input of /optimize/scenarios"""
+    name: str = Field(..., min_length=1, max_length=255)
+    drop_tasks: List[int] = Field(default_factory=list)  # Indices into the base tasks
+    priorities: Dict[int, int] = Field(default_factory=dict)  # Task index -> new priority
+    exclude_calendars: List[str] = Field(default_factory=list)
+
+
+class ScenarioRequest(BaseModel):
+    """Base tasks and calendars plus the variants to compare against them"""
+    tasks: List[OptimizeRequest]
+    calendar_ids: List[str] = Field(default_factory=lambda: ['primary'])
+    scenarios: List[ScenarioVariant]
 
 
 # --- STARTUP EVENT ---
@@ -190,6 +264,20 @@ async def startup_event():
             print("✓ Database tables initialized")
     except Exception as e:
         print(f"⚠ Database initialization warning: {e}")
+    # Start the engine workers now so the first large optimize doesn't pay for it
+    get_engine_pool()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    with _engine_pool_lock:
+        if _engine_pool is not None:
+            _engine_pool.shutdown(wait=False, cancel_futures=True)
+
+
+@app.on_event("shutdown")
+async def close_calendar_client():
+    await CALENDAR_CLIENT.aclose()
 
 
 # --- HELPER FUNCTIONS ---
@@ -248,34 +336,6 @@ def get_credentials(request: Request):
     return Credentials(**creds_data)
 
 
-def merge_intervals(intervals):
-    """
-    Merge overlapping time intervals.
-    intervals: List of tuples (start_datetime, end_datetime, data_dict)
-    """
-    if not intervals:
-        return []
-
-    # Sort by start time
-    sorted_intervals = sorted(intervals, key=lambda x: x[0])
-    merged = []
-
-    current_start, current_end, current_data = sorted_intervals[0]
-
-    for next_start, next_end, next_data in sorted_intervals[1:]:
-        if next_start < current_end:
-            # Overlap exists, extend the current end if needed
-            current_end = max(current_end, next_end)
-            # We keep the title from the first event for simplicity, 
-            # or could append them. For privacy/simplicity, "Busy" or first title.
-        else:
-            merged.append((current_start, current_end, current_data))
-            current_start, current_end, current_data = next_start, next_end, next_data
-
-    merged.append((current_start, current_end, current_data))
-    return merged
-
-
 # --- ROOT & AUTH ROUTES ---
 @app.get("/")
 def home():
@@ -397,7 +457,10 @@ def callback(request: Request, code: str, state: str):
 
 @app.get("/logout")
 def logout(request: Request):
-    """Clear session"""
+    """Clear session (and the user's cached calendar events)"""
+    if request.session.get('credentials'):
+        BUSY_CACHE.invalidate(user=user_key(request.session['credentials']))
+        CALENDAR_SYNC.invalidate(user=user_key(request.session['credentials']))
     request.session.clear()
     return {"status": "logged out"}
 
@@ -405,15 +468,13 @@ def logout(request: Request):
 # --- GOOGLE CALENDAR ROUTES ---
 
 @app.get("/calendars", response_model=List[CalendarInfo])
-def list_calendars(request: Request):
+async def list_calendars(request: Request):
     """Fetch all calendars available to the user"""
     creds = get_credentials(request)
-    service = build('calendar', 'v3', credentials=creds)
 
     try:
-        calendar_list = service.calendarList().list().execute()
         calendars = []
-        for cal in calendar_list.get('items', []):
+        for cal in await CALENDAR_CLIENT.list_calendars(creds):
             calendars.append(CalendarInfo(
                 id=cal.get('id'),
                 summary=cal.get('summary', 'Unknown'),
@@ -425,105 +486,198 @@ def list_calendars(request: Request):
         raise HTTPException(status_code=500, detail=f"Google API Error: {e}")
 
 
-@app.get("/busy", response_model=List[BusyBlock])
-def get_busy_blocks(
-    request: Request, 
-    calendar_ids: List[str] = Query(default=None)
-):
-    """
-    Fetch busy info from specific calendars using Batching.
-    If no calendar_ids provided, defaults to 'primary'.
-    Merges overlapping events into single busy blocks.
-    """
-    creds = get_credentials(request)
-    service = build('calendar', 'v3', credentials=creds)
+# Fetched events per user, calendar set and window; repeated optimizes skip the Google round trip
+BUSY_CACHE = BusyBlockCache(ttl_seconds=BUSY_CACHE_TTL_SECONDS, max_bytes=BUSY_CACHE_MAX_BYTES)
+# Local per-calendar event copies, refreshed with sync tokens on cache misses
+CALENDAR_SYNC = CalendarSyncStore()
+# Async routes' Google client; its keep-alive connections are shared by all requests
+CALENDAR_CLIENT = AsyncCalendarClient()
+
 
+def calendar_window(
+    request: Request,
+    calendar_ids: Optional[List[str]],
+    start: Optional[datetime.datetime],
+    end: Optional[datetime.datetime],
+    titles: bool
+) -> Tuple[datetime.datetime, datetime.datetime, CacheKey]:
+    """The requested window (defaults: now, 7 days) and its busy-cache key"""
     # Default to primary if nothing selected
     if not calendar_ids:
         calendar_ids = ['primary']
 
-    now = datetime.datetime.utcnow()
-    end_date = now + datetime.timedelta(days=7)
-    time_min = now.isoformat() + 'Z'
-    time_max = end_date.isoformat() + 'Z'
+    now = start or datetime.datetime.now(datetime.timezone.utc)
+    end_date = end or now + datetime.timedelta(days=7)
+    window_start, window_end = cache_window(now, end_date)
+    cache_key = BUSY_CACHE.key(
+        user_key(request.session['credentials']), calendar_ids, window_start, window_end,
+        "events" if titles else "freebusy"
+    )
+    return now, end_date, cache_key
+
 
-    raw_events = []
+def fetch_calendar_events(
+    request: Request,
+    calendar_ids: Optional[List[str]] = None,
+    start: Optional[datetime.datetime] = None,
+    end: Optional[datetime.datetime] = None
+) -> Dict[str, List[tuple]]:
+    """
+    Busy intervals of specific calendars via one freebusy query for all
+    of them (the optimizer needs no event titles).
+    If no calendar_ids provided, defaults to 'primary'.
+    The window defaults to the next 7 days.
+    Returns {calendar_id: [(start_datetime, end_datetime, "Busy"), ...]}
 
-    def callback(request_id, response, exception):
-        if exception:
-            print(f"Error fetching calendar {request_id}: {exception}")
+    Results are cached per user, calendar set and window (widened to a
+    15-minute grid, so repeated calls share an entry) for
+    BUSY_CACHE_TTL_SECONDS; fetches where a calendar failed aren't cached.
+    """
+    creds = get_credentials(request)
+    now, end_date, cache_key = calendar_window(request, calendar_ids, start, end, titles=False)
+    events_by_calendar = BUSY_CACHE.get(cache_key)
+    if events_by_calendar is None:
+        service = build('calendar', 'v3', credentials=creds)
+        try:
+            events_by_calendar, failed = fetch_freebusy(service, list(cache_key[1]), cache_key[2], cache_key[3])
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"FreeBusy Query Error: {e}")
+        if not failed:
+            BUSY_CACHE.put(cache_key, events_by_calendar)
+    return clip_events(events_by_calendar, now, end_date)
+
+
+async def fetch_calendar_events_async(
+    request: Request,
+    calendar_ids: Optional[List[str]] = None,
+    start: Optional[datetime.datetime] = None,
+    end: Optional[datetime.datetime] = None
+) -> Dict[str, List[tuple]]:
+    """
+    Titled events of specific calendars for async routes, all calendars
+    fetched concurrently through CALENDAR_CLIENT without occupying a
+    threadpool worker. Defaults and caching as in fetch_calendar_events.
+    Returns {calendar_id: [(start_datetime, end_datetime, title), ...]}
+    On a miss, calendars are synced incrementally (only events changed
+    since the last sync are downloaded) unless CALENDAR_INCREMENTAL_SYNC=0.
+    """
+    creds = get_credentials(request)
+    now, end_date, cache_key = calendar_window(request, calendar_ids, start, end, titles=True)
+    window_start, window_end = cache_key[2], cache_key[3]
+    events_by_calendar = BUSY_CACHE.get(cache_key)
+    if events_by_calendar is None:
+        if CALENDAR_INCREMENTAL_SYNC:
+            synced, failed = await CALENDAR_CLIENT.sync(
+                CALENDAR_SYNC, creds, cache_key[0], cache_key[1], window_start, window_end
+            )
+            events_by_calendar = clip_events(synced, window_start, window_end)
         else:
-            items = response.get('items', [])
-            for item in items:
-                # Only care about events with definite start/end times
-                start = item.get('start', {}).get('dateTime')
-                end = item.get('end', {}).get('dateTime')
-                
-                # Skip all-day events for 'busy' logic usually, 
-                # unless we want to block the whole day. 
-                # For now, let's include them but normalize dates.
-                if not start: 
-                    # All-day event (YYYY-MM-DD string)
-                    start_date = item.get('start', {}).get('date')
-                    end_date = item.get('end', {}).get('date')
-                    if start_date and end_date:
-                        # Convert to generic datetime for sorting (naive or utc)
-                        # This simplified logic treats them as string ISOs for now
-                        start = f"{start_date}T00:00:00Z"
-                        end = f"{end_date}T23:59:59Z"
-
-                if start and end:
-                    raw_events.append({
-                        "start": start,
-                        "end": end,
-                        "title": item.get('summary', 'Busy'),
-                        "cal_id": request_id
-                    })
-
-    # Create Batch Request
-    batch = service.new_batch_http_request(callback=callback)
-
-    for cal_id in calendar_ids:
-        batch.add(service.events().list(
-            calendarId=cal_id,
-            timeMin=time_min,
-            timeMax=time_max,
-            singleEvents=True,
-            orderBy='startTime'
-        ), request_id=cal_id)
+            events_by_calendar, failed = await CALENDAR_CLIENT.fetch_events(
+                creds, list(cache_key[1]), window_start, window_end
+            )
+        if not failed:
+            BUSY_CACHE.put(cache_key, events_by_calendar)
+    return clip_events(events_by_calendar, now, end_date)
 
-    try:
-        batch.execute()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Batch Execution Error: {e}")
 
-    # Process and Merge Intervals
-    # Convert string ISOs to datetime objects for comparison
-    intervals = []
-    for ev in raw_events:
+async def fetch_busy_index(request: Request, calendar_ids: Optional[List[str]] = None) -> IntervalIndex:
+    """
+    Busy blocks for the next 7 days as an IntervalIndex
+    (merged on overlap, each block titled after its first event).
+    """
+    events_by_calendar = await fetch_calendar_events_async(request, calendar_ids)
+    events = [ev for calendar_events in events_by_calendar.values() for ev in calendar_events]
+    # Show merged blocks in the calendar's own offset
+    return IntervalIndex(events, tz=events[0][0].tzinfo if events else None)
+
+
+def fetch_availability(
+    request: Request,
+    calendar_ids: Optional[List[str]],
+    start: datetime.datetime,
+    end: datetime.datetime
+) -> AvailabilityBitmap:
+    """
+    Minute-resolution availability for the optimizer: each calendar is
+    rasterized on its own and merged with a vectorized OR. Busy time comes
+    from the freebusy fast path; the optimizer needs no event titles.
+    """
+    events_by_calendar = fetch_calendar_events(request, calendar_ids, start, end)
+    return availability_from_events(events_by_calendar, start, end, user_time_zone(request))
+
+
+def user_time_zone(request: Request) -> Optional[datetime.tzinfo]:
+    """
+    The user's calendar time zone, looked up once per session (freebusy
+    intervals come in UTC, so they can't tell the user's local hours)
+    """
+    name = request.session.get('time_zone')
+    if name is None:
+        service = build('calendar', 'v3', credentials=get_credentials(request))
         try:
-            # Handle Z or timezone offsets. Python 3.11 fromisoformat handles most.
-            # Removing Z replacement to let proper ISO parsing happen if possible,
-            # but google returns ISO with offset usually.
-            s_dt = datetime.datetime.fromisoformat(ev['start'].replace('Z', '+00:00'))
-            e_dt = datetime.datetime.fromisoformat(ev['end'].replace('Z', '+00:00'))
-            intervals.append((s_dt, e_dt, ev))
-        except ValueError:
-            continue
-    
-    merged = merge_intervals(intervals)
+            name = service.calendars().get(calendarId='primary').execute().get('timeZone')
+        except Exception as e:
+            print(f"Time zone lookup failed: {e}")
+            return None
+        request.session['time_zone'] = name
+    try:
+        return zoneinfo.ZoneInfo(name) if name else None
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def availability_from_events(
+    events_by_calendar: Dict[str, list],
+    start: datetime.datetime,
+    end: datetime.datetime,
+    tz: Optional[datetime.tzinfo] = None
+) -> AvailabilityBitmap:
+    """Bitmap for already-fetched events (see fetch_availability), shown in `tz` if given"""
+    # Google returns event times in the calendar's offset; use it so the
+    # engine's time-of-day multipliers follow the user's local hours
+    local_tz = tz or next(
+        (ev[0].tzinfo for events in events_by_calendar.values() for ev in events),
+        None
+    )
+    return AvailabilityBitmap.from_calendars(
+        events_by_calendar.values(), start, end, resolution_minutes=1, tz=local_tz
+    )
+
+
+@app.get("/busy", response_model=List[BusyBlock])
+async def get_busy_blocks(
+    request: Request, 
+    calendar_ids: List[str] = Query(default=None)
+):
+    """
+    Fetch busy info from specific calendars, all fetched concurrently.
+    If no calendar_ids provided, defaults to 'primary'.
+    Merges overlapping events into single busy blocks.
+    Uses the titled events path (the optimizer uses freebusy instead).
+    """
+    busy_index = await fetch_busy_index(request, calendar_ids)
 
     # Convert back to API response format
-    result = []
-    for start, end, data in merged:
-        result.append(BusyBlock(
+    return [
+        BusyBlock(
             start_time=start.isoformat(),
             end_time=end.isoformat(),
-            title=data['title'], # Use the title from the first event in the block
+            title=title, # Use the title from the first event in the block
             calendar_id="merged"
-        ))
+        )
+        for start, end, title in busy_index
+    ]
 
-    return result
+
+@app.delete("/busy/cache")
+def invalidate_busy_cache(request: Request, calendar_id: Optional[str] = None):
+    """
+    Forget the user's cached calendar events (only entries including
+    calendar_id, if given), e.g. after editing the calendar elsewhere
+    """
+    get_credentials(request)
+    dropped = BUSY_CACHE.invalidate(user=user_key(request.session['credentials']), calendar_id=calendar_id)
+    return {"invalidated": dropped}
 
 
 # --- TASK CRUD ROUTES ---
@@ -538,6 +692,7 @@ def create_task(task: TaskCreate, db: Session = Depends(get_db)):
         work_type=convert_work_type(task.work_type),
         is_completed=False
     )
+    set_dependencies(db, db_task, task.depends_on)
     db.add(db_task)
     db.commit()
     db.refresh(db_task)
@@ -550,6 +705,7 @@ def create_task(task: TaskCreate, db: Session = Depends(get_db)):
         deadline=db_task.deadline,
         work_type=db_task.work_type.value,
         is_completed=db_task.is_completed,
+        depends_on=[dep.id for dep in db_task.depends_on],
         created_at=db_task.created_at,
         updated_at=db_task.updated_at
     )
@@ -581,6 +737,7 @@ def get_tasks(
             deadline=t.deadline,
             work_type=t.work_type.value,
             is_completed=t.is_completed,
+            depends_on=[dep.id for dep in t.depends_on],
             created_at=t.created_at,
             updated_at=t.updated_at
         )
@@ -603,6 +760,7 @@ def get_task(task_id: int, db: Session = Depends(get_db)):
         deadline=task.deadline,
         work_type=task.work_type.value,
         is_completed=task.is_completed,
+        depends_on=[dep.id for dep in task.depends_on],
         created_at=task.created_at,
         updated_at=task.updated_at
     )
@@ -628,6 +786,8 @@ def update_task(task_id: int, task_update: TaskUpdate, db: Session = Depends(get
         task.work_type = convert_work_type(task_update.work_type)
     if task_update.is_completed is not None:
         task.is_completed = task_update.is_completed
+    if task_update.depends_on is not None:
+        set_dependencies(db, task, task_update.depends_on)
     
     db.commit()
     db.refresh(task)
@@ -640,6 +800,7 @@ def update_task(task_id: int, task_update: TaskUpdate, db: Session = Depends(get
         deadline=task.deadline,
         work_type=task.work_type.value,
         is_completed=task.is_completed,
+        depends_on=[dep.id for dep in task.depends_on],
         created_at=task.created_at,
         updated_at=task.updated_at
     )
@@ -657,36 +818,152 @@ def delete_task(task_id: int, db: Session = Depends(get_db)):
     return None
 
 
+# --- RECURRING TASK ROUTES ---
+@app.post("/recurring-tasks", status_code=201)
+def create_recurring_task(template: RecurringTaskCreate, db: Session = Depends(get_db)):
+    """Store a recurring task; the optimizer expands its occurrences within each horizon"""
+    try:
+        RecurrenceRule.parse(template.rrule)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    db_template = RecurringTaskModel(
+        title=template.title,
+        estimated_minutes=template.estimated_minutes,
+        priority=template.priority,
+        work_type=convert_work_type(template.work_type),
+        rrule=template.rrule,
+        dtstart=template.dtstart,
+        due_minutes=template.due_minutes
+    )
+    db.add(db_template)
+    db.commit()
+    db.refresh(db_template)
+    return db_template.to_dict()
+
+
+@app.get("/recurring-tasks")
+def get_recurring_tasks(db: Session = Depends(get_db)):
+    """Get all active recurring tasks"""
+    templates = db.query(RecurringTaskModel).filter(RecurringTaskModel.is_active == True).all()
+    return [t.to_dict() for t in templates]
+
+
+@app.delete("/recurring-tasks/{template_id}", status_code=204)
+def delete_recurring_task(template_id: int, db: Session = Depends(get_db)):
+    """Delete a recurring task (its future occurrences disappear with it)"""
+    template = db.query(RecurringTaskModel).filter(RecurringTaskModel.id == template_id).first()
+    if not template:
+        raise HTTPException(status_code=404, detail="Recurring task not found")
+    
+    db.delete(template)
+    db.commit()
+    return None
+
+
 # --- OPTIMIZATION ROUTES ---
-@app.post("/optimize")
-def optimize_schedule(request: Request, tasks: List[OptimizeRequest]):
+# Upper bound on the local-search budget a caller may request
+MAX_OPTIMIZE_BUDGET_MS = 10_000
+# Scheduling horizon: a week by default, up to 90 days for long project plans
+DEFAULT_HORIZON_DAYS = 7
+MAX_HORIZON_DAYS = 90
+# Variants one /optimize/scenarios call may compare
+MAX_SCENARIOS = 20
+# Engine worker processes: large runs are offloaded so they don't hold this
+# process's GIL while other requests wait (0 = always run inline)
+ENGINE_POOL_WORKERS = int(os.getenv("ENGINE_POOL_WORKERS", max(1, min(4, (os.cpu_count() or 2) - 1))))
+# Runs with fewer tasks stay inline; shipping them to a worker costs more than it saves
+ENGINE_INLINE_TASKS = int(os.getenv("ENGINE_INLINE_TASKS", INLINE_TASK_LIMIT))
+
+_engine_pool: Optional[ProcessPoolExecutor] = None
+_engine_pool_failed = False
+_engine_pool_lock = threading.Lock()
+
+
+def get_engine_pool() -> Optional[ProcessPoolExecutor]:
     """
-    Run the heuristic engine to optimize task scheduling
-    Uses Google Calendar busy blocks + submitted tasks
+    The shared, warm engine worker pool (None when disabled or unavailable).
+    A pool broken by a dead worker (e.g. OOM-killed) refuses every submit,
+    so it is dropped and a fresh one started.
     """
-    # Get busy blocks if authenticated
-    # Note: Optimize endpoint currently just uses primary calendar if we call logic here
-    # For better design, we should allow passing calendar_ids or reusing session state
-    # But heurisitic engine needs explicit busy blocks passed in.
-    
-    # Simple fix: fetch primary busy blocks inside here if not passed
-    # In a real app, you might want to reuse the same filter from GET /busy
-    
-    busy_blocks = []
+    global _engine_pool, _engine_pool_failed
+    if ENGINE_POOL_WORKERS <= 0 or _engine_pool_failed:
+        return None
+    with _engine_pool_lock:
+        if _engine_pool is not None and getattr(_engine_pool, "_broken", False):
+            print("⚠ Engine worker pool broken, restarting it")
+            _engine_pool.shutdown(wait=False, cancel_futures=True)
+            _engine_pool = None
+        if _engine_pool is None:
+            try:
+                _engine_pool = ProcessPoolExecutor(max_workers=ENGINE_POOL_WORKERS)
+                _engine_pool.submit(warm_up_worker)
+            except Exception as e:
+                # No process support (e.g. serverless sandboxes): run every optimize inline
+                print(f"⚠ Engine worker pool unavailable, running inline: {e}")
+                if _engine_pool is not None:
+                    _engine_pool.shutdown(wait=False, cancel_futures=True)
+                _engine_pool, _engine_pool_failed = None, True
+        return _engine_pool
+
+
+class StreamFormat(str, Enum):
+    NDJSON = "ndjson"
+    SSE = "sse"
+
+
+def build_scheduler(
+    request: Request,
+    calendar_ids: Optional[List[str]] = None,
+    metrics: Optional[RunMetrics] = None,
+    horizon_days: int = DEFAULT_HORIZON_DAYS,
+    max_deep_work_hours: Optional[float] = None
+) -> HeuristicScheduler:
+    """
+    Scheduler over the next `horizon_days`, with busy time from the given
+    calendars (primary by default). Optimizes with no busy blocks if the
+    calendar cannot be read (e.g. not logged in).
+    metrics: collects the calendar fetch time and the engine's phase timings
+    max_deep_work_hours: Deep Work allowed per local day (None = no cap)
+    """
+    # Setup scheduling window
+    now = datetime.datetime.now(datetime.timezone.utc)
+    end_window = now + datetime.timedelta(days=horizon_days)
+
+    busy_blocks = AvailabilityBitmap(now, end_window, resolution_minutes=1)
+    fetch_started = time.perf_counter()
     try:
-        # Default to primary for quick optimization calls
-        busy_blocks_response = get_busy_blocks(request, calendar_ids=['primary'])
-        if isinstance(busy_blocks_response, list):
-            busy_blocks = busy_blocks_response
-    except HTTPException:
-        pass  # No calendar data, optimize with empty busy blocks
-
-    # Convert to engine tasks
+        busy_blocks = fetch_availability(request, calendar_ids or ['primary'], now, end_window)
+    except HTTPException as e:
+        print(f"Calendar fetch failed: {e}")
+    if metrics is not None:
+        metrics.timing("calendar_fetch", time.perf_counter() - fetch_started)
+
+    return HeuristicScheduler(
+        busy_blocks, now, end_window, metrics=metrics, daily_limits=deep_work_limits(max_deep_work_hours)
+    )
+
+
+def deep_work_limits(max_deep_work_hours: Optional[float]) -> Optional[Dict[EngineWorkType, int]]:
+    if max_deep_work_hours is None:
+        return None
+    return {EngineWorkType.DEEP_WORK: int(max_deep_work_hours * 60)}
+
+
+def request_tasks_to_engine(tasks: List[OptimizeRequest]) -> List[EngineTask]:
+    """
+    Engine tasks for submitted tasks (ids are their positions, which is
+    what depends_on refers to). Unknown or cyclic dependencies are a 422.
+    """
     engine_tasks = []
     for i, t in enumerate(tasks):
         work_type = EngineWorkType.DEEP_WORK
         if t.work_type == WorkTypeEnum.SHALLOW_WORK:
             work_type = EngineWorkType.SHALLOW_WORK
+
+        unknown = [dep for dep in t.depends_on if not 0 <= dep < len(tasks)]
+        if unknown:
+            raise HTTPException(status_code=422, detail=f"Task {i} depends on unknown tasks {unknown}")
             
         engine_tasks.append(EngineTask(
             id=i,
@@ -694,89 +971,379 @@ def optimize_schedule(request: Request, tasks: List[OptimizeRequest]):
             estimated_minutes=t.estimated_minutes,
             priority=t.priority,
             deadline=t.deadline,
-            work_type=work_type
+            work_type=work_type,
+            depends_on=tuple(t.depends_on)
         ))
+    try:
+        check_dependencies(engine_tasks)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return engine_tasks
 
-    # Setup scheduling window
-    now = datetime.datetime.now(datetime.timezone.utc)
-    end_window = now + datetime.timedelta(days=7)
-    
-    scheduler = HeuristicScheduler(busy_blocks, now, end_window)
-    optimized_schedule = scheduler.optimize_schedule(engine_tasks)
 
+def db_tasks_to_engine(db_tasks: List[TaskModel]) -> List[EngineTask]:
+    """Engine tasks for stored tasks; predecessors outside the list (e.g. completed) count as done"""
     return [
-        {
-            "task": s.task.title,
-            "start": s.start_time.isoformat(),
-            "end": s.end_time.isoformat(),
-            "score": s.score,
-            "work_type": s.task.work_type.value
-        }
-        for s in optimized_schedule
+        EngineTask(
+            id=t.id,
+            title=t.title,
+            estimated_minutes=t.estimated_minutes,
+            priority=t.priority,
+            deadline=t.deadline,
+            work_type=convert_to_engine_work_type(t.work_type),
+            depends_on=tuple(dep.id for dep in t.depends_on)
+        )
+        for t in db_tasks
     ]
 
 
+def set_dependencies(db: Session, task: TaskModel, depends_on: List[int]) -> None:
+    """Point task.depends_on at the stored tasks with these ids; unknown ids or a cycle are a 422"""
+    deps = db.query(TaskModel).filter(TaskModel.id.in_(depends_on)).all() if depends_on else []
+    unknown = sorted(set(depends_on) - {dep.id for dep in deps})
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"depends_on refers to unknown tasks {unknown}")
+    task.depends_on = deps
+    if task.id is not None:  # A new task has no dependents, so it cannot close a cycle
+        try:
+            check_dependencies(db_tasks_to_engine(db.query(TaskModel).all()))
+        except ValueError as e:
+            db.rollback()
+            raise HTTPException(status_code=422, detail=str(e))
+
+
+def db_recurring_to_engine(templates: List[RecurringTaskModel]) -> List[EngineRecurringTask]:
+    return [
+        EngineRecurringTask(
+            id=t.id,
+            title=t.title,
+            estimated_minutes=t.estimated_minutes,
+            priority=t.priority,
+            rule=RecurrenceRule.parse(t.rrule),
+            dtstart=t.dtstart,
+            due_minutes=t.due_minutes,
+            work_type=convert_to_engine_work_type(t.work_type)
+        )
+        for t in templates
+    ]
+
+
+def pending_engine_tasks(db: Session, scheduler: HeuristicScheduler) -> List[EngineTask]:
+    """Incomplete tasks plus the occurrences of active recurring tasks within the scheduler's window"""
+    db_tasks = db.query(TaskModel).filter(TaskModel.is_completed == False).all()
+    templates = db.query(RecurringTaskModel).filter(RecurringTaskModel.is_active == True).all()
+    occurrences = expand_recurring(db_recurring_to_engine(templates), scheduler.start_window, scheduler.end_window)
+    engine_tasks = db_tasks_to_engine(db_tasks)
+    try:
+        check_dependencies(engine_tasks)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return engine_tasks + list(occurrences)
+
+
+def task_reference(task: EngineTask) -> dict:
+    """task_id of a stored task, or recurring_task_id and date of an occurrence"""
+    occurrence = occurrence_of(task.id)
+    if occurrence is None:
+        return {"task_id": task.id}
+    return {"task_id": None, "recurring_task_id": occurrence[0], "occurrence_date": occurrence[1].isoformat()}
+
+
+def placement_to_dict(s, include_task_id: bool = False) -> dict:
+    placement = {
+        "task": s.task.title,
+        "start": s.start_time.isoformat(),
+        "end": s.end_time.isoformat(),
+        "score": s.score,
+        "work_type": s.task.work_type.value
+    }
+    if include_task_id:
+        placement = {**task_reference(s.task), **placement}
+    return placement
+
+
+def feasibility_to_dict(report, include_task_id: bool = False) -> dict:
+    def describe(t):
+        return {
+            **(task_reference(t) if include_task_id else {"index": t.id}),
+            "task": t.title,
+            "estimated_minutes": t.estimated_minutes,
+            "deadline": t.deadline.isoformat()
+        }
+
+    return {
+        "feasible": report.feasible,
+        "infeasible_tasks": [describe(t) for t in report.infeasible_tasks],
+        # Due after the scheduling horizon, so not checked
+        "beyond_horizon_tasks": [describe(t) for t in report.beyond_horizon],
+        "demand_minutes": report.demand_minutes,
+        "capacity_minutes": report.capacity_minutes
+    }
+
+
+def stream_events(events, fmt: StreamFormat) -> StreamingResponse:
+    """
+    Stream (event, payload) pairs as NDJSON lines or Server-Sent Events.
+    NDJSON lines are the bare payloads; SSE uses the event name.
+    """
+    def encode():
+        for event, payload in events:
+            if fmt == StreamFormat.SSE:
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+            else:
+                yield json.dumps(payload) + "\n"
+
+    media_type = "text/event-stream" if fmt == StreamFormat.SSE else "application/x-ndjson"
+    return StreamingResponse(encode(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+
+@app.post("/optimize")
+def optimize_schedule(
+    request: Request,
+    tasks: List[OptimizeRequest],
+    budget_ms: Optional[int] = Query(None, ge=0, le=MAX_OPTIMIZE_BUDGET_MS),
+    horizon_days: int = Query(DEFAULT_HORIZON_DAYS, ge=1, le=MAX_HORIZON_DAYS),
+    max_deep_work_hours: Optional[float] = Query(None, ge=0, le=24),
+    check_only: bool = Query(False),
+):
+    """
+    Run the heuristic engine to optimize task scheduling
+    Uses Google Calendar busy blocks + submitted tasks
+    budget_ms: optional time budget for improving the greedy plan
+    horizon_days: how far ahead to schedule (free gaps are only produced
+    until every task is placed, so long horizons cost what they use)
+    max_deep_work_hours: Deep Work allowed per day (tasks never span
+    midnight); no cap unless given, e.g. 4 for the architect's rule
+    check_only: skip optimizing; return the deadline feasibility report
+    (which tasks cannot all meet their deadlines) instead
+    """
+    # Busy blocks come from the primary calendar for quick optimization calls
+    metrics = RunMetrics()
+    scheduler = build_scheduler(
+        request, metrics=metrics, horizon_days=horizon_days, max_deep_work_hours=max_deep_work_hours
+    )
+    engine_tasks = request_tasks_to_engine(tasks)
+    if check_only:
+        return feasibility_to_dict(scheduler.check_deadlines(engine_tasks))
+    optimized_schedule = scheduler.optimize_in_pool(
+        get_engine_pool(), engine_tasks, budget_ms=budget_ms, inline_below=ENGINE_INLINE_TASKS
+    )
+    ENGINE_METRICS.record(metrics)
+    return [placement_to_dict(s) for s in optimized_schedule]
+
+
+@app.post("/optimize/stream")
+def optimize_schedule_stream(
+    request: Request,
+    tasks: List[OptimizeRequest],
+    fmt: StreamFormat = Query(StreamFormat.NDJSON, alias="format"),
+    horizon_days: int = Query(DEFAULT_HORIZON_DAYS, ge=1, le=MAX_HORIZON_DAYS),
+    max_deep_work_hours: Optional[float] = Query(None, ge=0, le=24),
+    check_only: bool = Query(False),
+):
+    """
+    Same as /optimize (greedy plan), streamed in chronological order
+    as each placement is made: NDJSON lines or SSE "placement" events.
+    check_only returns the feasibility report as plain JSON (see /optimize).
+    """
+    metrics = RunMetrics()
+    scheduler = build_scheduler(
+        request, metrics=metrics, horizon_days=horizon_days, max_deep_work_hours=max_deep_work_hours
+    )
+    engine_tasks = request_tasks_to_engine(tasks)
+    if check_only:
+        return feasibility_to_dict(scheduler.check_deadlines(engine_tasks))
+
+    def events():
+        for s in scheduler.iter_schedule(engine_tasks):
+            yield "placement", placement_to_dict(s)
+        ENGINE_METRICS.record(metrics)
+
+    return stream_events(events(), fmt)
+
+
 @app.post("/optimize/from-db")
 def optimize_from_database(
     request: Request, 
     calendar_ids: List[str] = Query(None), # Allow filtering calendars during optimize
+    budget_ms: Optional[int] = Query(None, ge=0, le=MAX_OPTIMIZE_BUDGET_MS),
+    debug: bool = Query(False),
+    horizon_days: int = Query(DEFAULT_HORIZON_DAYS, ge=1, le=MAX_HORIZON_DAYS),
+    max_deep_work_hours: Optional[float] = Query(None, ge=0, le=24),
+    check_only: bool = Query(False),
     db: Session = Depends(get_db)
 ):
     """
     Optimize schedule using tasks from the database
+    budget_ms: optional time budget for improving the greedy plan
+    debug: include per-phase timings and counters in the response
+    horizon_days, max_deep_work_hours, check_only: see /optimize
+    The response's "feasibility" lists tasks that cannot all meet their
+    deadlines, whatever the plan does. Occurrences of recurring tasks in
+    the horizon are planned too (task_id null, recurring_task_id and
+    occurrence_date set), never before their occurrence time.
     """
-    # Get incomplete tasks from database
-    db_tasks = db.query(TaskModel).filter(TaskModel.is_completed == False).all()
-    
-    if not db_tasks:
-        return {"message": "No pending tasks to optimize", "schedule": []}
-    
     # Get busy blocks - pass the calendar_ids filter!
-    busy_blocks = []
+    metrics = RunMetrics()
+    scheduler = build_scheduler(request, calendar_ids, metrics, horizon_days, max_deep_work_hours)
+
+    # Incomplete tasks, plus recurring tasks expanded within the horizon only
+    engine_tasks = pending_engine_tasks(db, scheduler)
+    if not engine_tasks:
+        return {"message": "No pending tasks to optimize", "schedule": []}
+
+    # Cheap deadline admission check first, then the optimization
+    feasibility = feasibility_to_dict(scheduler.check_deadlines(engine_tasks), include_task_id=True)
+    if check_only:
+        return feasibility
+    optimized_schedule = scheduler.optimize_in_pool(
+        get_engine_pool(), engine_tasks, budget_ms=budget_ms, inline_below=ENGINE_INLINE_TASKS
+    )
+    summary = scheduler.get_schedule_summary()
+    ENGINE_METRICS.record(metrics)
+
+    response = {
+        "summary": summary,
+        "feasibility": feasibility,
+        "schedule": [placement_to_dict(s, include_task_id=True) for s in optimized_schedule]
+    }
+    if debug:
+        response["debug"] = metrics.as_dict()
+    return response
+
+
+@app.post("/optimize/from-db/stream")
+def optimize_from_database_stream(
+    request: Request,
+    calendar_ids: List[str] = Query(None),
+    fmt: StreamFormat = Query(StreamFormat.NDJSON, alias="format"),
+    horizon_days: int = Query(DEFAULT_HORIZON_DAYS, ge=1, le=MAX_HORIZON_DAYS),
+    max_deep_work_hours: Optional[float] = Query(None, ge=0, le=24),
+    check_only: bool = Query(False),
+    db: Session = Depends(get_db)
+):
+    """
+    Same as /optimize/from-db (greedy plan), streamed in chronological order.
+    Each placement is one NDJSON line / SSE "placement" event; the schedule
+    summary comes last ({"summary": ...} / a "summary" event).
+    check_only returns the feasibility report as plain JSON (see /optimize).
+    """
+    metrics = RunMetrics()
+    scheduler = build_scheduler(request, calendar_ids, metrics, horizon_days, max_deep_work_hours)
+    # Convert now: the session may be closed while the response streams
+    engine_tasks = pending_engine_tasks(db, scheduler)
+    if check_only:
+        return feasibility_to_dict(scheduler.check_deadlines(engine_tasks), include_task_id=True)
+
+    def events():
+        for s in scheduler.iter_schedule(engine_tasks):
+            yield "placement", placement_to_dict(s, include_task_id=True)
+        ENGINE_METRICS.record(metrics)
+        yield "summary", {"summary": scheduler.get_schedule_summary()}
+
+    return stream_events(events(), fmt)
+
+
+@app.get("/schedule/planned")
+def get_planned_schedule(db: Session = Depends(get_db)):
+    """
+    The plan stored by the nightly batch (python batch_planner.py),
+    in chronological order, so the Dashboard can show it without optimizing.
+    The batch cannot read the user's calendar, so blocks may overlap
+    meetings ("calendar_aware": false); /optimize/from-db plans around them.
+    """
+    blocks = db.query(PlannedBlock).order_by(PlannedBlock.start_time.asc()).all()
+    return {
+        "planned_at": blocks[0].planned_at.isoformat() if blocks else None,
+        "calendar_aware": False,
+        "schedule": [b.to_dict() for b in blocks],
+    }
+
+
+def apply_variant(tasks: List[EngineTask], variant: ScenarioVariant) -> List[EngineTask]:
+    """The base tasks with the variant's drops and priority changes applied"""
+    unknown = sorted({i for i in [*variant.drop_tasks, *variant.priorities] if not 0 <= i < len(tasks)})
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Scenario '{variant.name}' refers to unknown tasks {unknown}")
+    dropped = set(variant.drop_tasks)
+    return [
+        dataclasses.replace(t, priority=variant.priorities.get(i, t.priority))
+        for i, t in enumerate(tasks) if i not in dropped
+    ]
+
+
+@app.post("/optimize/scenarios")
+def optimize_scenarios(
+    request: Request,
+    body: ScenarioRequest,
+    budget_ms: Optional[int] = Query(None, ge=0, le=MAX_OPTIMIZE_BUDGET_MS),
+    horizon_days: int = Query(DEFAULT_HORIZON_DAYS, ge=1, le=MAX_HORIZON_DAYS),
+    max_deep_work_hours: Optional[float] = Query(None, ge=0, le=24),
+):
+    """
+    Compare what-if variants of one plan (drop tasks, change priorities,
+    exclude calendars). Calendars are fetched once and free gaps computed
+    once per distinct calendar set. The base plan and the variants are then
+    optimized on the engine worker pool, at most one job per worker and
+    calendar set, so each job ships its gaps once; small task sets (under
+    ENGINE_INLINE_TASKS) stay inline, where shipping costs more than it saves.
+    Returns the base summary and one summary per variant.
+    """
+    if len(body.scenarios) > MAX_SCENARIOS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_SCENARIOS} scenarios per request")
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    end_window = now + datetime.timedelta(days=horizon_days)
+    local_tz = None
     try:
-        if not calendar_ids:
-            calendar_ids = ['primary']
-            
-        busy_blocks_response = get_busy_blocks(request, calendar_ids=calendar_ids)
-        if isinstance(busy_blocks_response, list):
-            busy_blocks = busy_blocks_response
+        events_by_calendar = fetch_calendar_events(request, body.calendar_ids, now, end_window)
+        local_tz = user_time_zone(request)
     except HTTPException as e:
         print(f"Calendar fetch failed: {e}")
-        pass
-
-    # Convert to engine tasks
-    engine_tasks = [
-        EngineTask(
-            id=t.id,
-            title=t.title,
-            estimated_minutes=t.estimated_minutes,
-            priority=t.priority,
-            deadline=t.deadline,
-            work_type=convert_to_engine_work_type(t.work_type)
+        events_by_calendar = {}
+
+    base_tasks = request_tasks_to_engine(body.tasks)
+    task_lists = [base_tasks] + [apply_variant(base_tasks, v) for v in body.scenarios]
+    # Variant positions (0 = base) per distinct calendar set
+    by_calendars: Dict[frozenset, List[int]] = {}
+    for i, excluded in enumerate([[]] + [v.exclude_calendars for v in body.scenarios]):
+        by_calendars.setdefault(frozenset(events_by_calendar) - set(excluded), []).append(i)
+
+    pool = get_engine_pool() if len(base_tasks) >= ENGINE_INLINE_TASKS else None
+    workers = max(1, ENGINE_POOL_WORKERS) if pool is not None else 1
+    jobs = []  # (free gaps, variant positions)
+    for included, positions in by_calendars.items():
+        bitmap = availability_from_events(
+            {cal_id: events_by_calendar[cal_id] for cal_id in included}, now, end_window, local_tz
         )
-        for t in db_tasks
-    ]
+        gaps = FreeGapList(bitmap.iter_free_gaps(now, end_window))
+        jobs.extend((gaps, positions[k::workers]) for k in range(min(workers, len(positions))))
 
-    # Run optimization
-    now = datetime.datetime.now(datetime.timezone.utc)
-    end_window = now + datetime.timedelta(days=7)
-    
-    scheduler = HeuristicScheduler(busy_blocks, now, end_window)
-    optimized_schedule = scheduler.optimize_schedule(engine_tasks)
-    summary = scheduler.get_schedule_summary(optimized_schedule)
+    limits = deep_work_limits(max_deep_work_hours)
+
+    def job_args(gaps: FreeGapList, positions: List[int]) -> tuple:
+        return gaps, [task_lists[i] for i in positions], now, end_window, now, limits, budget_ms
+
+    try:
+        if pool is not None:
+            futures = [pool.submit(evaluate_scenarios, *job_args(*job)) for job in jobs]
+            results = [future.result() for future in futures]
+        else:
+            results = [evaluate_scenarios(*job_args(*job)) for job in jobs]
+    except BrokenExecutor:
+        # A worker died; evaluate here rather than fail (the next call gets a fresh pool)
+        results = [evaluate_scenarios(*job_args(*job)) for job in jobs]
+    summaries: List[Optional[dict]] = [None] * len(task_lists)
+    for (_, positions), job_results in zip(jobs, results):
+        for i, (summary, metrics) in zip(positions, job_results):
+            ENGINE_METRICS.record(metrics)
+            summaries[i] = summary
 
     return {
-        "summary": summary,
-        "schedule": [
-            {
-                "task_id": s.task.id,
-                "task": s.task.title,
-                "start": s.start_time.isoformat(),
-                "end": s.end_time.isoformat(),
-                "score": s.score,
-                "work_type": s.task.work_type.value
-            }
-            for s in optimized_schedule
+        "base": summaries[0],
+        "scenarios": [
+            {"name": variant.name, "summary": summary}
+            for variant, summary in zip(body.scenarios, summaries[1:])
         ]
     }
 
@@ -849,6 +1416,30 @@ async def ai_assist(
     return response
 
 
+def link_suggested_dependencies(db: Session, links: List[tuple]) -> None:
+    """
+    Resolve depends_on titles to pending tasks (the newest task wins a
+    shared title) and link them. Unknown titles are reported on the
+    suggestion's result; links that would form a cycle are all dropped.
+    """
+    pending = db.query(TaskModel).filter(TaskModel.is_completed == False).order_by(TaskModel.id.asc()).all()
+    by_title = {t.title.strip().casefold(): t for t in pending}
+    for task, titles, result in links:
+        deps = [by_title.get(title.strip().casefold()) for title in titles]
+        task.depends_on = [dep for dep in deps if dep is not None and dep.id != task.id]
+        unresolved = [title for title, dep in zip(titles, deps) if dep is None]
+        if unresolved:
+            result["unresolved_depends_on"] = unresolved
+    try:
+        check_dependencies(db_tasks_to_engine(db.query(TaskModel).all()))
+    except ValueError as e:
+        db.rollback()
+        for _, _, result in links:
+            result["depends_on_error"] = str(e)
+        return
+    db.commit()
+
+
 @app.post("/ai/apply-suggestions")
 async def apply_ai_suggestions(
     suggestions: List[TaskSuggestion],
@@ -859,8 +1450,12 @@ async def apply_ai_suggestions(
     
     This endpoint allows the user to "accept" AI suggestions,
     which are then executed against the real database.
+    Dependencies name tasks by title; they are linked once every
+    suggestion is applied, so a task may depend on one created later in
+    the same batch.
     """
     results = []
+    links = []  # (task, depends_on titles, result) to resolve after the batch
     
     for suggestion in suggestions:
         try:
@@ -878,6 +1473,8 @@ async def apply_ai_suggestions(
                 db.commit()
                 db.refresh(new_task)
                 results.append({"action": "create", "task_id": new_task.id, "status": "success"})
+                if suggestion.depends_on:
+                    links.append((new_task, suggestion.depends_on, results[-1]))
                 
             elif suggestion.action == TaskAction.UPDATE and suggestion.task_id:
                 task = db.query(TaskModel).filter(TaskModel.id == suggestion.task_id).first()
@@ -894,6 +1491,8 @@ async def apply_ai_suggestions(
                         task.work_type = ModelWorkType.DEEP_WORK if suggestion.work_type == "Deep Work" else ModelWorkType.SHALLOW_WORK
                     db.commit()
                     results.append({"action": "update", "task_id": suggestion.task_id, "status": "success"})
+                    if suggestion.depends_on is not None:
+                        links.append((task, suggestion.depends_on, results[-1]))
                 else:
                     results.append({"action": "update", "task_id": suggestion.task_id, "status": "not_found"})
                     
@@ -936,6 +1535,9 @@ async def apply_ai_suggestions(
                 "message": str(e)
             })
     
+    if links:
+        link_suggested_dependencies(db, links)
+    
     return {
         "applied": len([r for r in results if r.get("status") == "success"]),
         "failed": len([r for r in results if r.get("status") != "success"]),
@@ -961,6 +1563,7 @@ ARCHITECT_SYSTEM_PROMPT = """You are the "Aevum Project Architect." Your goal is
 - **Academic Priority**: Never suggest work during the user's Penn State class schedule or university commitments.
 - **Cognitive Load**: Identify tasks as "Deep Work" or "Shallow Work." Do not schedule more than 4 hours of Deep Work in a single day.
 - **Clarity**: If a goal is too vague, ask a specific follow-up question instead of making assumptions.
+- **Ordering**: Set "depends_on" to the titles of the tasks that must be finished first, or null if none.
 
 ## Response Format:
 When decomposing tasks, respond with a structured JSON format:
@@ -971,7 +1574,7 @@ When decomposing tasks, respond with a structured JSON format:
     {
       "phase": "I. Planning",
       "tasks": [
-        {"title": "Task Name", "duration_minutes": 120, "work_type": "Deep Work", "depends_on": null}
+        {"title": "Task Name", "duration_minutes": 120, "work_type": "Deep Work", "depends_on": ["Earlier Task Name"]}
       ]
     }
   ],
@@ -3,10 +3,12 @@ Database Models for Aevum Scheduler
 Using SQLAlchemy 2.0 style with async support
 """
 import enum
-from datetime import datetime
-from sqlalchemy import String, Integer, Boolean, DateTime, Enum, create_engine
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, sessionmaker
-from typing import Optional
+from datetime import date, datetime
+from sqlalchemy import (
+    String, Integer, Boolean, Date, DateTime, Enum, Float, ForeignKey, Column, Table, create_engine
+)
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, sessionmaker
+from typing import List, Optional
 
 
 # --- ENUMS ---
@@ -20,6 +22,16 @@ class Base(DeclarativeBase):
     pass
 
 
+# --- TASK DEPENDENCIES ---
+# task_id cannot start before depends_on_id is done (the engine's Task.depends_on)
+task_dependencies = Table(
+    "task_dependencies",
+    Base.metadata,
+    Column("task_id", Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True),
+    Column("depends_on_id", Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True, index=True),
+)
+
+
 # --- TASK MODEL ---
 class Task(Base):
     __tablename__ = "tasks"
@@ -45,6 +57,13 @@ class Task(Base):
         onupdate=datetime.utcnow, 
         nullable=True
     )
+    # Tasks that must be finished before this one starts
+    depends_on: Mapped[List["Task"]] = relationship(
+        secondary=task_dependencies,
+        primaryjoin=lambda: Task.id == task_dependencies.c.task_id,
+        secondaryjoin=lambda: Task.id == task_dependencies.c.depends_on_id,
+        lazy="selectin"
+    )
     
     def __repr__(self) -> str:
         return f"<Task(id={self.id}, title='{self.title}', priority={self.priority}, work_type={self.work_type.value})>"
@@ -59,11 +78,86 @@ class Task(Base):
             "deadline": self.deadline.isoformat() if self.deadline else None,
             "work_type": self.work_type.value,
             "is_completed": self.is_completed,
+            "depends_on": [t.id for t in self.depends_on],
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
         }
 
 
+# --- RECURRING TASK MODEL ---
+class RecurringTask(Base):
+    """A task template that repeats by an RRULE; occurrences are expanded by the engine"""
+    __tablename__ = "recurring_tasks"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    title: Mapped[str] = mapped_column(String(255), nullable=False)
+    estimated_minutes: Mapped[int] = mapped_column(Integer, nullable=False, default=30)
+    priority: Mapped[int] = mapped_column(Integer, nullable=False, default=5)  # 1-10
+    work_type: Mapped[WorkType] = mapped_column(
+        Enum(WorkType), 
+        nullable=False, 
+        default=WorkType.SHALLOW_WORK
+    )
+    rrule: Mapped[str] = mapped_column(String(255), nullable=False)  # e.g. FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR
+    dtstart: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    due_minutes: Mapped[int] = mapped_column(Integer, nullable=False, default=1440)  # Due this long after each occurrence
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), 
+        default=datetime.utcnow, 
+        nullable=False
+    )
+    
+    def __repr__(self) -> str:
+        return f"<RecurringTask(id={self.id}, title='{self.title}', rrule='{self.rrule}')>"
+    
+    def to_dict(self) -> dict:
+        """Convert model to dictionary for API responses"""
+        return {
+            "id": self.id,
+            "title": self.title,
+            "estimated_minutes": self.estimated_minutes,
+            "priority": self.priority,
+            "work_type": self.work_type.value,
+            "rrule": self.rrule,
+            "dtstart": self.dtstart.isoformat(),
+            "due_minutes": self.due_minutes,
+            "is_active": self.is_active,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+# --- PLANNED BLOCK MODEL ---
+class PlannedBlock(Base):
+    """A placement from the nightly batch plan (python batch_planner.py)"""
+    __tablename__ = "planned_blocks"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    # Exactly one of task_id / recurring_task_id is set; an occurrence also records its date
+    task_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=True, index=True
+    )
+    recurring_task_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey("recurring_tasks.id", ondelete="CASCADE"), nullable=True, index=True
+    )
+    occurrence_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    start_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    end_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    score: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    planned_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    
+    def to_dict(self) -> dict:
+        return {
+            "task_id": self.task_id,
+            "recurring_task_id": self.recurring_task_id,
+            "occurrence_date": self.occurrence_date.isoformat() if self.occurrence_date else None,
+            "start": self.start_time.isoformat(),
+            "end": self.end_time.isoformat(),
+            "score": self.score,
+            "planned_at": self.planned_at.isoformat(),
+        }
+
+
 # --- DATABASE ENGINE & SESSION ---
 def get_engine(database_url: str):
     """Create SQLAlchemy engine with connection pooling"""
@@ -0,0 +1,428 @@
+"""
+Test script for the Google Calendar client helpers
+"""
+import asyncio
+import datetime
+from urllib.parse import unquote
+
+from calendar_client import (
+    BATCH_MAX_REQUESTS, FREEBUSY_MAX_CALENDARS, AsyncCalendarClient, BusyBlockCache, CalendarSyncStore, cache_window, clip_events,
+    fetch_events, fetch_freebusy, user_key
+)
+
+NOW = datetime.datetime(2026, 3, 2, 7, 3, 20, tzinfo=datetime.timezone.utc)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_events(calendar_ids, n, title="Meeting"):
+    return {
+        cal_id: [
+            (NOW + datetime.timedelta(hours=i), NOW + datetime.timedelta(hours=i, minutes=30), f"{title} {i}")
+            for i in range(n)
+        ]
+        for cal_id in calendar_ids
+    }
+
+
+def test_busy_cache_ttl_and_counters():
+    print("\n--- Testing Busy-Block Cache TTL ---")
+    clock = FakeClock()
+    cache = BusyBlockCache(ttl_seconds=60, clock=clock)
+    start, end = cache_window(NOW, NOW + datetime.timedelta(days=7))
+    assert start == NOW.replace(minute=0, second=0) and end == start + datetime.timedelta(days=7, minutes=15)
+    # Calls seconds apart land on the same window
+    later = NOW + datetime.timedelta(seconds=40)
+    assert cache_window(later, later + datetime.timedelta(days=7)) == (start, end)
+
+    key = cache.key(user_key({"refresh_token": "abc"}), ["work", "primary", "work"], start, end)
+    assert key == cache.key(user_key({"refresh_token": "abc", "token": "new"}), ["primary", "work"], start, end)
+    assert cache.get(key) is None
+    events = make_events(key[1], 3)
+    cache.put(key, events)
+    assert cache.get(key) is events
+    clock.now = 59
+    assert cache.get(key) is events
+    clock.now = 60
+    assert cache.get(key) is None and len(cache) == 0
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"], stats["bytes"]) == (2, 2, 1, 0)
+    print(f"✅ Entries expire after the TTL; hit rate {stats['hit_rate']:.0%}")
+
+
+def test_busy_cache_lru_eviction_and_invalidation():
+    print("\n--- Testing Busy-Block Cache Eviction ---")
+    start, end = cache_window(NOW, NOW + datetime.timedelta(days=7))
+    probe = BusyBlockCache()
+    probe.put(probe.key("u", ["primary"], start, end), make_events(["primary"], 20))
+    entry_bytes = probe.bytes
+
+    cache = BusyBlockCache(max_bytes=3 * entry_bytes)
+    keys = [cache.key(f"user{i}", ["primary"], start, end) for i in range(4)]
+    for key in keys[:3]:
+        cache.put(key, make_events(["primary"], 20))
+    cache.get(keys[0])  # user0 is now the most recently used
+    cache.put(keys[3], make_events(["primary"], 20))
+    assert cache.get(keys[1]) is None, "least recently used entry should be evicted"
+    assert all(cache.get(key) is not None for key in (keys[0], keys[2], keys[3]))
+    assert cache.evictions == 1 and cache.bytes <= cache.max_bytes
+
+    # An entry larger than the whole budget is not stored
+    cache.put(cache.key("big", ["primary"], start, end), make_events(["primary"], 200))
+    assert len(cache) == 3
+
+    cache.max_bytes = 10 * entry_bytes
+    cache.put(cache.key("user0", ["primary", "team"], start, end), make_events(["primary", "team"], 1))
+    assert cache.invalidate(calendar_id="team") == 1
+    assert cache.invalidate(user="user0") == 1
+    assert cache.invalidate() == 2 and cache.bytes == 0
+    print(f"✅ LRU eviction keeps {cache.max_bytes} bytes; invalidation by user and calendar")
+
+
+def test_clip_events_to_request_window():
+    print("\n--- Testing Event Clipping ---")
+    events = make_events(["primary"], 5)
+    clipped = clip_events(events, NOW + datetime.timedelta(minutes=45), NOW + datetime.timedelta(hours=3))
+    assert [title for _, _, title in clipped["primary"]] == ["Meeting 1", "Meeting 2"]
+    print("✅ Cached events are clipped to the requested window")
+
+
+class FakeRequest:
+    def __init__(self, run):
+        self.execute = run
+
+
+class FakeGoogleCalendar:
+    """events().list, freebusy().query and batch requests over an in-memory, versioned event store"""
+    PAGE_SIZE = 2
+
+    class Gone(Exception):
+        class resp:
+            status = 410
+
+    def __init__(self):
+        self.store = {}  # (calendar, event id) -> (version, item)
+        self.version = 0
+        self.expired = set()
+        self.items_sent = 0
+        self.round_trips = 0
+
+    def upsert(self, cal_id, event_id, hour, title, status="confirmed"):
+        self.version += 1
+        start = NOW + datetime.timedelta(hours=hour)
+        self.store[cal_id, event_id] = (self.version, {
+            "id": event_id, "status": status, "summary": title,
+            "start": {"dateTime": start.isoformat()},
+            "end": {"dateTime": (start + datetime.timedelta(minutes=30)).isoformat()},
+        })
+
+    def list_page(self, params):
+        assert params["fields"].startswith("items(id,status,summary,"), "only needed fields are requested"
+        if "syncToken" in params:
+            since = int(params["syncToken"])
+            if since in self.expired:
+                raise self.Gone()
+            items = [item for (cal, _), (version, item) in sorted(self.store.items())
+                     if cal == params["calendarId"] and version > since]
+        elif "timeMax" in params:
+            parse = datetime.datetime.fromisoformat
+            items = sorted(
+                (item for (cal, _), (_, item) in self.store.items()
+                 if cal == params["calendarId"] and item["status"] != "cancelled"
+                 and parse(params["timeMin"]) <= parse(item["start"]["dateTime"]) < parse(params["timeMax"])),
+                key=lambda item: item["start"]["dateTime"]
+            )
+        else:
+            assert "timeMin" in params and "orderBy" not in params
+            items = [item for (cal, _), (_, item) in sorted(self.store.items())
+                     if cal == params["calendarId"] and item["status"] != "cancelled"]
+        offset = int(params.get("pageToken", 0))
+        page = items[offset:offset + self.PAGE_SIZE]
+        self.items_sent += len(page)
+        if offset + self.PAGE_SIZE < len(items):
+            return {"items": page, "nextPageToken": str(offset + self.PAGE_SIZE)}
+        return {"items": page, "nextSyncToken": str(self.version)}
+
+    def busy_intervals(self, body):
+        calendars = {}
+        for item in body["items"]:
+            if item["id"].startswith("missing"):
+                calendars[item["id"]] = {"errors": [{"domain": "global", "reason": "notFound"}], "busy": []}
+                continue
+            events = sorted(
+                (ev["start"]["dateTime"], ev["end"]["dateTime"]) for (cal, _), (_, ev) in self.store.items()
+                if cal == item["id"] and ev["status"] != "cancelled"
+            )
+            calendars[item["id"]] = {"busy": [{"start": start, "end": end} for start, end in events]}
+        return {"calendars": calendars}
+
+    # The googleapiclient surface calendar_client uses
+    def events(self):
+        return self
+
+    def freebusy(self):
+        return self
+
+    def list(self, **params):
+        return FakeRequest(lambda: self._round_trip(self.list_page, params))
+
+    def query(self, body):
+        assert len(body["items"]) <= FREEBUSY_MAX_CALENDARS
+        return FakeRequest(lambda: self._round_trip(self.busy_intervals, body))
+
+    def _round_trip(self, handler, arg):
+        self.round_trips += 1
+        return handler(arg)
+
+    def new_batch_http_request(self, callback):
+        requests = []
+        google = self
+
+        class Batch:
+            def add(self, request, request_id=None):
+                requests.append((request_id or str(len(requests)), request))
+
+            def execute(self):
+                assert len(requests) <= BATCH_MAX_REQUESTS, "Google rejects larger batches"
+                google.round_trips += 1 - len(requests)  # One HTTP call for the whole batch
+                for request_id, request in requests:
+                    try:
+                        callback(request_id, request.execute(), None)
+                    except FakeGoogleCalendar.Gone as e:
+                        callback(request_id, None, e)
+        return Batch()
+
+
+def test_incremental_sync_downloads_only_changes():
+    print("\n--- Testing Incremental Calendar Sync ---")
+    google = FakeGoogleCalendar()
+    for i in range(7):
+        google.upsert("primary", f"p{i}", i, f"Meeting {i}")
+    google.upsert("team", "t0", 3, "Team sync")
+    store = CalendarSyncStore()
+
+    events, failed = store.sync(google, "user", ["primary", "team"], NOW)
+    assert not failed and len(events["primary"]) == 7 and len(events["team"]) == 1
+    full_payload = google.items_sent
+
+    google.items_sent = 0
+    google.upsert("primary", "p2", 10, "Moved meeting")
+    google.upsert("primary", "p5", 5, "Meeting 5", status="cancelled")
+    events, _ = store.sync(google, "user", ["primary", "team"], NOW)
+    titles = [title for _, _, title in events["primary"]]
+    assert "Meeting 5" not in titles and titles[-1] == "Moved meeting" and len(titles) == 6
+    assert google.items_sent == 2, "only the changed and deleted events are downloaded"
+
+    # An expired token falls back to a full resync
+    google.expired.add(google.version)
+    google.items_sent = 0
+    events, _ = store.sync(google, "user", ["primary"], NOW)
+    assert len(events["primary"]) == 6 and google.items_sent == 6
+    stats = store.stats()
+    assert (stats["full_syncs"], stats["incremental_syncs"], stats["expired_tokens"]) == (3, 2, 1)
+    print(f"✅ Refresh downloaded 2 changes instead of {full_payload} events; 410 triggers a full resync")
+
+
+def test_sync_keeps_a_bounded_look_ahead():
+    print("\n--- Testing Sync Look-Ahead ---")
+    google = FakeGoogleCalendar()
+    for day in (0, 1, 5, 40, 400):
+        google.upsert("primary", f"d{day}", 24 * day, f"Day {day}")
+    store = CalendarSyncStore(lookahead_days=30)
+    week = NOW + datetime.timedelta(days=7)
+
+    events, _ = store.sync(google, "user", ["primary"], NOW, week)
+    assert [title for _, _, title in events["primary"]] == ["Day 0", "Day 1", "Day 5"]
+    assert google.items_sent == 3, "events past the look-ahead are not downloaded"
+
+    # A change that moves an event past the look-ahead removes it from the copy
+    google.upsert("primary", "d1", 24 * 90, "Day 1")
+    google.upsert("primary", "d500", 24 * 500, "Day 500")
+    events, _ = store.sync(google, "user", ["primary"], NOW, week)
+    assert [title for _, _, title in events["primary"]] == ["Day 0", "Day 5"]
+    assert store.stats()["events"] == 2
+
+    # A window reaching past the copy lists the calendar again
+    events, _ = store.sync(google, "user", ["primary"], NOW, NOW + datetime.timedelta(days=60))
+    assert [title for _, _, title in events["primary"]] == ["Day 0", "Day 5", "Day 40"]
+    assert (store.full_syncs, store.incremental_syncs) == (2, 1)
+    print("✅ Copies hold only the look-ahead, and a longer window triggers a full sync")
+
+
+def test_sync_resyncs_a_copy_dropped_mid_sync():
+    print("\n--- Testing Copy Dropped During Sync ---")
+    google = FakeGoogleCalendar()
+    for i in range(5):
+        google.upsert("primary", f"p{i}", i, f"Meeting {i}")
+    store = CalendarSyncStore()
+    store.sync(google, "user", ["primary"], NOW)
+
+    # The copy is invalidated (e.g. on logout) while the incremental listing is in flight
+    google.upsert("primary", "p1", 20, "Moved meeting")
+    list_page = google.list_page
+
+    def invalidate_then_list(params):
+        if "syncToken" in params:
+            store.invalidate(user="user")
+        return list_page(params)
+
+    google.list_page = invalidate_then_list
+    events, failed = store.sync(google, "user", ["primary"], NOW)
+    assert not failed and len(events["primary"]) == 5, "the delta alone is not installed as the copy"
+    assert store.stats()["events"] == 5 and store.full_syncs == 2
+    print("✅ A delta whose base copy vanished is discarded and the calendar listed in full")
+
+
+def test_paged_fetch_follows_every_page():
+    print("\n--- Testing Paged Event Fetch ---")
+    google = FakeGoogleCalendar()
+    for i in range(7):
+        google.upsert("primary", f"p{i}", i, f"Meeting {i}")
+    google.upsert("team", "t0", 3, "Team sync")
+    google.upsert("primary", "late", 24 * 8, "Outside the window")
+
+    events, failed = fetch_events(google, ["primary", "team"], NOW, NOW + datetime.timedelta(days=7))
+    assert not failed
+    assert [title for _, _, title in events["primary"]] == [f"Meeting {i}" for i in range(7)]
+    assert events["team"] == [(NOW + datetime.timedelta(hours=3), NOW + datetime.timedelta(hours=3, minutes=30),
+                               "Team sync")]
+    # Seven events in pages of two: four rounds, each a single batch for every calendar still paging
+    assert google.round_trips == 4 and google.items_sent == 8
+    
+    # More calendars than one batch may carry go out in several batches per round
+    many = [f"cal{i}" for i in range(2 * BATCH_MAX_REQUESTS + 10)]
+    for cal_id in many:
+        google.upsert(cal_id, "a", 1, "Meeting")
+    google.round_trips = 0
+    events, failed = fetch_events(google, many, NOW, NOW + datetime.timedelta(days=7))
+    assert not failed and all(len(events[cal_id]) == 1 for cal_id in many) and google.round_trips == 3
+    synced, failed = CalendarSyncStore().sync(google, "user", many, NOW)
+    assert not failed and all(len(synced[cal_id]) == 1 for cal_id in many)
+    print(f"✅ Every page of {len(many)} calendars fetched, {BATCH_MAX_REQUESTS} requests a batch at most")
+
+
+def test_freebusy_fast_path_one_round_trip():
+    print("\n--- Testing FreeBusy Fast Path ---")
+    google = FakeGoogleCalendar()
+    calendar_ids = [f"cal{i}" for i in range(2 * FREEBUSY_MAX_CALENDARS + 10)] + ["missing"]
+    for i, cal_id in enumerate(calendar_ids[:-1]):
+        google.upsert(cal_id, "a", i % 24, "Private meeting")
+        google.upsert(cal_id, "b", i % 24 + 1, "Another one")
+    end = NOW + datetime.timedelta(days=7)
+
+    events, failed = fetch_freebusy(google, calendar_ids, NOW, end)
+    assert google.round_trips == 1, "three queries should go out as one batch request"
+    assert failed == ["missing"] and events["missing"] == []
+    assert all(len(events[cal_id]) == 2 for cal_id in calendar_ids[:-1])
+    assert {title for cal_events in events.values() for _, _, title in cal_events} == {"Busy"}
+
+    google.round_trips = 0
+    events, failed = fetch_freebusy(google, ["cal0"], NOW, end)
+    assert google.round_trips == 1 and not failed and events["cal0"][0][0] == NOW
+    print(f"✅ Busy intervals for {len(calendar_ids)} calendars in one round trip, no titles")
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self.payload = payload
+        self.text = str(payload)
+
+    def json(self):
+        return self.payload
+
+
+class FakeAsyncHTTP:
+    """httpx.AsyncClient's get/post over a FakeGoogleCalendar, with a delay per request"""
+
+    def __init__(self, google, delay=0.01):
+        self.google = google
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _respond(self, handler, arg):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            return FakeResponse(200, self.google._round_trip(handler, arg))
+        except FakeGoogleCalendar.Gone:
+            return FakeResponse(410, {"error": "fullSyncRequired"})
+        finally:
+            self.in_flight -= 1
+
+    async def get(self, path, params, headers):
+        assert headers["Authorization"] == "Bearer token"
+        cal_id = unquote(path.split("/")[2])
+        if cal_id.startswith("missing"):
+            return FakeResponse(404, {"error": "notFound"})
+        return await self._respond(self.google.list_page, {**params, "calendarId": cal_id})
+
+    async def post(self, path, json, headers):
+        assert path == "/freeBusy" and len(json["items"]) <= FREEBUSY_MAX_CALENDARS
+        return await self._respond(self.google.busy_intervals, json)
+
+
+class FakeCredentials:
+    valid = True
+    token = "token"
+
+
+def test_async_client_fetches_calendars_concurrently():
+    print("\n--- Testing Async Calendar Client ---")
+    google = FakeGoogleCalendar()
+    calendar_ids = [f"cal{i}@group.calendar.google.com" for i in range(2 * FREEBUSY_MAX_CALENDARS + 10)]
+    for i, cal_id in enumerate(calendar_ids):
+        for j in range(5):
+            google.upsert(cal_id, f"e{j}", j, f"Meeting {j}")
+    end = NOW + datetime.timedelta(days=7)
+    http = FakeAsyncHTTP(google)
+    client = AsyncCalendarClient(http=http, max_connections=64)
+
+    # Every calendar pages on its own; all are in flight together, up to the pool size
+    events, failed = asyncio.run(client.fetch_events(FakeCredentials(), calendar_ids + ["missing"], NOW, end))
+    assert failed == ["missing"] and events["missing"] == []
+    assert all([title for _, _, title in events[cal_id]] == [f"Meeting {j}" for j in range(5)]
+               for cal_id in calendar_ids)
+    assert http.max_in_flight == 64 and google.round_trips == 3 * len(calendar_ids)
+    width = http.max_in_flight
+    del events["missing"]
+    assert events == fetch_events(google, calendar_ids, NOW, end)[0]
+
+    # Freebusy lists over the per-query limit are split into concurrent queries
+    http.max_in_flight = 0
+    busy, failed = asyncio.run(client.fetch_freebusy(FakeCredentials(), calendar_ids, NOW, end))
+    assert not failed and http.max_in_flight == 3 and all(len(busy[cal_id]) == 5 for cal_id in calendar_ids)
+
+    # Sync tokens work the same way; an expired one falls back to a full resync
+    store = CalendarSyncStore()
+    synced, failed = asyncio.run(client.sync(store, FakeCredentials(), "user", calendar_ids[:2], NOW))
+    assert not failed and synced == {cal_id: events[cal_id] for cal_id in calendar_ids[:2]}
+    google.upsert(calendar_ids[0], "e0", 9, "Moved meeting")
+    google.items_sent = 0
+    synced, failed = asyncio.run(client.sync(store, FakeCredentials(), "user", calendar_ids[:2], NOW))
+    assert not failed and synced[calendar_ids[0]][-1][2] == "Moved meeting" and google.items_sent == 1
+    google.expired.add(google.version)
+    synced, failed = asyncio.run(client.sync(store, FakeCredentials(), "user", calendar_ids[:2], NOW))
+    assert not failed and len(synced[calendar_ids[1]]) == 5
+    assert (store.full_syncs, store.incremental_syncs, store.expired_tokens) == (4, 2, 2)
+    print(f"✅ {len(calendar_ids)} calendars fetched {width} at a time over one shared client")
+
+
+if __name__ == "__main__":
+    test_busy_cache_ttl_and_counters()
+    test_busy_cache_lru_eviction_and_invalidation()
+    test_clip_events_to_request_window()
+    test_incremental_sync_downloads_only_changes()
+    test_sync_keeps_a_bounded_look_ahead()
+    test_sync_resyncs_a_copy_dropped_mid_sync()
+    test_paged_fetch_follows_every_page()
+    test_freebusy_fast_path_one_round_trip()
+    test_async_client_fetches_calendars_concurrently()
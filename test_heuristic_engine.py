@@ -0,0 +1,718 @@
+"""
+Test script for the Heuristic Scheduler
+"""
+import dataclasses
+import datetime
+import itertools
+import os
+import pickle
+import random
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from heuristic_engine import (
+    AvailabilityBitmap, FreeGapList, HeuristicScheduler, IncrementalScheduler, IntervalIndex,
+    MetricsRegistry, RecurrenceRule, RecurringTask, RunMetrics, ScheduleSummary, Task, TaskTable, WorkType,
+    epoch_minutes, evaluate_scenario, evaluate_scenarios, expand_recurring, occurrence_of
+)
+
+NOW = datetime.datetime(2026, 3, 2, 7, 0, tzinfo=datetime.timezone.utc)
+
+
+def make_tasks(n, seed=0):
+    rnd = random.Random(seed)
+    return [
+        Task(
+            id=i,
+            title=f"Task {i}",
+            estimated_minutes=rnd.choice([15, 30, 45, 60, 90, 120, 180]),
+            priority=rnd.randint(1, 10),
+            deadline=NOW + datetime.timedelta(hours=rnd.randint(1, 24 * 10)),
+            work_type=rnd.choice(list(WorkType)),
+        )
+        for i in range(n)
+    ]
+
+
+def make_busy_blocks(n, seed=0):
+    rnd = random.Random(seed)
+    blocks = []
+    for _ in range(n):
+        start = NOW + datetime.timedelta(minutes=rnd.randint(0, 7 * 24 * 60))
+        end = start + datetime.timedelta(minutes=rnd.choice([30, 60, 90, 120]))
+        blocks.append({"start_time": start.isoformat(), "end_time": end.isoformat()})
+    return blocks
+
+
+def reference_picks(scheduler, tasks):
+    """Rescan-and-sort greedy fill, used as the oracle for the indexed engine"""
+    picks = []
+    pending = list(tasks)
+    for gap in scheduler.find_free_gaps():
+        pointer = gap.start
+        while pending:
+            remaining = (gap.end - pointer).total_seconds() / 60
+            if remaining < 15:
+                break
+            candidates = [
+                (t, t.heuristic_score(pointer.hour, now=scheduler.now))
+                for t in pending if t.estimated_minutes <= remaining
+            ]
+            if not candidates:
+                break
+            candidates.sort(key=lambda x: x[1], reverse=True)
+            best = candidates[0][0]
+            picks.append((best.id, pointer))
+            pointer += datetime.timedelta(minutes=best.estimated_minutes)
+            pending.remove(best)
+    return picks
+
+
+def test_indexed_selection_matches_rescan():
+    print("\n--- Testing Indexed Candidate Selection ---")
+    for seed in range(10):
+        tasks = make_tasks(200, seed)
+        scheduler = HeuristicScheduler(make_busy_blocks(40, seed), NOW, NOW + datetime.timedelta(days=7))
+        schedule = scheduler.optimize_schedule(tasks)
+        assert [(s.task.id, s.start_time) for s in schedule] == reference_picks(scheduler, tasks)
+    print("✅ Indexed selection picks the same tasks as a full rescan")
+
+
+def test_frozen_now_is_reproducible():
+    print("\n--- Testing Snapshot-Time Scoring ---")
+    tasks = make_tasks(100, 1)
+    runs = [
+        HeuristicScheduler(make_busy_blocks(20, 1), NOW, NOW + datetime.timedelta(days=7))
+        .optimize_schedule(tasks)
+        for _ in range(3)
+    ]
+    assert runs[0] == runs[1] == runs[2]
+    task = tasks[0]
+    assert task.heuristic_score(9, now=NOW) == task.base_urgency(NOW) * (
+        1.5 if task.work_type == WorkType.DEEP_WORK else 1.0
+    )
+    print("✅ Repeated runs with the same inputs are identical")
+
+
+def test_task_table_vectorized_scores():
+    print("\n--- Testing TaskTable Batch Scoring ---")
+    tasks = make_tasks(500, 2)
+    table = TaskTable.from_tasks(tasks)
+    per_hour = table.heuristic_scores(list(range(24)), NOW)
+    assert per_hour.shape == (24, len(tasks))
+    for hour in (8, 13, 18):
+        single = table.heuristic_scores(hour, NOW)
+        assert list(single) == list(per_hour[hour])
+        assert list(single) == [t.heuristic_score(hour, now=NOW) for t in tasks]
+
+    # A bare table (no Task objects) schedules the same rows
+    bare = TaskTable(table.ids, table.estimated_minutes, table.priorities,
+                     table.deadlines, table.work_types, table.titles)
+    scheduler = HeuristicScheduler(make_busy_blocks(30, 2), NOW, NOW + datetime.timedelta(days=7))
+    from_list = scheduler.optimize_schedule(tasks)
+    from_table = scheduler.optimize_schedule(bare)
+    assert [(s.task.id, s.start_time, s.score) for s in from_list] == \
+        [(s.task.id, s.start_time, s.score) for s in from_table]
+    print("✅ Vectorized scores match Task.heuristic_score")
+
+
+def test_incremental_repair_matches_full_run():
+    print("\n--- Testing Incremental Schedule Repair ---")
+    end = NOW + datetime.timedelta(days=7)
+    rnd = random.Random(4)
+    scheduler = IncrementalScheduler(make_busy_blocks(30, 4), NOW, end)
+    scheduler.optimize_schedule(make_tasks(150, 4))
+
+    def full_run():
+        blocks = [{"start_time": b.start.isoformat(), "end_time": b.end.isoformat()}
+                  for b in scheduler.busy_blocks]
+        tasks = [t for t in scheduler._tasks if t is not None]
+        return HeuristicScheduler(blocks, NOW, end).optimize_schedule(tasks)
+
+    for step in range(60):
+        live = [t for t in scheduler._tasks if t is not None]
+        action = step % 5
+        if action == 0:
+            scheduler.add_task(dataclasses.replace(make_tasks(1, step)[0], id=1000 + step))
+        elif action == 1:
+            scheduler.remove_task(rnd.choice(live).id)
+        elif action == 2:
+            scheduler.update_task(dataclasses.replace(rnd.choice(live), priority=rnd.randint(1, 10)))
+        elif action == 3:
+            scheduler.add_busy_block(make_busy_blocks(1, step)[0])
+        else:
+            block = rnd.choice(scheduler.busy_blocks)
+            scheduler.remove_busy_block({"start_time": block.start.isoformat(),
+                                         "end_time": block.end.isoformat()})
+        assert scheduler.schedule == full_run()
+    print("✅ Repaired schedules match a full re-optimization")
+
+
+def test_interval_index_incremental_updates():
+    print("\n--- Testing Busy Interval Index ---")
+    rnd = random.Random(5)
+    minute = lambda m: NOW + datetime.timedelta(minutes=m)
+    index, raw = IntervalIndex(), []
+    for step in range(200):
+        if raw and rnd.random() < 0.3:
+            start, end, _ = raw.pop(rnd.randrange(len(raw)))
+            index.remove(start, end)
+        else:
+            start = rnd.randint(0, 600)
+            raw.append((minute(start), minute(start + rnd.randint(1, 90)), None))
+            index.add(*raw[-1])
+        rebuilt = IntervalIndex(raw)
+        assert list(index) == list(rebuilt)
+        probe = minute(rnd.randint(-30, 700))
+        assert index.is_busy(probe) == any(s <= probe < e for s, e, _ in raw)
+        assert index.free_gaps(minute(100), minute(400)) == rebuilt.free_gaps(minute(100), minute(400))
+    print("✅ Incremental inserts and removals match a rebuilt index")
+
+
+def test_availability_bitmap_matches_interval_index():
+    print("\n--- Testing Availability Bitmap ---")
+    end = NOW + datetime.timedelta(days=7)
+    minute = lambda m: NOW + datetime.timedelta(minutes=m)
+    for seed in range(5):
+        rnd = random.Random(seed)
+        calendars = [
+            [(minute(s), minute(s + rnd.randint(1, 120)), None)
+             for s in (rnd.randint(-60, 7 * 24 * 60) for _ in range(30))]
+            for _ in range(3)
+        ]
+        index = IntervalIndex(ev for events in calendars for ev in events)
+        bitmap = AvailabilityBitmap.from_calendars(calendars, NOW, end, resolution_minutes=1)
+        assert bitmap.free_gaps(NOW, end) == index.free_gaps(NOW, end)
+        for _ in range(50):
+            probe, length = minute(rnd.randint(0, 7 * 24 * 60 - 200)), rnd.randint(1, 180)
+            assert bitmap.is_busy(probe) == index.is_busy(probe)
+            assert bitmap.fits(probe, length) == index.fits(probe, length)
+        
+        # Pickled for worker processes as coverage runs, not per-slot arrays
+        packed = pickle.dumps(bitmap)
+        assert len(packed) < bitmap.coverage.nbytes // 4
+        clone = pickle.loads(packed)
+        assert np.array_equal(clone.coverage, bitmap.coverage) and np.array_equal(clone.busy, bitmap.busy)
+
+        tasks = make_tasks(100, seed)
+        assert HeuristicScheduler(bitmap, NOW, end).optimize_schedule(tasks) == \
+            HeuristicScheduler(index, NOW, end).optimize_schedule(tasks)
+
+        # Coarser rasters only ever round busy time outward
+        coarse = AvailabilityBitmap.from_calendars(calendars, NOW, end, resolution_minutes=5)
+        for gap in coarse.free_gaps(NOW, end):
+            assert index.fits(gap.start, gap.duration_minutes)
+        
+        # Removing a block frees only the slots no other calendar covers
+        for start, stop, _ in rnd.sample(calendars[0], 10):
+            bitmap.remove(start, stop)
+            index.remove(start, stop)
+        assert bitmap.free_gaps(NOW, end) == index.free_gaps(NOW, end)
+    
+    repaired = IncrementalScheduler(AvailabilityBitmap.from_calendars(calendars, NOW, end, 1), NOW, end)
+    expected = IncrementalScheduler(IntervalIndex(ev for events in calendars for ev in events), NOW, end)
+    block = {"start_time": minute(600).isoformat(), "end_time": minute(700).isoformat()}
+    for scheduler in (repaired, expected):
+        scheduler.optimize_schedule(tasks)
+        scheduler.add_busy_block(block)
+        scheduler.remove_busy_block(block)
+    assert repaired.schedule == expected.schedule
+    print("✅ Bitmap availability matches the interval index")
+
+
+def test_local_search_improves_within_budget():
+    print("\n--- Testing Local-Search Improvement ---")
+    end = NOW + datetime.timedelta(days=7)
+    scheduler = HeuristicScheduler(make_busy_blocks(60, 6), NOW, end)
+    tasks = make_tasks(300, 6)
+    greedy = scheduler.optimize_schedule(tasks)
+    scheduler.metrics = metrics = RunMetrics()
+    assert scheduler.optimize_schedule(tasks, budget_ms=0) == greedy
+    assert "local_search" not in metrics.timings_ms and "local_search_moves" not in metrics.counters
+
+    improved = scheduler.optimize_schedule(tasks, budget_ms=100)
+    moves, improvements = metrics.counters["local_search_moves"], metrics.counters["local_search_improvements"]
+    assert "local_search" in metrics.timings_ms and 0 < improvements <= moves
+    assert scheduler.get_schedule_summary(improved)["total_score"] > \
+        scheduler.get_schedule_summary(greedy)["total_score"]
+
+    # Still a valid plan: each task once, inside free time, no overlaps
+    assert len({s.task.id for s in improved}) == len(improved)
+    for s in improved:
+        assert scheduler.can_fit(s.start_time, s.task.estimated_minutes)
+        assert s.score == s.task.heuristic_score(s.start_time.hour, now=NOW)
+    for a, b in zip(improved, improved[1:]):
+        assert a.end_time <= b.start_time
+    
+    # Nothing to improve: no tasks, or one task already in the only gap
+    metrics.counters.clear()
+    assert scheduler.optimize_schedule([], budget_ms=2000) == []
+    single = HeuristicScheduler([], NOW, NOW + datetime.timedelta(hours=8), metrics=metrics)
+    assert len(single.optimize_schedule(tasks[:1], budget_ms=2000)) == 1
+    assert metrics.counters.get("local_search_moves", 0) == 0
+    print(f"✅ Local search raises the total score ({improvements} of {moves} moves kept) and keeps the plan valid")
+
+
+def test_epoch_minute_value_types():
+    print("\n--- Testing Epoch-Minute Value Types ---")
+    plus_two = datetime.timezone(datetime.timedelta(hours=2))
+    start = NOW + datetime.timedelta(seconds=20)  # Window rounds inward
+    busy = [{"start_time": (NOW + datetime.timedelta(minutes=60, seconds=30)).isoformat(),
+             "end_time": (NOW + datetime.timedelta(minutes=90, seconds=10)).isoformat()}]
+    scheduler = HeuristicScheduler(busy, start, NOW + datetime.timedelta(hours=4))
+    first, second = scheduler.find_free_gaps()
+    
+    # Busy time rounds outward: 08:00-08:31 UTC, free time 07:01-08:00 and 08:31-11:00
+    base = int(NOW.timestamp()) // 60
+    assert (first.start_minute, first.end_minute) == (base + 1, base + 60)
+    assert (second.start_minute, second.end_minute) == (base + 91, base + 240)
+    assert isinstance(first.duration_minutes, int) and first.hour == 7
+    
+    shown = dataclasses.replace(first, utc_offset=120)
+    assert shown.start == first.start and shown.start.tzinfo.utcoffset(None) == plus_two.utcoffset(None)
+    assert shown.hour == 9
+    
+    placed = scheduler.optimize_schedule(make_tasks(20, 7))[0]
+    assert not hasattr(placed, "__dict__") and not hasattr(first, "__dict__")
+    assert placed.end_minute - placed.start_minute == placed.task.estimated_minutes
+    assert placed.start_time == NOW + datetime.timedelta(minutes=1)
+    print("✅ Gaps and placements are whole epoch minutes")
+
+
+def test_iter_schedule_streams_in_order():
+    print("\n--- Testing Streaming Placements ---")
+    scheduler = HeuristicScheduler(make_busy_blocks(40, 8), NOW, NOW + datetime.timedelta(days=7))
+    tasks = make_tasks(200, 8)
+    stream = scheduler.iter_schedule(tasks)
+    first = next(stream)
+    assert [first, *stream] == scheduler.optimize_schedule(tasks)
+    starts = [s.start_minute for s in scheduler.iter_schedule(tasks)]
+    assert starts == sorted(starts)
+    print("✅ Streamed placements match the full plan, in chronological order")
+
+
+def test_phase_metrics():
+    print("\n--- Testing Phase Metrics ---")
+    metrics = RunMetrics()
+    scheduler = HeuristicScheduler(make_busy_blocks(40, 9), NOW, NOW + datetime.timedelta(days=7),
+                                   metrics=metrics)
+    tasks = make_tasks(300, 9)
+    schedule = scheduler.optimize_schedule(tasks)
+    
+    assert set(metrics.timings_ms) == {"parse", "scoring", "selecting"}
+    counters = dict(metrics.counters)
+    assert counters["tasks"] == 300 and 0 < counters["gaps"] <= len(scheduler.find_free_gaps())
+    assert counters["scheduled"] == len(schedule)
+    assert counters["unscheduled"] == 300 - len(schedule)
+    assert counters["candidates_evaluated"] >= len(schedule)
+    
+    scheduler.optimize_schedule(tasks, budget_ms=200)
+    assert "local_search" in metrics.timings_ms and metrics.counters["local_search_moves"] > 0
+    
+    registry = MetricsRegistry()
+    registry.record(metrics)
+    registry.record(metrics)
+    snapshot = registry.snapshot()
+    assert snapshot["runs"] == 2 and snapshot["counters"]["tasks"] == 2 * metrics.counters["tasks"]
+    assert snapshot["phases"]["selecting"]["count"] == 2
+    print("✅ Phase timings and counters are recorded")
+
+
+def test_long_horizon_pulls_only_needed_gaps():
+    print("\n--- Testing Lazy Scheduling Horizon ---")
+    tasks = make_tasks(30, 10)
+    later = [{key: (datetime.datetime.fromisoformat(value) + datetime.timedelta(days=30)).isoformat()
+              for key, value in block.items()} for block in make_busy_blocks(200, 11)]
+    busy = make_busy_blocks(40, 10) + later
+    week = HeuristicScheduler(busy, NOW, NOW + datetime.timedelta(days=7))
+    metrics = RunMetrics()
+    quarter = HeuristicScheduler(busy, NOW, NOW + datetime.timedelta(days=90), metrics=metrics)
+    
+    # Everything fits in the first week, so the extra 83 days change nothing
+    assert quarter.optimize_schedule(tasks) == week.optimize_schedule(tasks)
+    assert metrics.counters["unscheduled"] == 0
+    assert metrics.counters["gaps"] < len(quarter.find_free_gaps())
+    
+    bitmap = AvailabilityBitmap.from_calendars([week.busy_index.raw], NOW, NOW + datetime.timedelta(days=90))
+    assert list(bitmap.iter_free_gaps(NOW, bitmap.end)) == bitmap.free_gaps(NOW, bitmap.end)
+    print("✅ A 90-day horizon only pulls the gaps it fills")
+
+
+def deep_minutes_per_day(schedule):
+    days = {}
+    for s in schedule:
+        if s.task.work_type == WorkType.DEEP_WORK:
+            days[s.start_time.date()] = days.get(s.start_time.date(), 0) + s.task.estimated_minutes
+    return days
+
+
+def test_daily_deep_work_limit():
+    print("\n--- Testing Daily Capacity Limits ---")
+    tasks = make_tasks(200, 12)
+    busy = make_busy_blocks(30, 12)
+    end = NOW + datetime.timedelta(days=7)
+    unlimited = HeuristicScheduler(busy, NOW, end).optimize_schedule(tasks)
+    assert max(deep_minutes_per_day(unlimited).values()) > 240
+    
+    limited = HeuristicScheduler(busy, NOW, end, daily_limits={WorkType.DEEP_WORK: 240})
+    for schedule in (limited.optimize_schedule(tasks), limited.optimize_schedule(tasks, budget_ms=50),
+                     list(limited.iter_schedule(tasks))):
+        assert max(deep_minutes_per_day(schedule).values()) <= 240
+        assert all(s.start_time.date() == (s.end_time - datetime.timedelta(minutes=1)).date() for s in schedule)
+        assert any(s.task.work_type == WorkType.SHALLOW_WORK for s in schedule)
+    print("✅ No day gets more than 4 hours of Deep Work")
+
+
+def assert_summary_matches(summary, schedule):
+    expected = ScheduleSummary(schedule).as_dict()
+    assert summary.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, float):
+            assert abs(summary[key] - value) < 1e-9, key
+        else:
+            assert summary[key] == value, key
+
+
+def test_running_summary():
+    print("\n--- Testing Running Schedule Summary ---")
+    tasks = make_tasks(200, 13)
+    busy = make_busy_blocks(30, 13)
+    end = NOW + datetime.timedelta(days=7)
+    scheduler = HeuristicScheduler(busy, NOW, end)
+    
+    schedule = scheduler.optimize_schedule(tasks)
+    assert_summary_matches(scheduler.get_schedule_summary(), schedule)
+    summary = scheduler.get_schedule_summary()
+    assert sum(summary["daily_minutes"].values()) == summary["total_minutes"]
+    assert sum(wt["tasks"] for wt in summary["work_types"].values()) == len(schedule)
+    
+    schedule = scheduler.optimize_schedule(tasks, budget_ms=30)
+    assert_summary_matches(scheduler.get_schedule_summary(), schedule)
+    schedule = list(scheduler.iter_schedule(tasks[:50]))
+    assert_summary_matches(scheduler.get_schedule_summary(), schedule)
+    
+    incremental = IncrementalScheduler(busy, NOW, end)
+    incremental.optimize_schedule(tasks[:100])
+    rnd = random.Random(13)
+    for step in range(20):
+        live = [t for t in incremental._tasks if t is not None]
+        if step % 3 == 0:
+            incremental.add_task(dataclasses.replace(make_tasks(1, step)[0], id=1000 + step))
+        elif step % 3 == 1:
+            incremental.remove_task(rnd.choice(live).id)
+        else:
+            incremental.add_busy_block(make_busy_blocks(1, step)[0])
+        assert_summary_matches(incremental.get_schedule_summary(), incremental.schedule)
+    print("✅ The running summary matches one computed from the finished schedule")
+
+
+def test_scenarios_share_precomputed_gaps():
+    print("\n--- Testing What-If Scenarios ---")
+    tasks = make_tasks(150, 14)
+    end = NOW + datetime.timedelta(days=7)
+    scheduler = HeuristicScheduler(make_busy_blocks(30, 14), NOW, end)
+    gaps = FreeGapList(scheduler.find_free_gaps())
+    
+    shared = HeuristicScheduler(gaps, NOW, end)
+    assert shared.optimize_schedule(tasks) == scheduler.optimize_schedule(tasks)
+    later = NOW + datetime.timedelta(days=2, minutes=7)
+    assert gaps.free_gaps(later, end) == scheduler.free_gaps_between(later, end)
+    
+    variants = [tasks, tasks[10:], [dataclasses.replace(t, priority=10) for t in tasks]]
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        for busy_index in (gaps, scheduler.busy_index):
+            results = list(pool.map(
+                evaluate_scenario, itertools.repeat(busy_index), variants,
+                itertools.repeat(NOW), itertools.repeat(end), itertools.repeat(NOW)
+            ))
+            for variant, (summary, metrics) in zip(variants, results):
+                expected = HeuristicScheduler(gaps, NOW, end)
+                expected.optimize_schedule(variant)
+                assert summary["total_score"] == expected.get_schedule_summary()["total_score"]
+                assert summary["unscheduled_tasks"] == len(variant) - summary["total_tasks_scheduled"]
+                assert metrics.counters["scheduled"] == summary["total_tasks_scheduled"]
+        # Several variants in one job ship the gaps once
+        batched = pool.submit(evaluate_scenarios, gaps, variants, NOW, end, NOW).result()
+        assert [summary for summary, _ in batched] == [summary for summary, _ in results]
+    print("✅ Variants run in worker processes over one shared busy index")
+
+
+def make_project(n, seed=0):
+    """Tasks where each depends on up to three earlier ones (a random DAG)"""
+    rnd = random.Random(seed)
+    return [
+        dataclasses.replace(task, depends_on=tuple(rnd.sample(range(i), min(i, rnd.randint(0, 3)))))
+        for i, task in enumerate(make_tasks(n, seed))
+    ]
+
+
+def assert_precedence(schedule, tasks):
+    placed = {s.task.id: s for s in schedule}
+    for s in schedule:
+        for dep in s.task.depends_on:
+            assert dep in placed and placed[dep].end_minute <= s.start_minute
+
+
+def test_dependencies_schedule_in_topological_order():
+    print("\n--- Testing Dependency-Aware Scheduling ---")
+    tasks = make_project(300, 15)
+    scheduler = HeuristicScheduler(make_busy_blocks(30, 15), NOW, NOW + datetime.timedelta(days=21))
+    for schedule in (scheduler.optimize_schedule(tasks), scheduler.optimize_schedule(tasks, budget_ms=50),
+                     list(scheduler.iter_schedule(tasks))):
+        assert schedule and any(s.task.depends_on for s in schedule)
+        assert_precedence(schedule, tasks)
+    
+    # Dependencies on tasks outside the run (e.g. completed ones) are already met
+    outside = [dataclasses.replace(t, depends_on=(9999,)) for t in make_tasks(20, 15)]
+    assert len(scheduler.optimize_schedule(outside)) == len(scheduler.optimize_schedule(make_tasks(20, 15)))
+    
+    cyclic = make_tasks(5, 15)
+    cyclic[0] = dataclasses.replace(cyclic[0], depends_on=(3,))
+    cyclic[3] = dataclasses.replace(cyclic[3], depends_on=(0,))
+    try:
+        scheduler.optimize_schedule(cyclic)
+        assert False, "cycle not detected"
+    except ValueError as e:
+        assert "[0, 3]" in str(e)
+    print("✅ Tasks start only after their predecessors, and cycles are rejected")
+
+
+def test_deadline_feasibility_check():
+    print("\n--- Testing Deadline Feasibility Check ---")
+    scheduler = HeuristicScheduler(make_busy_blocks(30, 16), NOW, NOW + datetime.timedelta(days=7))
+    gaps = scheduler.find_free_gaps()
+    
+    def fits(subset):
+        """Relaxed oracle: EDF prefix demand within free time, each task within one gap"""
+        demand = 0
+        for task in sorted(subset, key=lambda t: t.deadline):
+            usable = [(gap.start_minute, min(gap.end_minute, epoch_minutes(task.deadline)))
+                      for gap in gaps if gap.start_minute < epoch_minutes(task.deadline)]
+            demand += task.estimated_minutes
+            if task.estimated_minutes > max((end - start for start, end in usable), default=0) or \
+                    demand > sum(end - start for start, end in usable):
+                return False
+        return True
+    
+    rnd = random.Random(16)
+    for trial in range(40):
+        tasks = [dataclasses.replace(t, deadline=NOW + datetime.timedelta(minutes=rnd.randint(-60, 36 * 60)))
+                 for t in make_tasks(7, trial)]
+        report = scheduler.check_deadlines(tasks)
+        rest = [t for t in tasks if t not in report.infeasible_tasks]
+        assert fits(rest) and report.feasible == (not report.infeasible_tasks)
+        fewest = min(len(tasks) - len(kept) for r in range(len(tasks) + 1)
+                     for kept in itertools.combinations(tasks, r) if fits(kept))
+        assert len(report.infeasible_tasks) == fewest
+    
+    # A plan that meets every deadline is never flagged
+    tasks = [dataclasses.replace(t, deadline=NOW + datetime.timedelta(days=6)) for t in make_tasks(40, 16)]
+    schedule = scheduler.optimize_schedule(tasks)
+    assert len(schedule) == len(tasks) and all(s.end_time <= s.task.deadline for s in schedule)
+    assert scheduler.check_deadlines(tasks).feasible
+    
+    # Deadlines after the window may use time the scheduler cannot see: reported, not flagged
+    later = [dataclasses.replace(t, deadline=NOW + datetime.timedelta(days=10), estimated_minutes=180)
+             for t in make_tasks(60, 16)]
+    report = scheduler.check_deadlines(tasks + later)
+    assert report.feasible and report.beyond_horizon == tuple(later)
+    assert report.demand_minutes == sum(t.estimated_minutes for t in tasks)
+    assert not HeuristicScheduler([], NOW, NOW + datetime.timedelta(days=7)).check_deadlines(
+        [dataclasses.replace(later[0], deadline=NOW + datetime.timedelta(days=7, minutes=-1),
+                             estimated_minutes=7 * 1440)]).feasible
+    print("✅ EDF check finds the fewest tasks that cannot meet their deadlines")
+
+
+def test_optimize_in_pool_matches_inline_run():
+    print("\n--- Testing Process-Pool Offload ---")
+    tasks = make_project(120, 17)
+    limits = {WorkType.DEEP_WORK: 240}
+    scheduler = HeuristicScheduler(make_busy_blocks(30, 17), NOW, NOW + datetime.timedelta(days=14),
+                                   daily_limits=limits)
+    inline = scheduler.optimize_schedule(tasks)
+    inline_summary = scheduler.get_schedule_summary()
+    
+    metrics = RunMetrics()
+    scheduler.metrics = metrics
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        offloaded = scheduler.optimize_in_pool(pool, tasks, inline_below=0)
+        assert "dispatch" in metrics.timings_ms and metrics.counters["scheduled"] == len(offloaded)
+        assert offloaded == inline and all(a.task is b.task for a, b in zip(offloaded, inline))
+        assert scheduler.get_schedule_summary() == inline_summary
+        
+        # Small runs never leave the process
+        metrics.timings_ms.clear()
+        assert scheduler.optimize_in_pool(pool, tasks[:10], inline_below=50) == \
+            scheduler.optimize_schedule(tasks[:10])
+        assert "dispatch" not in metrics.timings_ms
+    
+    # A pool whose worker died refuses every submit; the run falls back to inline
+    broken = ProcessPoolExecutor(max_workers=1)
+    try:
+        broken.submit(os._exit, 1).exception()
+        metrics.counters.clear()
+        assert scheduler.optimize_in_pool(broken, tasks, inline_below=0) == inline
+        assert metrics.counters["pool_fallbacks"] == 1
+    finally:
+        broken.shutdown()
+    print("✅ Offloaded runs return the same plan as inline ones, or run inline on a broken pool")
+
+
+def test_batch_plans_match_optimize_schedule():
+    print("\n--- Testing Nightly Batch Planner ---")
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    import models
+    from batch_planner import run_batch
+    
+    tasks = make_tasks(80, 19)
+    limits = {WorkType.DEEP_WORK: 240}
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'plan.db')}"
+        engine = create_engine(url)
+        models.Base.metadata.create_all(engine, tables=[models.Task.__table__])
+        with Session(engine) as session:
+            session.add_all([
+                models.Task(id=t.id + 1, title=t.title, estimated_minutes=t.estimated_minutes,
+                            priority=t.priority, deadline=t.deadline,
+                            work_type=models.WorkType(t.work_type.value))
+                for t in tasks
+            ])
+            session.add(models.Task(id=1000, title="Done", estimated_minutes=30, priority=10,
+                                    deadline=NOW, work_type=models.WorkType.DEEP_WORK, is_completed=True))
+            session.commit()
+        
+        scheduler = HeuristicScheduler([], NOW, NOW + datetime.timedelta(days=7), daily_limits=limits)
+        expected = [(s.task.id + 1, s.start_minute, s.end_minute) for s in scheduler.optimize_schedule(tasks)]
+        for _ in range(2):  # A rerun replaces the stored plan
+            summaries = run_batch([url], NOW, 7, daily_limits=limits, workers=1, fetch_size=16)
+            with Session(engine) as session:
+                blocks = session.query(models.PlannedBlock).order_by(models.PlannedBlock.start_time).all()
+                stored = [
+                    (b.task_id, epoch_minutes(b.start_time.replace(tzinfo=datetime.timezone.utc)),
+                     epoch_minutes(b.end_time.replace(tzinfo=datetime.timezone.utc)))
+                    for b in blocks
+                ]
+            assert sorted(stored, key=lambda b: b[1]) == sorted(expected, key=lambda b: b[1])
+            assert summaries[url] == scheduler.get_schedule_summary()
+        engine.dispose()
+    print(f"✅ Batch plan of {len(expected)} placements matches optimize_schedule and is replaced on rerun")
+
+
+def test_recurring_tasks_expand_within_window():
+    print("\n--- Testing Recurring Task Templates ---")
+    weekdays = RecurrenceRule.parse("RRULE:FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR")
+    reviews = RecurringTask(3, "Review PRs", 30, 7, weekdays, NOW.replace(hour=14), due_minutes=240,
+                            work_type=WorkType.SHALLOW_WORK)
+    # A series running since 1990 only yields the window's occurrences
+    standup = RecurringTask(4, "Standup notes", 15, 6, RecurrenceRule.parse("FREQ=DAILY"),
+                            datetime.datetime(1990, 1, 1, 16, 30, tzinfo=datetime.timezone.utc), due_minutes=60)
+    end = NOW + datetime.timedelta(days=14)
+    occurrences = list(expand_recurring([reviews, standup], NOW, end))
+    assert sum(occurrence_of(t.id)[0] == 3 for t in occurrences) == 10
+    assert sum(occurrence_of(t.id)[0] == 4 for t in occurrences) == 14
+    assert all(occurrence_of(t.id)[1] == t.available_from.date() for t in occurrences)
+    assert [m.day for m in RecurrenceRule.parse("FREQ=MONTHLY;BYMONTHDAY=-1;COUNT=3").occurrences(NOW)] == [31, 30, 31]
+    for rule, message in (("FREQ=DAILY;INTERVAL=two", "INTERVAL must be an integer"),
+                          ("FREQ=MONTHLY;BYMONTHDAY=1,x", "BYMONTHDAY must be an integer"),
+                          ("FREQ=DAILY;COUNT=0", "COUNT must be at least 1"),
+                          ("FREQ=DAILY;UNTIL=tomorrow", "UNTIL must be YYYYMMDD")):
+        try:
+            RecurrenceRule.parse(rule)
+            assert False, f"{rule} accepted"
+        except ValueError as e:
+            assert message in str(e), str(e)
+    
+    tasks = make_tasks(40, 23) + occurrences
+    for limits, budget_ms in ((None, None), ({WorkType.DEEP_WORK: 240}, 50)):
+        scheduler = HeuristicScheduler(make_busy_blocks(20, 23), NOW, end, daily_limits=limits)
+        schedule = scheduler.optimize_schedule(tasks, budget_ms=budget_ms)
+        placed = [s for s in schedule if s.task.available_from is not None]
+        assert placed and all(s.start_time >= s.task.available_from for s in placed)
+        if budget_ms is None:
+            assert list(scheduler.iter_schedule(tasks)) == schedule
+    print(f"✅ {len(occurrences)} occurrences expanded, {len(placed)} placed, none before its occurrence time")
+
+
+def test_release_times_leave_long_tasks_whole():
+    print("\n--- Testing Release Times Next to Long Tasks ---")
+    nine = NOW.replace(hour=9)
+    report = Task(1, "Quarterly report", 240, 5, nine + datetime.timedelta(days=2), WorkType.DEEP_WORK)
+    notes = Task(2, "Standup notes", 15, 5, nine + datetime.timedelta(days=2), WorkType.SHALLOW_WORK,
+                 available_from=nine + datetime.timedelta(hours=1))
+    for hours, minutes in ((4, 15), (6, 0)):
+        end = nine + datetime.timedelta(hours=hours, minutes=minutes)
+        scheduler = HeuristicScheduler([], nine, end)
+        alone = scheduler.optimize_schedule([report])
+        for budget_ms in (None, 20):
+            schedule = scheduler.optimize_schedule([report, notes], budget_ms=budget_ms)
+            placed = {s.task.id: s for s in schedule}
+            assert placed.keys() == {1, 2} and placed[1].start_time == alone[0].start_time == nine
+            assert placed[2].start_time >= notes.available_from
+    
+    # With nothing else to do, the fill waits for the release instead of leaving the gap
+    schedule = HeuristicScheduler([], nine, nine + datetime.timedelta(hours=2)).optimize_schedule([notes])
+    assert [s.start_time for s in schedule] == [notes.available_from]
+    print("✅ A release time no longer cuts the gap a long task needs")
+
+
+def test_incremental_falls_back_to_full_runs():
+    print("\n--- Testing Incremental Fallback to Full Runs ---")
+    end = NOW + datetime.timedelta(days=7)
+    busy = make_busy_blocks(30, 24)
+    limits = {WorkType.DEEP_WORK: 240}
+    release = NOW + datetime.timedelta(days=1)
+    cases = [
+        ({}, make_tasks(80, 24), None),
+        ({"daily_limits": limits}, make_tasks(80, 24), None),
+        ({}, make_project(80, 24), None),
+        ({}, [dataclasses.replace(t, available_from=release) if t.id % 4 == 0 else t
+              for t in make_tasks(80, 24)], None),
+        ({}, make_tasks(80, 24), 20),
+    ]
+    for options, tasks, budget_ms in cases:
+        scheduler = IncrementalScheduler(busy, NOW, end, **options)
+        scheduler.optimize_schedule(tasks, budget_ms=budget_ms, seed=3)
+        scheduler.add_task(dataclasses.replace(make_tasks(1, 25)[0], id=500, depends_on=(1,)))
+        scheduler.remove_task(2)
+        scheduler.update_task(dataclasses.replace(tasks[5], priority=10))
+        scheduler.add_busy_block(make_busy_blocks(1, 26)[0])
+        
+        blocks = [{"start_time": b.start.isoformat(), "end_time": b.end.isoformat()}
+                  for b in scheduler.busy_blocks]
+        current = [t for t in scheduler._tasks if t is not None]
+        expected = HeuristicScheduler(blocks, NOW, end, **options).optimize_schedule(
+            current, budget_ms=budget_ms, seed=3)
+        if budget_ms is None:
+            assert scheduler.schedule == expected
+        else:  # Budgeted runs stop on wall time, so only the plan's validity is comparable
+            assert len({s.task.id for s in scheduler.schedule}) == len(scheduler.schedule)
+            assert all(scheduler.can_fit(s.start_time, s.task.estimated_minutes) for s in scheduler.schedule)
+        assert_summary_matches(scheduler.get_schedule_summary(), scheduler.schedule)
+    print("✅ Limits, dependencies, release times and budgets repair through full runs")
+
+
+if __name__ == "__main__":
+    test_indexed_selection_matches_rescan()
+    test_frozen_now_is_reproducible()
+    test_task_table_vectorized_scores()
+    test_incremental_repair_matches_full_run()
+    test_interval_index_incremental_updates()
+    test_availability_bitmap_matches_interval_index()
+    test_local_search_improves_within_budget()
+    test_epoch_minute_value_types()
+    test_iter_schedule_streams_in_order()
+    test_phase_metrics()
+    test_long_horizon_pulls_only_needed_gaps()
+    test_daily_deep_work_limit()
+    test_running_summary()
+    test_scenarios_share_precomputed_gaps()
+    test_dependencies_schedule_in_topological_order()
+    test_deadline_feasibility_check()
+    test_optimize_in_pool_matches_inline_run()
+    test_batch_plans_match_optimize_schedule()
+    test_recurring_tasks_expand_within_window()
+    test_release_times_leave_long_tasks_whole()
+    test_incremental_falls_back_to_full_runs()
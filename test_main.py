@@ -0,0 +1,326 @@
+"""
+Test script for the API routes (FastAPI TestClient over a throwaway SQLite database)
+"""
+import base64
+import datetime
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'aevum_test.db')}")
+os.environ.setdefault("ENGINE_POOL_WORKERS", "0")
+
+import itsdangerous
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import main
+import models
+from database import get_db
+
+NOW = datetime.datetime.now(datetime.timezone.utc)
+
+
+def make_database_url():
+    return f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'api.db')}"
+
+
+def make_client(database_url=None):
+    """A TestClient whose routes use `database_url` (default: a fresh, empty database)"""
+    engine = create_engine(database_url or make_database_url())
+    models.Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    main.app.dependency_overrides[get_db] = override_get_db
+    return TestClient(main.app)
+
+
+def create_task(client, title, **fields):
+    body = {"title": title, "estimated_minutes": 60, "priority": 5,
+            "deadline": (NOW + datetime.timedelta(days=3)).isoformat(), **fields}
+    response = client.post("/tasks", json=body)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_from_db_schedules_stored_dependencies():
+    print("\n--- Testing Stored Task Dependencies ---")
+    client = make_client()
+    design = create_task(client, "Design schema", priority=1)
+    build = create_task(client, "Build API", priority=10, depends_on=[design["id"]])
+    assert build["depends_on"] == [design["id"]]
+    assert client.post("/tasks", json={"title": "X", "deadline": NOW.isoformat(), "depends_on": [999]}).status_code == 422
+
+    # Closing a loop is rejected and leaves the stored links alone
+    response = client.put(f"/tasks/{design['id']}", json={"depends_on": [build["id"]]})
+    assert response.status_code == 422 and "cycle" in response.json()["detail"]
+    assert client.get(f"/tasks/{design['id']}").json()["depends_on"] == []
+
+    # The higher-priority task still waits for its predecessor
+    schedule = client.post("/optimize/from-db").json()["schedule"]
+    starts = {p["task_id"]: p["start"] for p in schedule}
+    assert starts[design["id"]] < starts[build["id"]]
+
+    # Suggestions name their dependencies by title, even ones created later in the batch
+    response = client.post("/ai/apply-suggestions", json=[
+        {"action": "create", "title": "Write docs", "depends_on": "Ship release"},
+        {"action": "create", "title": "Ship release", "depends_on": ["Build API", "Nowhere"]},
+    ]).json()
+    docs, release = (r["task_id"] for r in response["results"])
+    assert response["results"][1]["unresolved_depends_on"] == ["Nowhere"]
+    assert client.get(f"/tasks/{docs}").json()["depends_on"] == [release]
+    assert client.get(f"/tasks/{release}").json()["depends_on"] == [build["id"]]
+    print("✅ Stored dependencies reach /optimize/from-db; unknown ids and cycles are a 422")
+
+
+def test_optimize_rejects_bad_dependencies():
+    print("\n--- Testing Submitted Task Dependencies ---")
+    client = make_client()
+    body = optimize_body(4)
+    body[3]["depends_on"] = [1]
+    schedule = client.post("/optimize", json=body).json()
+    starts = {p["task"]: p["start"] for p in schedule}
+    assert starts["Task 1"] < starts["Task 3"]
+
+    body[1]["depends_on"] = [3]
+    for route in ("/optimize", "/optimize/stream", "/optimize/scenarios"):
+        payload = {"tasks": body, "scenarios": []} if route.endswith("scenarios") else body
+        response = client.post(route, json=payload)
+        assert response.status_code == 422 and "cycle" in response.json()["detail"], route
+    body[1]["depends_on"] = [7]
+    response = client.post("/optimize", json=body)
+    assert response.status_code == 422 and "unknown tasks [7]" in response.json()["detail"]
+    print("✅ Submitted dependencies are honoured; cycles and unknown indices are a 422")
+
+
+
+def optimize_body(n):
+    return [
+        {"title": f"Task {i}", "estimated_minutes": 30 + 15 * (i % 4), "priority": 1 + i % 10,
+         "deadline": (NOW + datetime.timedelta(days=2 + i % 3)).isoformat(),
+         "work_type": "Shallow Work" if i % 2 else "Deep Work"}
+        for i in range(n)
+    ]
+
+
+def test_optimize_streams_placements_in_order():
+    print("\n--- Testing Streamed Optimization ---")
+    client = make_client()
+    body = optimize_body(12)
+    expected = client.post("/optimize", json=body).json()
+
+    response = client.post("/optimize/stream", json=body)
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    # Each request scores against its own "now", so compare the plans by task
+    assert sorted(p["task"] for p in lines) == sorted(p["task"] for p in expected)
+    assert [p["start"] for p in lines] == sorted(p["start"] for p in lines)
+
+    response = client.post("/optimize/stream?format=sse", json=body)
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [chunk.split("\n") for chunk in response.text.strip().split("\n\n")]
+    assert all(event == "event: placement" for event, _ in events)
+    placements = [json.loads(data[len("data: "):]) for _, data in events]
+    assert [p["task"] for p in placements] == [p["task"] for p in lines]
+
+    # The stored-task stream ends with the summary
+    for title in ("Plan sprint", "Review PRs"):
+        create_task(client, title)
+    lines = [json.loads(line) for line in client.post("/optimize/from-db/stream").text.splitlines()]
+    assert [p["task"] for p in lines[:-1]] and lines[-1]["summary"]["total_tasks_scheduled"] == 2
+    print(f"✅ {len(expected)} placements streamed as NDJSON and SSE, in chronological order")
+
+
+def test_scenarios_compare_variants():
+    print("\n--- Testing What-If Scenarios Route ---")
+    client = make_client()
+    body = {"tasks": optimize_body(10), "scenarios": [
+        {"name": "drop three", "drop_tasks": [0, 1, 2]},
+        {"name": "urgent first", "priorities": {"0": 10}},
+    ]}
+    runs = main.ENGINE_METRICS.snapshot()["runs"]
+    response = client.post("/optimize/scenarios", json=body).json()
+    assert response["base"]["total_tasks_scheduled"] == 10 and response["base"]["unscheduled_tasks"] == 0
+    dropped, urgent = response["scenarios"]
+    assert dropped["name"] == "drop three" and dropped["summary"]["total_tasks_scheduled"] == 7
+    assert urgent["summary"]["total_score"] != response["base"]["total_score"]
+    # Every variant's run lands in the engine metrics, base included
+    assert main.ENGINE_METRICS.snapshot()["runs"] == runs + 3
+
+    # On the pool, variants sharing a calendar set are split over the workers, in order
+    pool = ProcessPoolExecutor(max_workers=2)
+    original = main.get_engine_pool, main.ENGINE_INLINE_TASKS, main.ENGINE_POOL_WORKERS
+    main.get_engine_pool, main.ENGINE_INLINE_TASKS, main.ENGINE_POOL_WORKERS = (lambda: pool), 0, 2
+    try:
+        body["scenarios"].append({"name": "drop one", "drop_tasks": [5]})
+        pooled = client.post("/optimize/scenarios", json=body).json()
+        assert [s["summary"]["total_tasks_scheduled"] for s in pooled["scenarios"]] == [7, 10, 9]
+        assert [s["name"] for s in pooled["scenarios"]] == ["drop three", "urgent first", "drop one"]
+    finally:
+        main.get_engine_pool, main.ENGINE_INLINE_TASKS, main.ENGINE_POOL_WORKERS = original
+        pool.shutdown()
+
+    body["scenarios"] = [{"name": "bad", "drop_tasks": [10]}]
+    response = client.post("/optimize/scenarios", json=body)
+    assert response.status_code == 422 and "unknown tasks [10]" in response.json()["detail"]
+    print("✅ Scenarios are summarized against the base plan and recorded in the engine metrics")
+
+
+def test_recurring_tasks_are_planned_from_db():
+    print("\n--- Testing Recurring Task Routes ---")
+    client = make_client()
+    template = {"title": "Standup notes", "estimated_minutes": 15, "rrule": "FREQ=DAILY",
+                "dtstart": (NOW - datetime.timedelta(days=1)).isoformat(), "due_minutes": 720}
+    for rrule, message in (("FREQ=DAILY;INTERVAL=two", "INTERVAL must be an integer"),
+                           ("FREQ=HOURLY", "Unsupported RRULE FREQ")):
+        response = client.post("/recurring-tasks", json={**template, "rrule": rrule})
+        assert response.status_code == 422 and message in response.json()["detail"], response.text
+    created = client.post("/recurring-tasks", json=template)
+    assert created.status_code == 201
+    template_id = created.json()["id"]
+    assert [t["id"] for t in client.get("/recurring-tasks").json()] == [template_id]
+
+    # One occurrence a day within the horizon, never before its occurrence time
+    schedule = client.post("/optimize/from-db?horizon_days=3").json()["schedule"]
+    occurrences = [p for p in schedule if p.get("recurring_task_id") == template_id]
+    assert len(occurrences) >= 3 and all(p["task_id"] is None for p in occurrences)
+    assert len({p["occurrence_date"] for p in occurrences}) == len(occurrences)
+
+    assert client.delete(f"/recurring-tasks/{template_id}").status_code == 204
+    assert client.get("/recurring-tasks").json() == []
+    assert client.delete(f"/recurring-tasks/{template_id}").status_code == 404
+    print(f"✅ {len(occurrences)} occurrences planned; bad rules are a 422 with a readable message")
+
+
+def test_planned_schedule_shows_the_batch_plan():
+    print("\n--- Testing Stored Batch Plan Route ---")
+    from batch_planner import run_batch
+
+    url = make_database_url()
+    client = make_client(url)
+    assert client.get("/schedule/planned").json() == {"planned_at": None, "calendar_aware": False, "schedule": []}
+
+    ids = [create_task(client, title)["id"] for title in ("Write report", "Reply to email", "Plan week")]
+    run_batch([url], NOW, horizon_days=3, workers=1)
+    planned = client.get("/schedule/planned").json()
+    assert planned["planned_at"] is not None
+    assert sorted(block["task_id"] for block in planned["schedule"]) == ids
+    assert [b["start"] for b in planned["schedule"]] == sorted(b["start"] for b in planned["schedule"])
+    print(f"✅ The nightly plan ({len(planned['schedule'])} blocks) is served in chronological order")
+
+
+def log_in(client, token):
+    """Sign a session cookie holding Google credentials, as /callback would"""
+    session = base64.b64encode(json.dumps({"credentials": {"token": token}}).encode())
+    signer = itsdangerous.TimestampSigner(os.getenv("SESSION_SECRET", "super_secret_dev_key"))
+    client.cookies.set("session", signer.sign(session).decode())
+
+
+class FakeCalendarClient:
+    """Stands in for main.CALENDAR_CLIENT: canned calendars and events, and a log of its calls"""
+
+    def __init__(self, events_by_calendar):
+        self.events_by_calendar = events_by_calendar
+        self.calls = []
+
+    async def list_calendars(self, creds):
+        self.calls.append(("list_calendars", creds))
+        return [{"id": cal_id, "summary": cal_id.title(), "primary": cal_id == "primary"}
+                for cal_id in self.events_by_calendar]
+
+    async def fetch_events(self, creds, calendar_ids, start, end):
+        self.calls.append(("fetch_events", creds, tuple(calendar_ids)))
+        return {cal_id: self.events_by_calendar[cal_id] for cal_id in calendar_ids}, []
+
+    async def sync(self, store, creds, user, calendar_ids, start, end=None):
+        self.calls.append(("sync", creds, tuple(calendar_ids)))
+        return {cal_id: self.events_by_calendar[cal_id] for cal_id in calendar_ids}, []
+
+    async def aclose(self):
+        pass
+
+
+def test_async_calendar_routes():
+    print("\n--- Testing Async Calendar Routes ---")
+    client = make_client()
+    assert client.get("/calendars").status_code == 401
+    hour = lambda h: NOW.replace(second=0, microsecond=0) + datetime.timedelta(hours=h)
+    fake = FakeCalendarClient({
+        "primary": [(hour(1), hour(2), "Standup"), (hour(5), hour(6), "Lunch")],
+        "team": [(hour(1.5), hour(3), "Planning")],
+    })
+    creds = object()
+    original = main.CALENDAR_CLIENT, main.get_credentials
+    main.CALENDAR_CLIENT, main.get_credentials = fake, lambda request: creds
+    try:
+        log_in(client, "async-routes-token")
+        calendars = client.get("/calendars").json()
+        assert [(c["id"], c["primary"]) for c in calendars] == [("primary", True), ("team", False)]
+
+        # Overlapping events from both calendars merge into one block titled after the first
+        blocks = client.get("/busy", params={"calendar_ids": ["primary", "team"]}).json()
+        assert [(b["title"], b["calendar_id"]) for b in blocks] == [("Standup", "merged"), ("Lunch", "merged")]
+        assert datetime.datetime.fromisoformat(blocks[0]["end_time"]) == hour(3)
+
+        # A repeat within the cache TTL does not call Google again
+        fetches = len(fake.calls)
+        assert client.get("/busy", params={"calendar_ids": ["primary", "team"]}).json() == blocks
+        assert len(fake.calls) == fetches and all(call[1] is creds for call in fake.calls)
+    finally:
+        main.CALENDAR_CLIENT, main.get_credentials = original
+        main.BUSY_CACHE.invalidate(user=main.user_key({"token": "async-routes-token"}))
+    print(f"✅ /calendars and /busy await the shared client ({len(fake.calls)} calls) and reuse cached events")
+
+
+def broken_pool():
+    """A process pool whose only worker has died, as after an OOM kill"""
+    pool = ProcessPoolExecutor(max_workers=1)
+    pool.submit(os._exit, 1).exception()
+    return pool
+
+
+def test_broken_engine_pool_is_replaced():
+    print("\n--- Testing Broken Engine Pool ---")
+    client = make_client()
+    broken = broken_pool()
+    original = main.get_engine_pool, main.ENGINE_INLINE_TASKS
+    main.get_engine_pool, main.ENGINE_INLINE_TASKS = (lambda: broken), 0
+    try:
+        body = {"tasks": optimize_body(6), "scenarios": [{"name": "drop one", "drop_tasks": [0]}]}
+        response = client.post("/optimize/scenarios", json=body)
+        assert response.status_code == 200 and response.json()["base"]["total_tasks_scheduled"] == 6
+    finally:
+        main.get_engine_pool, main.ENGINE_INLINE_TASKS = original
+
+    workers, main.ENGINE_POOL_WORKERS = main.ENGINE_POOL_WORKERS, 1
+    main._engine_pool = broken
+    try:
+        pool = main.get_engine_pool()
+        assert pool is not broken and pool.submit(sum, [1, 2]).result() == 3
+    finally:
+        main.ENGINE_POOL_WORKERS = workers
+        if main._engine_pool is not None:
+            main._engine_pool.shutdown()
+        main._engine_pool = None
+        broken.shutdown()
+    print("✅ Requests survive a dead worker, and the next call gets a fresh pool")
+
+
+if __name__ == "__main__":
+    test_from_db_schedules_stored_dependencies()
+    test_optimize_rejects_bad_dependencies()
+    test_optimize_streams_placements_in_order()
+    test_scenarios_compare_variants()
+    test_recurring_tasks_are_planned_from_db()
+    test_planned_schedule_shows_the_batch_plan()
+    test_async_calendar_routes()
+    test_broken_engine_pool_is_replaced()